@@ -0,0 +1,11 @@
+#version 330
+
+in vec4 oCd;
+in vec2 oUV;
+
+uniform sampler2D diffuse;
+
+void main()
+{
+   gl_FragColor = texture2D(diffuse,oUV);
+}
\ No newline at end of file
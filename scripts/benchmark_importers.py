@@ -0,0 +1,96 @@
+""" Benchmark for the streaming importers.
+
+    A grid of (size x size) quads is written into OBJ and PLY files
+    (2 * size * size triangles) and imported with different chunk
+    sizes. The time and throughput are printed for each import. The
+    peak memory allocated is only traced with --memory, since tracing
+    slows down the parsing.
+
+        python benchmark_importers.py [size] [--memory]
+
+    size = 1000 generates 2M triangles.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+
+# Add the currnent parent path so it recognize zero package entirely
+PACKAGE_PARENT = '../'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from zero.core import read_obj, read_ply
+
+def grid(size):
+    """ Return the positions, textcoords, normals and quads of a grid
+    """
+    x, y = np.meshgrid(np.linspace(0.0, 1.0, size + 1), np.linspace(0.0, 1.0, size + 1))
+    positions = np.stack([x.ravel(), y.ravel(), np.zeros(x.size)], axis=1)
+    textcoords = positions[:, :2]
+    normals = np.array([[0.0, 0.0, 1.0]])
+    index = np.arange((size + 1) * (size + 1)).reshape(size + 1, size + 1)
+    quads = np.stack([index[:-1, :-1], index[:-1, 1:], index[1:, 1:], index[1:, :-1]],
+                     axis=2).reshape(-1, 4)
+    return positions, textcoords, normals, quads
+
+def write_obj(filename, size):
+    positions, textcoords, normals, quads = grid(size)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]]) + 1
+    with open(filename, "w") as file:
+        np.savetxt(file, positions, fmt="v %.6f %.6f %.6f")
+        np.savetxt(file, textcoords, fmt="vt %.6f %.6f")
+        np.savetxt(file, normals, fmt="vn %.1f %.1f %.1f")
+        corners = np.repeat(triangles, 3, axis=1)
+        corners[:, 2::3] = 1
+        np.savetxt(file, corners, fmt="f %d/%d/%d %d/%d/%d %d/%d/%d")
+    return len(triangles)
+
+def write_ply(filename, size):
+    positions, textcoords, normals, quads = grid(size)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    with open(filename, "wb") as file:
+        file.write("ply\nformat binary_little_endian 1.0\n"
+                   "element vertex {}\nproperty float x\nproperty float y\nproperty float z\n"
+                   "property float nx\nproperty float ny\nproperty float nz\n"
+                   "element face {}\nproperty list uchar int vertex_indices\n"
+                   "end_header\n".format(len(positions), len(triangles)).encode("ascii"))
+        vertices = np.empty((len(positions), 6), dtype="<f4")
+        vertices[:, :3], vertices[:, 3:] = positions, normals
+        file.write(vertices.tobytes())
+        faces = np.empty(len(triangles), dtype=[("n", "u1"), ("i", "<i4", (3,))])
+        faces["n"], faces["i"] = 3, triangles
+        file.write(faces.tobytes())
+    return len(triangles)
+
+def benchmark(name, function, filename, triangles, chunk_size, memory=False):
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    geometry = function(filename, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if memory else 0
+    tracemalloc.stop()
+    points = len(geometry.get_point_attrib("P"))
+    print("{:4} chunk:{:8} triangles:{:9} points:{:9} time:{:7.2f}s "
+          "{:6.2f}M tris/s file:{:7.1f}MB peak:{:7.1f}MB".format(
+            name, chunk_size, triangles, points, elapsed, triangles / elapsed / 1e6,
+            os.path.getsize(filename) / 1e6, peak / 1e6))
+
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith("--")]
+    size = int(arguments[0]) if arguments else 1000
+    memory = "--memory" in sys.argv
+    directory = tempfile.mkdtemp()
+    obj, ply = os.path.join(directory, "grid.obj"), os.path.join(directory, "grid.ply")
+    triangles = write_obj(obj, size)
+    write_ply(ply, size)
+    for chunk_size in [1 << 14, 1 << 18]:
+        benchmark("OBJ", read_obj, obj, triangles, chunk_size, memory)
+        benchmark("PLY", read_ply, ply, triangles, chunk_size, memory)
+    os.remove(obj)
+    os.remove(ply)
+    os.rmdir(directory)
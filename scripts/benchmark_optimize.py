@@ -0,0 +1,51 @@
+""" Benchmark for the mesh optimization.
+
+    A grid of (size x size) quads is created as a triangle soup (each
+    triangle with its own points) with the triangles shuffled, like the
+    meshes imported without indices. The geometry is optimized and the
+    time, the points and the ACMR before and after are printed.
+
+        python benchmark_optimize.py [size] [cache_size]
+
+    size = 500 generates 500K triangles.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+# Add the currnent parent path so it recognize zero package entirely
+PACKAGE_PARENT = '../'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from zero.core import Geometry
+
+def grid_soup(size):
+    """ Return the positions and indices of the shuffled triangle soup
+    """
+    x, y = np.meshgrid(np.linspace(0.0, 1.0, size + 1), np.linspace(0.0, 1.0, size + 1))
+    positions = np.stack([x.ravel(), y.ravel(), np.zeros(x.size)], axis=1)
+    index = np.arange(len(positions)).reshape(size + 1, size + 1)
+    quads = np.stack([index[:-1, :-1], index[:-1, 1:], index[1:, 1:], index[1:, :-1]],
+                     axis=2).reshape(-1, 4)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    triangles = triangles[np.random.RandomState(0).permutation(len(triangles))]
+    return positions[triangles.ravel()], np.arange(triangles.size)
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    cache_size = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    positions, indices = grid_soup(size)
+    geometry = Geometry()
+    geometry.add_vertices(positions).add_indices(indices)
+    start = time.perf_counter()
+    stats = geometry.optimize(tolerance=1e-7, cache_size=cache_size)
+    elapsed = time.perf_counter() - start
+    print("triangles:{} -> {} points:{} -> {} time:{:.2f}s".format(
+            stats["triangles"][0], stats["triangles"][1],
+            stats["points"][0], stats["points"][1], elapsed))
+    print("ACMR (cache {}): {:.3f} -> {:.3f}  indices:{}".format(
+            cache_size, stats["acmr"][0], stats["acmr"][1],
+            geometry.get_prim_attrib(Geometry.primitive.indices).dtype))
@@ -1,5 +1,7 @@
 import os
 import sys
+import time
+import threading
 import numpy as np
 
 # Add the currnent parent path so it recognize rendegl package entirely
@@ -7,9 +9,12 @@ PACKAGE_PARENT = '../../'
 SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
 sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
 
-from zero.core import ( Entity, Component, Base,
+from zero.core import ( Entity, Component, Base, CommandBuffer,
                         Catalogue, CatalogueGroup,
                         CatalogueDict, CatalogueTree)
+from zero.core.catalogue import CatalogueStorage, ComponentPool
+from zero.core.scheduler import SystemScheduler
+from zero.core.base.utils import HandleAllocator
 
 class Transform(Component):
     defaults = dict({"position":[0,1,2,3],
@@ -20,6 +25,12 @@ class Camera(Component):
                      "orbit":False,
                      "view": np.reshape(range(9),(3,3))})
 
+class Body(Component):
+    pooled = True
+    defaults = dict({"velocity": np.zeros(3, np.float32),
+                     "mass": np.float32(1.0),
+                     "shape": None})
+
 def test_ecs():
     transform1 = Transform("tranform1",key="name")
     transform2 = Transform("tranform2",key="name")
@@ -75,6 +86,384 @@ def test_catalogue():
     print(catalogue)
     print(catalogue.dataframe.head(10))
 
+def test_catalogue_storage():
+    storage = CatalogueStorage()
+    # Bind several items so the indexes are moved between archetypes
+    for index in range(100):
+        storage.bind("entity{}".format(index), "Transform", "Transform{}".format(index))
+        if index % 2:
+            storage.bind("entity{}".format(index), "Renderable", "Renderable{}".format(index))
+    assert len(storage) == 100
+    assert storage.get("entity1", "Renderable") == "Renderable1"
+    assert storage.get("entity2", "Renderable") is None
+    # Unbind and remove indexes (swap and pop in the tables)
+    storage.unbind("entity1", "Renderable")
+    storage.remove("entity3")
+    storage.discard("Transform5")
+    assert storage.get("entity1", "Renderable") is None
+    assert "entity3" not in storage
+    assert storage.get("entity5", "Transform") is None
+    assert storage.get("entity99", "Renderable") == "Renderable99"
+    # Archetypes tables are contiguous
+    rows = sum(len(archetype) for archetype in storage.archetypes.values())
+    assert rows == len(storage)
+    # Dataframe is materialized only for debugging
+    df = storage.dataframe()
+    print(df.head(10))
+    assert list(df.columns) == ["Transform", "Renderable"]
+    assert df.loc["entity7", "Renderable"] == "Renderable7"
+    assert df.loc["entity1"].isna()["Renderable"]
+
+def test_catalogue_query():
+    catalogue = Catalogue(index="Entity")
+    # Query registered before any item is added
+    query = catalogue.query("Transform","Renderable")
+    for index in range(10):
+        entity = "entity{}".format(index)
+        catalogue.bind(entity, "Transform", "Transform{}".format(index))
+        if index % 2:
+            catalogue.bind(entity, "Renderable", "Renderable{}".format(index))
+        catalogue["Entity"][entity] = entity
+    assert query is catalogue.query(["Renderable","Transform"])
+    assert sorted(query) == ["entity1","entity3","entity5","entity7","entity9"]
+    # Query registered once the items already exist
+    transforms = catalogue.query("Transform")
+    assert len(transforms) == 10
+    # Queries are updated with the catalogue changes
+    catalogue.unbind("entity1", "Renderable", None)
+    del catalogue["Entity"]["entity3"]
+    catalogue["Renderable"]["Renderable5"] = "Renderable5"
+    del catalogue["Renderable"]["Renderable5"]
+    catalogue.bind("entity2", "Renderable", "Renderable2")
+    assert list(query) == ["entity7","entity9","entity2"]
+    assert len(transforms) == 9
+
+def test_catalogue_select():
+    catalogue = Catalogue(index="Entity")
+    # Register more than 64 columns so signatures need several words
+    for index in range(100):
+        entity = "entity{}".format(index)
+        catalogue["Entity"][entity] = entity
+        catalogue.bind(entity, "Column{}".format(index), "Item{}".format(index))
+        if index % 2:
+            catalogue.bind(entity, "Transform", "Transform{}".format(index))
+        if index % 3 == 0:
+            catalogue.bind(entity, "Renderable", "Renderable{}".format(index))
+    transforms = catalogue.select(all_of="Transform")
+    assert len(transforms) == 50
+    both = catalogue.select(all_of=["Transform","Renderable"])
+    assert list(both) == ["entity{}".format(i) for i in range(100) if i % 2 and i % 3 == 0]
+    none = catalogue.select(all_of="Transform", none_of="Renderable")
+    assert len(none) == len(transforms) - len(both)
+    anyof = catalogue.select(any_of=["Column5","Column70","Column99"])
+    assert list(anyof) == ["entity5","entity70","entity99"]
+    # Inactive indexes are filtered in the same pass
+    catalogue.set_active("entity3", False)
+    assert "entity3" not in catalogue.select(all_of=["Transform","Renderable"])
+    assert "entity3" in catalogue.select(all_of=["Transform","Renderable"], active=False)
+    # Cached queries using any_of and none_of
+    query = catalogue.query("Transform", none_of="Renderable")
+    assert sorted(query) == sorted(none)
+
+def test_spawn_many():
+    catalogue = Entity.Catalogue
+    query = catalogue.query("Transform","Camera")
+    notifications = []
+    callback = catalogue._callback_group
+    def counter(key, item, option):
+        notifications.append((key, option))
+        callback(key, item, option)
+    for group in ["Entity", "Transform", "Camera"]:
+        catalogue[group]._callback = counter
+    # Spawn entities with new components and with given components
+    cameras = Camera.create_many(1000, properties={"mode":1})
+    entities = Entity.spawn_many(1000, components=[Transform, cameras], name="spawned")
+    assert len(notifications) == 3
+    assert len(query) >= 1000
+    assert entities[10].camera is cameras[10]
+    assert cameras[10].mode == 1
+    assert catalogue.storage.get(entities[10].id, "Camera") == cameras[10].id
+    # Despawn entities (objects or ids) with their components
+    del notifications[:]
+    Entity.despawn_many(entities[:500] + [entity.id for entity in entities[500:]])
+    assert len(notifications) == 3
+    assert not any(entity.id in query for entity in entities)
+    assert cameras[10].id not in catalogue["Camera"]
+    for group in ["Entity", "Transform", "Camera"]:
+        catalogue[group]._callback = callback
+
+def test_handles():
+    default = Base.DEFAULT_UUID
+    Base.DEFAULT_UUID = Base.HANDLE
+    try:
+        entities = Entity.spawn_many(100, components=[Transform])
+        handles = [entity.id for entity in entities]
+        assert all(isinstance(handle, int) and handle for handle in handles)
+        assert all(Base.HANDLE.valid(handles))
+        # Handles are used directly to look up the slots in the storage
+        storage = Entity.Catalogue.storage
+        slots = storage.lookup(handles)
+        assert list(slots) == [storage.slot(handle) for handle in handles]
+        # Stale handles are detected once the entities are despawned
+        Entity.despawn_many(entities[:50])
+        assert not any(Base.HANDLE.valid(handles[:50]))
+        assert all(storage.lookup(handles[:50]) == -1)
+        assert all(storage.lookup(handles[50:]) >= 0)
+        # Indexes are reused with a new generation
+        entity = Entity("reused")
+        index = HandleAllocator.index(entity.id)
+        assert index in [HandleAllocator.index(handle) for handle in handles[:50]]
+        assert entity.id not in handles
+    finally:
+        Base.DEFAULT_UUID = default
+
+def test_handles_generation_wrap():
+    allocator = HandleAllocator()
+    handle = allocator()
+    index = HandleAllocator.index(handle)
+    # Last generation that fits into the int64 handles
+    allocator.free(handle)
+    allocator._generations[index] = HandleAllocator.GENERATION_MASK
+    last = allocator()
+    assert HandleAllocator.index(last) == index
+    handles = np.array([last], dtype=np.int64)
+    assert last > 0 and handles[0] == last and allocator.valid(handles)[0]
+    # The generation wraps to 1 (never 0) and the stale handle is detected
+    allocator.free(last)
+    wrapped = allocator()
+    assert wrapped == (1 << HandleAllocator.INDEX_BITS) | index
+    assert not allocator.is_valid(last) and allocator.is_valid(wrapped)
+    many = allocator.allocate_many(4)
+    assert many.dtype == np.int64 and np.all(many > 0)
+
+def test_component_pool():
+    pool = ComponentPool(Body.defaults, capacity=2)
+    assert pool.fields["velocity"] == (np.float32, (3,))
+    assert pool.fields["shape"] == (object, ())
+    handles = Base.HANDLE.allocate_many(4)
+    pool.update((handle, str(handle)) for handle in handles[:3])
+    pool["key"] = "value"
+    pool.set(handles[1], "velocity", [1, 2, 3])
+    assert pool.field("velocity").shape == (4, 3)
+    assert list(pool.field("mass")) == [1.0] * 4
+    # Remove moves the last item into the removed position
+    del pool[handles[0]]
+    assert len(pool) == 3 and handles[0] not in pool
+    assert pool["key"] == "value" and pool.index("key") == 0
+    assert list(pool.get(handles[1], "velocity")) == [1, 2, 3]
+    assert list(pool.indexes(handles)) == [-1, 1, 2, -1]
+    # Stale handles are not found in the pool
+    Base.HANDLE.free(handles[1])
+    assert Base.HANDLE() not in pool
+
+def test_pooled_components():
+    bodies = [Body("body", velocity=[0, index, 0]) for index in range(10)]
+    bodies += Body.create_many(10, properties={"mass": 2.0})
+    group = Body.Catalogue["Body"]
+    pool = group.pool
+    assert pool is not None and len(pool) >= 20
+    assert "velocity" not in bodies[3].__dict__
+    assert list(bodies[3].velocity) == [0, 3, 0]
+    assert bodies[15].mass == 2.0 and bodies[15].shape is None
+    # Properties are set directly into the dense arrays
+    bodies[3].velocity = [1, 1, 1]
+    assert list(pool.field("velocity")[pool.index(bodies[3].id)]) == [1, 1, 1]
+    entity = Entity("body_entity", items=bodies[3])
+    assert entity.body is bodies[3]
+    assert Entity.Catalogue.storage.get(entity.id, "Body") == bodies[3].id
+    # Removing a component keeps the rest of the pool valid
+    Body.remove_many(bodies[:5])
+    assert all(body.id not in group for body in bodies[:5])
+    assert list(bodies[6].velocity) == [0, 6, 0]
+    assert group[bodies[6].id] is bodies[6]
+
+def test_command_buffer():
+    catalogue = Entity.Catalogue
+    commands = CommandBuffer()
+    entities = Entity.spawn_many(10, components=[Camera], name="commands")
+    query = catalogue.query("Camera")
+    count = len(query)
+    # Record the changes while iterating without modifying the catalogue
+    for entity in query:
+        if entity in entities[:5]:
+            commands.despawn(entity)
+            commands.despawn(entity.id)
+    for entity in entities[5:]:
+        commands.set(entity.camera, mode=2)
+        commands.set(entity.camera, orbit=True)
+    for index in range(5):
+        commands.spawn(components=[Camera], name="spawned")
+    assert len(query) == count and len(commands) == 25
+    assert entities[5].camera.mode == 0
+    # Apply all the changes merging the consecutive commands
+    notifications = []
+    callback = catalogue._callback_group
+    def counter(key, item, option):
+        notifications.append((key, option))
+        callback(key, item, option)
+    for group in ["Entity", "Camera"]:
+        catalogue[group]._callback = counter
+    try:
+        spawned = commands.flush()
+    finally:
+        for group in ["Entity", "Camera"]:
+            catalogue[group]._callback = callback
+    assert len(commands) == 0 and len(spawned) == 5
+    assert all(entity.id not in catalogue["Entity"] for entity in entities[:5])
+    assert entities[6].camera.mode == 2 and entities[6].camera.orbit
+    assert len(query) == count
+    # One notification per group to despawn and spawn all the entities
+    assert len(notifications) == 4
+
+def test_change_ticks():
+    catalogue = Entity.Catalogue
+    entities = Entity.spawn_many(10, components=[Transform], name="ticks")
+    query = catalogue.query("Transform")
+    since = catalogue.advance()
+    # Nothing changed or added since the last tick
+    assert not any(entity in entities for entity in query.changed("Transform", since))
+    # Properties set, items modified and new components bound
+    entities[1].transform.position = [1, 1, 1]
+    entities[2].transform._update_properties({"rotation": None})
+    entities[3].set_items(Transform("added"))
+    entities[4].set_items(Camera("camera"))
+    changed = query.changed("Transform", since)
+    assert [entity for entity in entities if entity in changed] == entities[1:4]
+    added = query.added("Transform", since)
+    assert [entity for entity in entities if entity in added] == entities[3:4]
+    keys = catalogue.select(changed="Transform", since=since)
+    assert sorted(keys) == sorted(entity.id for entity in entities[1:4])
+    keys = catalogue.select(all_of="Transform", added="Camera", since=since)
+    assert list(keys) == [entities[4].id]
+    # Changes after advance are reported in the next run
+    since = catalogue.advance()
+    assert not query.changed("Transform", since)
+    entities[5].transform.touch()
+    assert query.changed("Transform", since) == [entities[5]]
+
+def test_change_ticks_storage():
+    storage = CatalogueStorage()
+    handles = [(1 << 32) | index for index in range(4)]
+    storage.add_many(handles)
+    # Ticks are sized by the columns registered (not 64 per slot)
+    assert storage._added.shape[1] < CatalogueStorage.WORD_BITS
+    for column in range(6):
+        storage.bind(handles[0], "column{}".format(column), object())
+    assert storage._added.shape[1] >= 6 and storage._changed.shape == storage._added.shape
+    assert storage.ticks(handles[:1], "column5")[0] == storage.tick
+    # Stale or unknown handles are not read from other slots
+    try:
+        storage.ticks([(2 << 32) | 3], "column0")
+        assert False
+    except KeyError:
+        pass
+
+def test_system_scheduler():
+    order = []
+    threads = dict()
+    # Both physics systems must run at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    def system(name, wait=False):
+        def run():
+            if wait:
+                barrier.wait()
+            time.sleep(0.01)
+            threads[name] = threading.current_thread()
+            order.append(name)
+        return run
+    scheduler = SystemScheduler(workers=4)
+    scheduler.add(system("input"), reads=["input"], writes=["camera"], 
+                  main_thread=True, name="input")
+    scheduler.add(system("rigid", True), reads=["rigid"], writes=["transform"], name="rigid")
+    scheduler.add(system("cloth", True), reads=["cloth"], writes=["geometry"], name="cloth")
+    scheduler.add(system("commands"), writes=[SystemScheduler.ALL], 
+                  main_thread=True, name="commands")
+    scheduler.add(system("render"), reads=["camera","transform","geometry"], 
+                  main_thread=True, name="render")
+    graph = scheduler.graph()
+    assert graph["rigid"] == [] and graph["cloth"] == []
+    assert graph["render"] == ["input", "rigid", "cloth", "commands"]
+    try:
+        scheduler.run()
+    finally:
+        scheduler.shutdown()
+    assert order[-2:] == ["commands", "render"]
+    assert set(order[:3]) == set(["input", "rigid", "cloth"])
+    assert threads["render"] is threading.current_thread()
+    assert threads["input"] is threading.current_thread()
+    assert threads["rigid"] is not threading.current_thread()
+    # Timings and the critical path of the last frame
+    assert all(timing > 0 for timing in scheduler.timings.values())
+    path, total = scheduler.critical_path()
+    assert path[-2:] == ["commands", "render"] and total > 0
+
+def test_destroy():
+    default = Base.DEFAULT_UUID
+    Base.DEFAULT_UUID = Base.HANDLE
+    catalogue = Entity.Catalogue
+    try:
+        root = Entity("root", items=Transform("transform"))
+        children = Entity.spawn_many(10, components=[Transform, Camera])
+        for child in children:
+            child.set_parent(root)
+        for index, child in enumerate(children[:5]):
+            Entity("grandchild{}".format(index), parent=child, items=Camera("camera"))
+        parent = Entity("parent", children=root)
+        ids = [root.id]
+        for child in children:
+            ids.append(child.id)
+            ids.extend(child.children.keys())
+            ids.extend(child.items[key].id for key in child.items)
+        assert len(ids) == 1 + 10 + 5 + 20
+        # Destroy the subtree with one notification per group
+        notifications = []
+        callback = catalogue._callback_group
+        def counter(key, item, option):
+            notifications.append((key, option))
+            callback(key, item, option)
+        for group in ["Entity", "Transform", "Camera"]:
+            catalogue[group]._callback = counter
+        try:
+            destroyed = root.destroy()
+        finally:
+            for group in ["Entity", "Transform", "Camera"]:
+                catalogue[group]._callback = callback
+        assert len(destroyed) == 1 + 10 + 5
+        assert len(notifications) == 3
+        assert root.id not in parent.children and root.parent is None
+        assert not any(id in catalogue.storage for id in destroyed)
+        assert not any(Base.HANDLE.valid(ids))
+        # Children are detached when it's not recursive
+        child = Entity("child", parent=parent)
+        assert parent.destroy(recursive=False) == [parent.id]
+        assert child.parent is None and child.id in catalogue["Entity"]
+    finally:
+        Base.DEFAULT_UUID = default
+
+def test_destroy_shared_items():
+    default = Base.DEFAULT_UUID
+    Base.DEFAULT_UUID = Base.HANDLE
+    catalogue = Entity.Catalogue
+    try:
+        shared = Transform("shared")
+        first = Entity("first", items=shared)
+        second = Entity("second", items=shared)
+        assert catalogue.storage.references(shared.id) == 2
+        # The item is kept while other entities are bound to it
+        first.destroy()
+        assert shared.id in catalogue["Transform"] and Base.HANDLE.valid([shared.id])[0]
+        assert catalogue.storage.references(shared.id) == 1
+        assert second in list(catalogue.query("Transform"))
+        # Its handle can't be reused by new items
+        other = Transform("other")
+        assert other.id != shared.id
+        # The last entity removes the item
+        second.destroy()
+        assert shared.id not in catalogue["Transform"]
+        assert not Base.HANDLE.valid([shared.id])[0]
+    finally:
+        Base.DEFAULT_UUID = default
+
 def test_collection_list():
     class Category1(CatalogueDict): pass
     class Category2(CatalogueDict): pass
@@ -180,6 +569,11 @@ if __name__ == '__main__':
     # test the current entity
     test_ecs()
     #test_catalogue()
+    #test_catalogue_storage()
+    #test_catalogue_query()
+    #test_catalogue_select()
+    #test_spawn_many()
+    #test_handles()
     #test_collection_list()
     #test_collection_tree()
 
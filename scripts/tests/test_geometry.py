@@ -0,0 +1,911 @@
+import os
+import sys
+import numpy as np
+
+# Add the currnent parent path so it recognize rendegl package entirely
+PACKAGE_PARENT = '../../'
+SCRIPT_DIR = os.path.dirname(os.path.realpath(os.path.join(os.getcwd(), os.path.expanduser(__file__))))
+sys.path.append(os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT)))
+
+from zero.core import (Geometry, AttributeTable, write_geometry, read_geometry,
+                       read_obj, read_ply, acmr, weld_vertices, reorder_triangles,
+                       GeometryGroup, simplify)
+from zero.core.geometry.create import triangle
+
+def test_attribute_table():
+    table = AttributeTable(capacity=2)
+    assert not table.add("Cd", size=4)
+    table.add("P", np.arange(9), size=3, dtype=np.float32)
+    table.add("Cd", default=[1.0, 0.0, 0.0, 1.0], size=4)
+    assert len(table) == 3 and table.get("P").shape == (3, 3)
+    assert table.get("P").dtype == np.float32
+    assert list(table.get("Cd")[2]) == [1.0, 0.0, 0.0, 1.0]
+    # Get returns views so the data is not copied
+    values = table.get("P")
+    assert np.shares_memory(values, table.get("P"))
+    # Append rows with the defaults for the attributes not given
+    version = table.attribute_version("P")
+    rows = table.append({"P": [[9, 10, 11], [12, 13, 14]]})
+    assert list(rows) == [3, 4] and len(table) == 5
+    assert list(table.get("P")[4]) == [12, 13, 14]
+    assert list(table.get("Cd")[4]) == [1.0, 0.0, 0.0, 1.0]
+    assert table.attribute_version("P") > version
+    # Add and remove attributes without modifying the rest
+    cd = table.get("Cd")
+    table.add("N", size=3)
+    table.remove("N")
+    assert "N" not in table and np.shares_memory(cd, table.get("Cd"))
+    try:
+        table.add("UV", np.zeros(4), size=2)
+        assert False
+    except ValueError:
+        pass
+    # Lazy dataframe for debugging
+    df = table.dataframe()
+    assert list(df.columns) == ["Px", "Py", "Pz", "Cdx", "Cdy", "Cdz", "Cdw"]
+    assert len(df.index) == 5
+
+def test_geometry_attributes():
+    geometry = triangle()
+    assert geometry.indexed
+    positions = geometry.get_point_attrib(Geometry.point.position)
+    assert positions.shape == (3, 3) and positions.dtype == np.float32
+    assert geometry.get_prim_attrib(Geometry.primitive.indices).dtype == np.uint32
+    assert geometry.attributes["points"]["P"] == ["Px", "Py", "Pz"]
+    assert list(geometry.data["points"].columns[:3]) == ["Px", "Py", "Pz"]
+    geometry.remove_point_attrib(Geometry.point.color)
+    assert "Cd" not in geometry.attributes["points"]
+    assert not Geometry().indexed
+
+def test_vertex_buffer():
+    geometry = triangle()
+    geometry.add_normals([0.0, 0.0, 1.0] * 3)
+    buffer = geometry.get_vertex_buffer()
+    # Position is always the first attribute
+    assert buffer.dtype.names[0] == Geometry.point.position
+    assert buffer.dtype.fields["P"][1] == 0
+    assert buffer.dtype.itemsize == sum(buffer.dtype.fields[name][0].itemsize
+                                        for name in buffer.dtype.names)
+    assert np.allclose(buffer["P"], geometry.get_point_attrib("P"))
+    assert np.allclose(buffer["N"], [[0.0, 0.0, 1.0]] * 3)
+    # The buffer is cached until the point attributes are modified
+    assert geometry.get_vertex_buffer() is buffer
+    geometry.tables["points"].set("N", [0.0, 1.0, 0.0])
+    buffer = geometry.get_vertex_buffer()
+    assert np.allclose(buffer["N"], [[0.0, 1.0, 0.0]] * 3)
+    assert geometry.get_vertex_buffer() is buffer
+    geometry.get_point_attrib("N")[0] = [1.0, 0.0, 0.0]
+    geometry.tables["points"].touch("N")
+    assert geometry.get_vertex_buffer() is not buffer
+
+class RecordGL(object):
+    """ Record all the calls to OpenGL functions and return the
+    constants from the real module (or the values given)
+    """
+    def __init__(self, returns=None):
+        import OpenGL.GL as GL
+        self._GL = GL
+        self._returns = returns or dict()
+        self.calls = []
+    def __getattr__(self, name):
+        if name.startswith("GL_"):
+            return getattr(self._GL, name)
+        def function(*args):
+            self.calls.append((name, args))
+            return self._returns.get(name, len(self.calls))
+        return function
+    def count(self, name):
+        return sum(1 for call in self.calls if call[0] == name)
+
+class RecordShader(object):
+    def __init__(self):
+        self.binds = []
+    def bind(self, name, size, dtype, stride=0, offset=0):
+        self.binds.append((name, size, dtype, stride, offset))
+        return len(self.binds)
+    def unbind(self, attribute):
+        pass
+
+def test_opengl_buffer(monkeypatch):
+    import zero.drivers.opengl.buffer as module
+    gl, shader = RecordGL(), RecordShader()
+    monkeypatch.setattr(module, "GL", gl)
+    geometry = triangle()
+    geometry.add_normals([0.0, 0.0, 1.0] * 3)
+    buffer = module.OpenGLBuffer(geometry, shader)
+    buffer.update()
+    uploads = [args for name, args in gl.calls if name == "glBufferData"]
+    targets = [args[0] for args in uploads]
+    assert targets.count(gl.GL_ARRAY_BUFFER) == 1
+    assert targets.count(gl.GL_ELEMENT_ARRAY_BUFFER) == 1
+    stride = geometry.get_vertex_buffer().dtype.itemsize
+    assert [(bind[0], bind[1], bind[3], bind[4]) for bind in shader.binds] == [
+        ("position", 3, stride, 0), ("N", 3, stride, 12), ("UV", 2, stride, 24),
+        ("Cd", 4, stride, 32)]
+    # Nothing is uploaded again if the geometry has not changed
+    count = len(gl.calls)
+    buffer.update()
+    assert len(gl.calls) == count
+    geometry.tables["points"].touch("Cd")
+    buffer.update()
+    assert [name for name, args in gl.calls[count:]].count("glBufferData") == 1
+
+def test_geometry_cache(tmpdir):
+    filename = str(tmpdir.join("triangle.geo"))
+    geometry = triangle()
+    geometry.add_normals([0.0, 0.0, 1.0] * 3)
+    write_geometry(geometry, filename)
+    # Raw arrays are aligned to pages
+    assert os.path.getsize(filename) % 4096 == 0
+    cached = read_geometry(filename)
+    assert cached.name == geometry.name and cached.indexed
+    for index, table in geometry.tables.items():
+        assert list(cached.tables[index]) == list(table)
+        for name in table:
+            values = cached.tables[index].get(name)
+            assert isinstance(values, np.memmap)
+            assert values.dtype == table.dtype(name)
+            assert np.array_equal(values, table.get(name))
+    # Attributes are copy-on-write, so the file is not modified
+    cached.tables["points"].set("N", [1.0, 0.0, 0.0])
+    assert np.allclose(read_geometry(filename).get_point_attrib("N"), [[0.0, 0.0, 1.0]] * 3)
+    # Attached arrays are copied once the table grows
+    cached.tables["points"].append({"P": [1.0, 1.0, 0.0]})
+    assert len(cached.tables["points"]) == 4
+    assert list(cached.get_point_attrib("N")[3]) == [0.0, 0.0, 0.0]
+    assert cached.get_vertex_buffer().shape == (4,)
+    with open(filename, "r+b") as file:
+        file.write(b"NONE")
+    try:
+        read_geometry(filename)
+        assert False
+    except ValueError:
+        pass
+    # Names are stored (utf-8) only if they fit in the fields
+    geometry.name = u"\u00e9" * 24
+    write_geometry(geometry, filename)
+    assert read_geometry(filename).name == geometry.name
+    geometry.name = u"\u00e9" * 25
+    try:
+        write_geometry(geometry, str(tmpdir.join("long.geo")))
+        assert False
+    except ValueError:
+        assert not os.path.exists(str(tmpdir.join("long.geo")))
+
+def test_obj_importer(tmpdir):
+    filename = str(tmpdir.join("quad.obj"))
+    with open(filename, "w") as file:
+        file.write("# quad and a triangle with relative indices\n"
+                   "o quad\n"
+                   "v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\n"
+                   "vt 0 0\nvt 1 0\nvt 1 1\nvt 0 1\n"
+                   "vn 0 0 1\n"
+                   "f 1/1/1 2/2/1 3/3/1 4/4/1\n"
+                   "v 2 0 0\n"
+                   "vn 0 1 0\n"
+                   "f -4/2/-2 -1/1/-1 -3/3/-2\n")
+    # Small chunks so faces and values are split into several chunks
+    for chunk_size in [2, 1 << 10]:
+        geometry = read_obj(filename, chunk_size=chunk_size)
+        positions = geometry.get_point_attrib("P")
+        indices = geometry.get_prim_attrib("Id")
+        assert indices.shape == (3, 3) and indices.dtype == np.uint32
+        # Corners with the same (position, textcoord, normal) are shared
+        assert len(positions) == 5
+        # Triangles keep the order of the faces in the file
+        triangles = [tuple(map(tuple, positions[triangle])) for triangle in indices]
+        assert triangles == [((0, 0, 0), (1, 0, 0), (1, 1, 0)),
+                             ((0, 0, 0), (1, 1, 0), (0, 1, 0)),
+                             ((1, 0, 0), (2, 0, 0), (1, 1, 0))]
+        point = np.flatnonzero(np.all(positions == [2, 0, 0], axis=1))[0]
+        assert list(geometry.get_point_attrib("N")[point]) == [0, 1, 0]
+        assert geometry.get_point_attrib("UV").shape == (5, 2)
+
+def test_ply_importer(tmpdir):
+    vertices = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [2, 0, 0]], np.float32)
+    colors = np.array([[255, 0, 0]] * 5, np.uint8)
+    header = ("ply\nformat {}\ncomment test\nelement vertex 5\n"
+              "property float x\nproperty float y\nproperty float z\n"
+              "property uchar red\nproperty uchar green\nproperty uchar blue\n"
+              "element face {}\nproperty list uchar int vertex_indices\nend_header\n")
+    quad, triangle = [0, 1, 2, 3], [1, 4, 2]
+    fans = {4: [[0, 1, 2], [0, 2, 3]], 3: [[1, 4, 2]]}
+    # The last faces smaller than the previous ones (partial faces read)
+    for faces in ([quad, triangle, triangle, quad], [quad, triangle],
+                  [triangle, quad, triangle]):
+        expected = [fan for face in faces for fan in fans[len(face)]]
+        for format in ["ascii", "binary_little_endian", "binary_big_endian"]:
+            filename = str(tmpdir.join(format + ".ply"))
+            order = ">" if format == "binary_big_endian" else "<"
+            with open(filename, "wb") as file:
+                file.write(header.format(format, len(faces)).encode("ascii"))
+                if format == "ascii":
+                    for vertex, color in zip(vertices, colors):
+                        file.write("{} {} {} {} {} {}\n".format(*(list(vertex) + list(color))).encode("ascii"))
+                    for face in faces:
+                        file.write(" ".join(map(str, [len(face)] + face)).encode("ascii") + b"\n")
+                else:
+                    dtype = np.dtype([("P", order + "f4", (3,)), ("Cd", "u1", (3,))])
+                    data = np.empty(5, dtype)
+                    data["P"], data["Cd"] = vertices, colors
+                    file.write(data.tobytes())
+                    for face in faces:
+                        file.write(np.uint8(len(face)).tobytes())
+                        file.write(np.array(face, order + "i4").tobytes())
+            for chunk_size in [1, 2, 1 << 10]:
+                geometry = read_ply(filename, chunk_size=chunk_size)
+                assert np.array_equal(geometry.get_point_attrib("P"), vertices)
+                assert np.allclose(geometry.get_point_attrib("Cd"), [[1, 0, 0, 1]] * 5)
+                assert geometry.get_prim_attrib("Id").tolist() == expected
+    # Elements with lists before the faces are skipped (ascii) or rejected
+    header = ("ply\nformat {}\nelement vertex 3\n"
+              "property float x\nproperty float y\nproperty float z\n"
+              "element tristrips 1\nproperty list int int vertex_indices\n"
+              "element face 1\nproperty list uchar int vertex_indices\nend_header\n")
+    filename = str(tmpdir.join("strips.ply"))
+    with open(filename, "wb") as file:
+        file.write(header.format("ascii").encode("ascii"))
+        file.write(b"0 0 0\n1 0 0\n1 1 0\n3 0 1 2\n3 0 1 2\n")
+    assert read_ply(filename).get_prim_attrib("Id").tolist() == [[0, 1, 2]]
+    with open(filename, "wb") as file:
+        file.write(header.format("binary_little_endian").encode("ascii"))
+        file.write(vertices[:3].tobytes())
+        file.write(np.array([3, 0, 1, 2], "<i4").tobytes())
+    try:
+        read_ply(filename)
+        assert False
+    except ValueError:
+        pass
+
+def test_geometry_normals_and_bounds():
+    # Quad in the plane z=0 with two triangles
+    geometry = Geometry(vertices=[0, 0, 0, 1, 0, 0, 1, 1, 0, 0, 1, 0],
+                        indices=[0, 1, 2, 0, 2, 3],
+                        textcoords=[0, 0, 1, 0, 1, 1, 0, 1], size=[3, 3, None, None, 2])
+    assert np.allclose(geometry.get_prim_normals(), [[0, 0, 1]] * 2)
+    normals = geometry.get_normals()
+    assert normals.shape == (4, 3) and np.allclose(normals, [[0, 0, 1]] * 4)
+    # Results are cached until the positions are modified
+    assert geometry.get_normals() is normals
+    geometry.compute_normals()
+    assert "N" in geometry.tables["points"]
+    tangents = geometry.get_tangents()
+    assert np.allclose(tangents, [[1, 0, 0, 1]] * 4)
+    geometry.compute_tangents()
+    assert geometry.get_point_attrib("T").shape == (4, 4)
+    minimum, maximum = geometry.get_bounds()
+    assert list(minimum) == [0, 0, 0] and list(maximum) == [1, 1, 0]
+    center, radius = geometry.get_bounding_sphere()
+    assert np.allclose(center, [0.5, 0.5, 0]) and np.isclose(radius, np.sqrt(0.5))
+    # Move a point so the normals are area weighted
+    geometry.tables["points"].set("P", [1, 1, 1], rows=2)
+    assert geometry.get_normals() is not normals
+    expected = np.cross([1, 0, 0], [1, 1, 1]) + np.cross([1, 1, 1], [0, 1, 0])
+    assert np.allclose(geometry.get_normals()[0], expected / np.linalg.norm(expected))
+    assert list(geometry.get_bounds()[1]) == [1, 1, 1]
+
+def grid_soup(size):
+    """ Grid of quads where each triangle has its own points (soup) and
+    the triangles are shuffled
+    """
+    x, y = np.meshgrid(np.arange(size + 1.0), np.arange(size + 1.0))
+    positions = np.stack([x.ravel(), y.ravel(), np.zeros(x.size)], axis=1)
+    index = np.arange(len(positions)).reshape(size + 1, size + 1)
+    quads = np.stack([index[:-1, :-1], index[:-1, 1:], index[1:, 1:], index[1:, :-1]],
+                     axis=2).reshape(-1, 4)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    triangles = triangles[np.random.RandomState(0).permutation(len(triangles))]
+    return positions[triangles.ravel()], np.arange(triangles.size)
+
+def test_geometry_optimize():
+    positions, indices = grid_soup(20)
+    # Small noise that must be welded and a degenerate triangle
+    positions = positions + np.random.RandomState(1).uniform(-1e-7, 1e-7, positions.shape)
+    indices = np.concatenate([indices, [0, 0, 1]])
+    geometry = Geometry(vertices=positions.ravel(), indices=indices)
+    geometry.add_prim_attrib("M", np.arange(len(indices) // 3), size=1, dtype=np.int32)
+    stats = geometry.optimize(tolerance=1e-5)
+    assert stats["points"] == (len(positions), 21 * 21)
+    assert stats["triangles"] == (801, 800)
+    assert stats["acmr"][0] > 2.9 and stats["acmr"][1] < 1.0
+    indices = geometry.get_prim_attrib("Id")
+    assert indices.dtype == np.uint16 and indices.max() == 21 * 21 - 1
+    # Primitive attributes are reordered with the triangles
+    assert sorted(geometry.get_prim_attrib("M").ravel()) == list(range(800))
+    # Points are ordered by first use
+    first = np.unique(indices.ravel(), return_index=True)[1]
+    assert np.all(np.diff(first) > 0)
+    # Welding keeps points with different attributes apart
+    target = weld_vertices([[0, 0, 0], [0, 0, 0], [0, 0, 0]], 1e-3,
+                           [np.array([[0.0], [0.0], [1.0]])])
+    assert list(target) == [0, 0, 2]
+    # Points are compared with all the points of the cells (not the first)
+    target = weld_vertices([[0.0, 0.0, 0.0], [0.9, 0.9, 0.9], [0.95, 0.95, 0.95]], 1.0)
+    assert list(target) == [0, 1, 1]
+    points = np.random.RandomState(2).uniform(0.0, 1.0, (300, 3))
+    target = weld_vertices(points, 0.05)
+    near = np.linalg.norm(points[:, None] - points[None], axis=2) <= 0.05
+    assert np.all(target[np.nonzero(near)[0]] == target[np.nonzero(near)[1]])
+    assert acmr([[0, 1, 2], [2, 1, 3]]) == 2.0
+    assert sorted(reorder_triangles([[0, 1, 2], [3, 4, 5], [2, 1, 3]])) == [0, 1, 2]
+
+def test_geometry_lods():
+    from zero.core import Camera, Transform
+    from zero.system.render.render import RenderManager
+    x, y = np.meshgrid(np.linspace(-1, 1, 101), np.linspace(-1, 1, 101))
+    positions = np.stack([x.ravel(), y.ravel(), 0.1 * np.sin(4 * x.ravel())], axis=1)
+    index = np.arange(len(positions)).reshape(101, 101)
+    quads = np.stack([index[:-1, :-1], index[:-1, 1:], index[1:, 1:], index[1:, :-1]],
+                     axis=2).reshape(-1, 4)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    geometry = Geometry(vertices=positions.ravel(), indices=triangles.ravel())
+    geometry.compute_normals()
+    geometry.generate_lods(levels=3, ratio=0.25)
+    counts = [len(lod.get_prim_attrib("Id")) for lod in geometry.lods]
+    assert counts[0] == 20000 and all(count <= 20000 * 0.25 ** level
+                                      for level, count in enumerate(counts))
+    # The number of triangles is close to the target (clustering)
+    assert all(count >= 20000 * 0.25 ** level * 0.9 for level, count in enumerate(counts))
+    for target in (5000, 1000, 100):
+        count = len(simplify(positions, triangles, target)[1])
+        assert target * 0.9 <= count <= target
+    assert geometry.lod_sizes == [float("inf"), 0.5, 0.25, 0.125]
+    lod = geometry.lods[3]
+    assert lod.get_point_attrib("N").shape[1] == 3
+    assert np.allclose(np.linalg.norm(lod.get_point_attrib("N"), axis=1), 1.0)
+    # Simplified geometry keeps the bounds
+    assert np.allclose(lod.get_bounds()[0], geometry.get_bounds()[0], atol=0.1)
+    # Hysteresis around the limits of the levels
+    assert geometry.select_lod(1.0) == 0 and geometry.select_lod(0.3) == 1
+    assert geometry.select_lod(0.01) == 3
+    assert geometry.select_lod(0.49, current=0) == 0
+    assert geometry.select_lod(0.44, current=0) == 1
+    assert geometry.select_lod(0.52, current=1) == 1
+    assert geometry.select_lod(0.56, current=1) == 0
+    # Dense scene: the render only uses a fraction of the triangles
+    class Engine(object):
+        render = None
+    class Node(object):
+        def __init__(self, id):
+            self.id = id
+    manager = RenderManager(Engine())
+    camera = Camera(position=[0.0, 0.0, 0.0])
+    total, rendered = 0, 0
+    for index, distance in enumerate(np.linspace(2.0, 200.0, 100)):
+        transform = Transform([0.0, 0.0, float(distance)])
+        lod = manager.select_lod(Node(index), geometry, transform, camera)
+        total += 20000
+        rendered += len(lod.get_prim_attrib("Id"))
+        assert manager.select_lod(Node(index), geometry, transform, camera) is lod
+        # The sphere for the depth (same geometry) is taken from the cache
+        cached = manager._spheres[index]
+        manager._world_sphere(Node(index), geometry, transform)
+        assert manager._spheres[index] is cached
+    assert rendered * 10 < total
+
+def test_geometry_groups(monkeypatch):
+    random = np.random.RandomState(0)
+    size = 1000
+    sparse = GeometryGroup.from_indices([5, 3, 3, 900], size)
+    dense = GeometryGroup.from_mask(random.rand(size) > 0.5)
+    other = GeometryGroup.from_mask(random.rand(size) > 0.7)
+    assert not sparse.dense and dense.dense and len(sparse) == 3
+    assert 5 in sparse and 4 not in sparse and 1000 not in sparse
+    # Set algebra matches the python sets for all the representations
+    for a, b in [(sparse, dense), (dense, sparse), (dense, other),
+                 (sparse, GeometryGroup.from_indices([3, 7], size))]:
+        sa, sb = set(a), set(b)
+        assert set(a | b) == sa | sb and set(a & b) == sa & sb
+        assert set(a - b) == sa - sb and set(a ^ b) == sa ^ sb
+    assert set(~dense) == set(range(size)) - set(dense) and len(~dense) == size - len(dense)
+    assert (dense & sparse) == GeometryGroup.from_indices(sorted(set(dense) & set(sparse)), size)
+    assert GeometryGroup.from_indices(range(10, 20), size).ranges().tolist() == [[10, 20]]
+    assert sparse.ranges().tolist() == [[3, 4], [5, 6], [900, 901]]
+    # Geometry groups: wrangle views (no copies) and draw ranges
+    geometry = Geometry(vertices=np.arange(36, dtype=np.float32),
+                        indices=np.arange(12, dtype=np.uint32))
+    geometry.add_point_group("top", geometry.get_point_attrib("P")[:, 1] > 10.0)
+    geometry.add_prim_group("last", [2, 3])
+    assert geometry.point_groups == ["top"] and geometry.prim_groups == ["last"]
+    assert list(geometry.get_point_group("top")) == [4, 5, 6, 7, 8, 9, 10, 11]
+    positions = geometry.get_point_attrib("P")
+    version = geometry.tables["points"].version
+    views = []
+    def wrangle(attributes):
+        views.append(attributes["P"])
+        attributes["P"][:, 2] = -1.0
+    geometry.wrangle(wrangle, names=["P"], group="top")
+    assert all(np.shares_memory(view, positions) for view in views)
+    assert np.all(positions[4:, 2] == -1.0) and np.all(positions[:4, 2] >= 0.0)
+    assert geometry.tables["points"].version > version
+    assert geometry.get_draw_ranges("last").tolist() == [[6, 6]]
+    assert geometry.get_draw_ranges().tolist() == [[0, 12]]
+    # Scattered groups are gathered and scattered back
+    geometry.wrangle_ranges = 1
+    geometry.wrangle(wrangle, names=["P"], group=GeometryGroup.from_indices([0, 2], 12))
+    assert positions[0, 2] == -1.0 and positions[1, 2] != -1.0
+    # Groups are resized with the points and remapped by optimize
+    geometry.tables["points"].append(count=2)
+    assert geometry.get_point_group("top").size == 14
+    geometry.remove_point_group("top")
+    assert geometry.point_groups == []
+    # Render only the ranges of the group
+    import zero.drivers.opengl.render as module
+    gl = RecordGL()
+    monkeypatch.setattr(module, "GL", gl)
+    class Buffer(object):
+        _VAO = 1
+    buffer = Buffer()
+    buffer.geometry = geometry
+    buffer.index_dtype = geometry.get_prim_attrib(Geometry.primitive.indices).dtype
+    buffer.count = geometry.get_prim_attrib(Geometry.primitive.indices).size
+    module.OpenGLRender().render(buffer, geometry.get_draw_ranges("last"))
+    draws = [args for name, args in gl.calls if name == "glDrawElements"]
+    assert len(draws) == 1 and draws[0][1] == 6 and draws[0][3].value == 6 * 4
+
+def test_geometry_groups_optimize():
+    positions, indices = grid_soup(8)
+    geometry = Geometry(vertices=positions.ravel(), indices=indices)
+    triangles = positions.reshape(-1, 3, 3)
+    selected = triangles[:, :, 0].mean(axis=1) < 4.0
+    geometry.add_prim_group("left", selected)
+    geometry.optimize()
+    group = geometry.get_prim_group("left")
+    assert len(group) == np.count_nonzero(selected)
+    positions = geometry.get_point_attrib("P")
+    centers = positions[geometry._triangles()][:, :, 0].mean(axis=1)
+    assert np.all(centers[group.indices()] < 4.0)
+    assert np.all(centers[(~group).indices()] >= 4.0)
+
+
+def test_transform_model_cache():
+    from zero.core import Transform
+    transform = Transform([1.0, 2.0, 3.0], [0.0, 90.0, 0.0], [2.0, 2.0, 2.0])
+    model = transform.model
+    version = transform.version
+    # The matrix is only computed once until the transform is modified
+    assert transform.model is model and not model.flags.writeable
+    assert np.allclose(model, transform._compute_model())
+    transform.position = [0.0, 0.0, 5.0]
+    assert transform.version > version and transform.model is not model
+    expected = Transform([0.0, 0.0, 5.0], [0.0, 90.0, 0.0], [2.0, 2.0, 2.0]).model
+    assert np.allclose(transform.model, expected)
+    transform.rotation, transform.scale = [0.0, 0.0, 0.0], [1.0, 1.0, 1.0]
+    assert np.allclose(transform.model[3, 0:3], [0.0, 0.0, 5.0])
+    # Inplace changes need to invalidate the transform
+    transform.position.x = 4.0
+    assert np.allclose(transform.model[3, 0:3], [0.0, 0.0, 5.0])
+    transform.invalidate()
+    assert np.allclose(transform.model[3, 0:3], [4.0, 0.0, 5.0])
+
+def test_transform_hierarchy():
+    from zero.core import Transform, TransformHierarchy
+    random = np.random.RandomState(0)
+    values = dict((key, (random.rand(3) * 4 - 2, random.rand(3) * 360, random.rand(3) + 0.5))
+                  for key in "abcd")
+    hierarchy = TransformHierarchy().build(["c", "d", "b", "a"], ["b", "a", "a", None])
+    # Parents are always before their children
+    assert hierarchy.keys[0] == "a"
+    assert np.all(hierarchy.parents < np.arange(len(hierarchy)))
+    for key, (position, rotation, scale) in values.items():
+        hierarchy.set(key, position, rotation, scale)
+    assert len(hierarchy.update()) == 4
+    model = dict((key, Transform(*map(list, value)).model.astype(np.float64))
+                 for key, value in values.items())
+    assert np.allclose(hierarchy.world_matrix("a"), model["a"], atol=1e-5)
+    assert np.allclose(hierarchy.world_matrix("c"), model["c"].dot(model["b"]).dot(model["a"]),
+                       atol=1e-4)
+    # Only the subtree modified is computed again
+    versions = hierarchy.versions.copy()
+    assert len(hierarchy.update()) == 0
+    rows = hierarchy.set("b", position=[0.0, 0.0, 0.0]).update()
+    assert sorted(hierarchy.keys[row] for row in rows) == ["b", "c"]
+    assert (hierarchy.versions > versions).sum() == 2
+    # Transformations are kept when the hierarchy is built again
+    world = hierarchy.world_matrix("d").copy()
+    hierarchy.build(["a", "d"], [None, "a"]).update()
+    assert np.allclose(hierarchy.world_matrix("d"), world)
+    try:
+        TransformHierarchy().build(["a", "b"], ["b", "a"])
+        assert False
+    except ValueError:
+        pass
+
+def test_transform_manager():
+    from zero.core import SceneGraph, Transform
+    from zero.system import TransformManager
+    root = SceneGraph.create_empty("root", position=[0.0, 1.0, 0.0])
+    child = SceneGraph.create_empty("child", position=[1.0, 0.0, 0.0])
+    leaf = SceneGraph.create_empty("leaf", position=[0.0, 0.0, 2.0])
+    root.set_children(children=[child])
+    child.set_children(children=[leaf])
+    transforms = [entity["transform"].transform for entity in (root, child, leaf)]
+    manager = TransformManager(None).init()
+    manager.run()
+    assert np.allclose(transforms[2].world[3, 0:3], [1.0, 1.0, 2.0])
+    assert np.allclose(transforms[0].world, transforms[0].model)
+    # Moving the root propagates to the children only once
+    versions = [transform.world_version for transform in transforms]
+    manager.run()
+    assert [transform.world_version for transform in transforms] == versions
+    transforms[0].position = [0.0, 5.0, 0.0]
+    manager.run()
+    assert np.allclose(transforms[2].world[3, 0:3], [1.0, 5.0, 2.0])
+    assert all(transform.world_version > version
+               for transform, version in zip(transforms, versions))
+    # Only the transforms modified are copied, without building again
+    copied, builds = [], []
+    copy, build = manager._copy, manager._build
+    manager._copy = lambda rows: (copied.append(list(rows)), copy(rows))
+    manager._build = lambda *args: (builds.append(args), build(*args))
+    manager.run()
+    assert copied == [] and builds == []
+    transforms[1].position = [2.0, 0.0, 0.0]
+    manager.run()
+    assert copied == [[manager._rows[id(transforms[1])]]] and builds == []
+    assert np.allclose(transforms[2].world[3, 0:3], [2.0, 5.0, 2.0])
+    # Transforms outside the hierarchy only build it again once
+    camera = Transform([0.0, 0.0, 10.0])
+    manager.run()
+    camera.position = [0.0, 0.0, 5.0]
+    manager.run()
+    assert len(builds) == 1
+    del manager._copy, manager._build
+    # Detached children use their own model
+    child.remove_children([leaf.id])
+    manager.run()
+    assert np.allclose(transforms[2].world[3, 0:3], [0.0, 0.0, 2.0])
+    for entity in (root, child, leaf):
+        entity.destroy()
+    manager.run()
+    assert transforms[0].world is transforms[0].model
+
+def test_opengl_resources(monkeypatch):
+    import OpenGL.GL as GL
+    import zero.drivers.opengl.buffer as buffer_module
+    import zero.drivers.opengl.shader as shader_module
+    import zero.drivers.opengl.texture as texture_module
+    from zero.drivers.opengl import OpenGLResources
+    gl = RecordGL(returns={"glGetShaderiv": GL.GL_TRUE, "glGetProgramiv": GL.GL_TRUE,
+                           "glGetAttribLocation": 0})
+    for module in (buffer_module, shader_module, texture_module):
+        monkeypatch.setattr(module, "GL", gl)
+    assets = os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT, "assets"))
+    image = os.path.join(assets, "images", "texture.png")
+    resources = OpenGLResources()
+    first, second = triangle(), triangle()
+    # Resources are created once and reused between frames
+    for frame in range(3):
+        shader = resources.shader("default_shader", os.path.join(assets, "shaders"))
+        for owner, geometry in (("a", first), ("b", second)):
+            resources.buffer(geometry, shader, owner)
+            resources.texture(image, owner)
+        resources.frame()
+    assert gl.count("glCreateProgram") == 1 and gl.count("glGenTextures") == 1
+    assert gl.count("glGenVertexArrays") == 2 and gl.count("glBufferData") == 4
+    assert len(resources) == 4 and resources.used > 0
+    # Buffers are only uploaded again when the geometry changes
+    first.tables["points"].touch("P")
+    resources.buffer(first, shader, "a")
+    assert gl.count("glBufferData") == 5
+    # Resources are deleted when all their owners are released
+    resources.release("a")
+    assert gl.count("glDeleteVertexArrays") == 1 and gl.count("glDeleteTextures") == 0
+    resources.release("b")
+    assert gl.count("glDeleteVertexArrays") == 2 and gl.count("glDeleteTextures") == 1
+    assert len(resources) == 1
+    # Least recently used resources are evicted over the budget
+    resources.buffer(first, shader, "a")
+    resources.budget = resources.used
+    resources.frame()
+    resources.buffer(second, shader, "b")
+    resources.frame()
+    assert ("buffer", id(first), id(shader), buffer_module.UsageMode.static_draw) not in resources
+    assert resources.used <= resources.budget
+    count = gl.count("glGenVertexArrays")
+    resources.buffer(first, shader, "a")
+    assert gl.count("glGenVertexArrays") == count + 1
+    resources.clear()
+    assert len(resources) == 0 and resources.disposed == resources.created
+
+
+def test_render_queue(monkeypatch, tmpdir):
+    import shutil
+    import OpenGL.GL as GL
+    from zero.core import SceneGraph, Camera, Material
+    from zero.system.render import RenderManager, radix_sort
+    import zero.drivers.opengl.buffer as buffer_module
+    import zero.drivers.opengl.shader as shader_module
+    import zero.drivers.opengl.texture as texture_module
+    import zero.drivers.opengl.render as render_module
+    keys = np.random.RandomState(0).randint(0, 1 << 62, 1000).astype(np.uint64)
+    keys[::7] = keys[0]
+    assert np.array_equal(radix_sort(keys), np.argsort(keys, kind="stable"))
+    gl = RecordGL(returns={"glGetShaderiv": GL.GL_TRUE, "glGetProgramiv": GL.GL_TRUE,
+                           "glGetAttribLocation": 0})
+    for module in (buffer_module, shader_module, texture_module, render_module):
+        monkeypatch.setattr(module, "GL", gl)
+    assets = os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT, "assets"))
+    images = [str(tmpdir.join("texture{}.png".format(index))) for index in range(2)]
+    for image in images:
+        shutil.copy(os.path.join(assets, "images", "texture.png"), image)
+    monkeypatch.setattr(RenderManager, "default_shader",
+                        ("default_shader", os.path.join(assets, "shaders")))
+    monkeypatch.setattr(RenderManager, "instance_threshold", 1 << 30)
+    monkeypatch.setattr(RenderManager, "static_batching", False)
+    class Engine(object):
+        render = None
+    # Entities interleaving two geometries and two materials
+    geometries, materials = [triangle(), triangle()], [Material(image) for image in images]
+    camera = SceneGraph.create_camera(camera=Camera(position=[0.0, 0.0, -3.0]))
+    entities = [SceneGraph.create_geometry("object{}".format(index),
+                                           position=[float(index), 0.0, 0.0],
+                                           geometry=geometries[index % 2],
+                                           material=materials[(index // 2) % 2])
+                for index in range(8)]
+    manager = RenderManager(Engine())
+    manager.run()
+    start = len(gl.calls)
+    manager.run()
+    frame = gl.calls[start:]
+    count = lambda name: sum(1 for call in frame if call[0] == name)
+    # Changes of state: one program, two textures and one VAO for each
+    # geometry and texture (sorted by texture first)
+    stats = manager.stats
+    assert stats["draws"] == 8 and stats["programs"] == 1 and stats["textures"] == 2
+    assert stats["vertex_arrays"] == 4 and stats["uniforms"] == 2 + 8
+    assert count("glUseProgram") == 2 and count("glBindTexture") == 2
+    assert count("glBindVertexArray") == 4 + 1 and count("glUniformMatrix4fv") == 10
+    assert count("glGenVertexArrays") == 0 and count("glGenTextures") == 0
+    for entity in entities + [camera]:
+        entity.destroy()
+
+def test_render_instancing(monkeypatch):
+    import OpenGL.GL as GL
+    from zero.core import SceneGraph, Camera
+    from zero.system.render import RenderManager
+    import zero.drivers.opengl.buffer as buffer_module
+    import zero.drivers.opengl.shader as shader_module
+    import zero.drivers.opengl.texture as texture_module
+    import zero.drivers.opengl.render as render_module
+    import zero.drivers.opengl.instance as instance_module
+    gl = RecordGL(returns={"glGetShaderiv": GL.GL_TRUE, "glGetProgramiv": GL.GL_TRUE,
+                           "glGetAttribLocation": 0})
+    for module in (buffer_module, shader_module, texture_module, render_module,
+                   instance_module):
+        monkeypatch.setattr(module, "GL", gl)
+    assets = os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT, "assets"))
+    for name in ("default_shader", "instanced_shader"):
+        monkeypatch.setattr(RenderManager, name, (name, os.path.join(assets, "shaders")))
+    monkeypatch.setattr(RenderManager, "default_texture",
+                        os.path.join(assets, "images", "texture.png"))
+    class Engine(object):
+        render = None
+    # Forest of identical props (same geometry and default material)
+    geometry = triangle()
+    camera = SceneGraph.create_camera(camera=Camera(position=[0.0, 0.0, -3.0]))
+    entities = [SceneGraph.create_geometry("prop{}".format(index),
+                                           position=[float(index), 0.0, 0.0],
+                                           geometry=geometry)
+                for index in range(100)]
+    manager = RenderManager(Engine())
+    manager.run()
+    stats = manager.stats
+    assert stats["draws"] == 1 and stats["instances"] == 100
+    assert gl.count("glDrawElementsInstanced") == 1 and gl.count("glDrawElements") == 0
+    assert gl.count("glVertexAttribDivisor") == 4
+    # Matrices are only uploaded again when the transforms change
+    uploads = gl.count("glBufferSubData") + gl.count("glBufferData")
+    manager.run()
+    assert gl.count("glBufferSubData") + gl.count("glBufferData") == uploads
+    entities[5]["transform"].transform.position = [0.0, 5.0, 0.0]
+    manager.run()
+    assert gl.count("glBufferSubData") + gl.count("glBufferData") == uploads + 1
+    assert gl.count("glDrawElementsInstanced") == 3
+    for entity in entities + [camera]:
+        entity.destroy()
+
+def test_render_indirect_instances(monkeypatch, tmpdir):
+    import shutil
+    import OpenGL.GL as GL
+    from zero.core import SceneGraph, Camera, Material
+    from zero.system.render import RenderManager
+    import zero.drivers.opengl.buffer as buffer_module
+    import zero.drivers.opengl.shader as shader_module
+    import zero.drivers.opengl.texture as texture_module
+    import zero.drivers.opengl.render as render_module
+    import zero.drivers.opengl.instance as instance_module
+    gl = RecordGL(returns={"glGetShaderiv": GL.GL_TRUE, "glGetProgramiv": GL.GL_TRUE,
+                           "glGetAttribLocation": 0})
+    for module in (buffer_module, shader_module, texture_module, render_module,
+                   instance_module):
+        monkeypatch.setattr(module, "GL", gl)
+    assets = os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT, "assets"))
+    for name in ("default_shader", "instanced_shader"):
+        monkeypatch.setattr(RenderManager, name, (name, os.path.join(assets, "shaders")))
+    monkeypatch.setattr(RenderManager, "static_batching", False)
+    images = [str(tmpdir.join("texture{}.png".format(index))) for index in range(2)]
+    for image in images:
+        shutil.copy(os.path.join(assets, "images", "texture.png"), image)
+    class Engine(object):
+        render = None
+    camera = SceneGraph.create_camera(camera=Camera(position=[0.0, 0.0, -3.0]))
+    # Entities drawing the same sub-mesh of a shared geometry
+    positions, indices = grid_soup(2)
+    geometry = Geometry(vertices=positions.ravel(), indices=indices)
+    geometry.add_prim_group("half", [0, 1, 2])
+    entities = [SceneGraph.create_geometry("part{}".format(index),
+                                           position=[float(index), 0.0, 0.0],
+                                           geometry=geometry, material=Material(images[0]))
+                for index in range(4)]
+    for entity in entities:
+        entity["render"].group = "half"
+    # Two materials of the same geometry share the buffer and the instances
+    shared, materials = triangle(), [Material(image) for image in images]
+    entities += [SceneGraph.create_geometry("prop{}".format(index),
+                                            position=[0.0, float(index), 0.0],
+                                            geometry=shared, material=materials[index % 2])
+                 for index in range(6)]
+    manager = RenderManager(Engine())
+    start = len(gl.calls)
+    manager.run()
+    frame = gl.calls[start:]
+    draws = [args for name, args in frame if name == "glMultiDrawElementsIndirect"]
+    assert len(draws) == 1 and draws[0][3] == 4
+    uploads = [args[2] for name, args in frame
+               if name == "glBufferData" and args[0] == GL.GL_DRAW_INDIRECT_BUFFER]
+    first, count = geometry.get_draw_ranges("half")[0]
+    assert uploads[0].tolist() == [[count, 1, first, 0, base] for base in range(4)]
+    bases = [args[-1] for name, args in frame
+             if name == "glDrawElementsInstancedBaseVertexBaseInstance"]
+    assert sorted(bases) == [0, 3]
+    assert len([key for key in manager.resources._entries if key[0] == "instances"]) == 2
+    assert manager.stats["draws"] == 3 and manager.stats["instances"] == 10
+    for entity in entities + [camera]:
+        entity.destroy()
+
+def test_static_batching(monkeypatch, tmpdir):
+    import shutil
+    import OpenGL.GL as GL
+    from zero.core import SceneGraph, Camera, Material, merge_geometries
+    from zero.system.render import RenderManager, StaticBatcher
+    import zero.drivers.opengl.buffer as buffer_module
+    import zero.drivers.opengl.shader as shader_module
+    import zero.drivers.opengl.texture as texture_module
+    import zero.drivers.opengl.render as render_module
+    # Points are transformed into world space and indices offset
+    matrix = np.identity(4)
+    matrix[3, :3] = [1.0, 2.0, 3.0]
+    merged, ranges = merge_geometries([triangle(), triangle()], [np.identity(4), matrix])
+    positions = triangle().get_point_attrib(Geometry.point.position)
+    result = merged.get_point_attrib(Geometry.point.position)
+    assert np.allclose(result[:3], positions) and np.allclose(result[3:], positions + [1, 2, 3])
+    assert merged.get_prim_attrib(Geometry.primitive.indices).dtype == np.uint16
+    assert ranges.tolist() == [[0, 3], [3, 3]]
+    assert np.allclose(merged.get_bounds()[1], positions.max(axis=0) + [1, 2, 3])
+    gl = RecordGL(returns={"glGetShaderiv": GL.GL_TRUE, "glGetProgramiv": GL.GL_TRUE,
+                           "glGetAttribLocation": 0})
+    for module in (buffer_module, shader_module, texture_module, render_module):
+        monkeypatch.setattr(module, "GL", gl)
+    assets = os.path.normpath(os.path.join(SCRIPT_DIR, PACKAGE_PARENT, "assets"))
+    images = [str(tmpdir.join("texture{}.png".format(index))) for index in range(2)]
+    for image in images:
+        shutil.copy(os.path.join(assets, "images", "texture.png"), image)
+    monkeypatch.setattr(RenderManager, "default_shader",
+                        ("default_shader", os.path.join(assets, "shaders")))
+    # Two batches for each material (two triangles each)
+    monkeypatch.setattr(StaticBatcher, "max_points", 6)
+    class Engine(object):
+        render = None
+    materials = [Material(image) for image in images]
+    camera = SceneGraph.create_camera(camera=Camera(position=[0.0, 0.0, -3.0]))
+    entities = [SceneGraph.create_geometry("static{}".format(index),
+                                           position=[float(index), 0.0, 0.0],
+                                           geometry=triangle(),
+                                           material=materials[index % 2])
+                for index in range(8)]
+    manager = RenderManager(Engine())
+    manager.run()
+    assert manager.stats["draws"] == 4 and len(manager.batcher) == 4
+    assert manager.batcher.rebuilds == 4
+    # Bounds of each batch (world space) with the points of its entities
+    offsets = dict((entity.id, [float(index), 0.0, 0.0])
+                   for index, entity in enumerate(entities))
+    for batch in manager.batcher.batches.values():
+        points = np.concatenate([positions + offsets[key] for key in batch.keys])
+        assert np.allclose(batch.bounds[0], points.min(axis=0))
+        assert np.allclose(batch.bounds[1], points.max(axis=0))
+        center, radius = batch.sphere
+        assert np.all(np.linalg.norm(points - center, axis=1) <= radius + 1e-5)
+    manager.run()
+    assert manager.batcher.rebuilds == 0 and gl.count("glGenVertexArrays") == 4
+    # Only the batch of the entity moved is merged again
+    entities[0]["transform"].transform.position = [0.0, 5.0, 0.0]
+    manager.run()
+    assert manager.batcher.rebuilds == 1 and gl.count("glGenVertexArrays") == 5
+    assert manager.stats["draws"] == 4 and gl.count("glDeleteVertexArrays") == 1
+    # Entities keep their slot, removing one only merges its batch again
+    slots = dict((key, batch.keys) for key, batch in manager.batcher.batches.items())
+    removed = entities.pop(3)
+    removed.destroy()
+    manager.run()
+    assert manager.batcher.rebuilds == 1 and len(manager.batcher) == 4
+    changed = [key for key, batch in manager.batcher.batches.items()
+               if batch.keys != slots[key]]
+    assert len(changed) == 1 and removed.id in slots[changed[0]]
+    assert set(slots[changed[0]]) - set(manager.batcher.batches[changed[0]].keys) == {removed.id}
+    # New entities (same geometry below the threshold) fill the free slot first
+    shared = triangle()
+    entities += [SceneGraph.create_geometry("shared{}".format(index), geometry=shared,
+                                            material=materials[1])
+                 for index in range(2)]
+    manager.run()
+    assert manager.batcher.rebuilds == 2 and len(manager.batcher) == 5
+    keys = manager.batcher.batches[changed[0]].keys
+    assert len(keys) == 2 and len(set(keys) & {entity.id for entity in entities[-2:]}) == 1
+    assert manager.stats["draws"] == 5
+    for entity in entities + [camera]:
+        entity.destroy()
+
+def test_render_draw_commands(monkeypatch):
+    import OpenGL.GL as GL
+    from zero.core import Camera
+    from zero.system.render import RenderQueue
+    import zero.drivers.opengl.buffer as buffer_module
+    import zero.drivers.opengl.render as render_module
+    gl = RecordGL()
+    for module in (buffer_module, render_module):
+        monkeypatch.setattr(module, "GL", gl)
+    positions, indices = grid_soup(2)
+    geometry = Geometry(vertices=positions.ravel(), indices=indices)
+    buffer = buffer_module.OpenGLBuffer(geometry, RecordShader())
+    buffer.update()
+    render = render_module.OpenGLRender()
+    # Draw the real number of indices (and points if not indexed)
+    render.draw(buffer)
+    draw = [args for name, args in gl.calls if name == "glDrawElements"][-1]
+    assert draw[1] == 24 and draw[2] == GL.GL_UNSIGNED_INT and buffer.count == 24
+    soup = buffer_module.OpenGLBuffer(Geometry(vertices=positions.ravel()), RecordShader())
+    soup.update()
+    render.draw(soup)
+    assert [args for name, args in gl.calls if name == "glDrawArrays"][-1][1:] == (0, 24)
+    # Indices modified are uploaded again
+    geometry.add_indices(indices[:12].astype(np.uint16), dtype=np.uint16)
+    buffer.update()
+    render.draw(buffer)
+    draw = [args for name, args in gl.calls if name == "glDrawElements"][-1]
+    assert draw[1] == 12 and draw[2] == GL.GL_UNSIGNED_SHORT
+    assert buffer.nbytes == positions.astype(np.float32).nbytes + 12 * 2
+    # Commands for the multi-draw indirect
+    commands = render.commands(buffer, [[0, 3], [6, 6]])
+    assert commands.dtype == np.uint32
+    assert commands.tolist() == [[3, 1, 0, 0, 0], [6, 1, 6, 0, 0]]
+    assert render.commands(soup, [[3, 3]], instances=4).tolist() == [[3, 4, 3, 0]]
+    # Ranges with base vertex, base instance and instances of each draw
+    assert render.commands(buffer, [[6, 3, 2, 5, 4]]).tolist() == [[3, 4, 6, 2, 5]]
+    assert render.commands(soup, [[6, 3, 0, 5, 4]]).tolist() == [[3, 4, 6, 5]]
+    # Sub-meshes of the same buffer and world are drawn with one call
+    class Shader(object):
+        def use(self, value=True):
+            pass
+        def update(self, name, value):
+            pass
+    render.indirect = True
+    queue, shader, world = RenderQueue(), Shader(), np.identity(4)
+    for first in (0, 3, 9):
+        queue.add(shader, None, buffer, world, ranges=[[first, 3]])
+    start = len(gl.calls)
+    stats = queue.submit(render, Camera())
+    frame = gl.calls[start:]
+    draws = [args for name, args in frame if name == "glMultiDrawElementsIndirect"]
+    assert stats["draws"] == 1 and stats["instances"] == 3 and len(draws) == 1
+    assert draws[0][1] == GL.GL_UNSIGNED_SHORT and draws[0][3] == 3
+    uploads = [args for name, args in frame if name == "glBufferData"]
+    assert uploads[0][0] == GL.GL_DRAW_INDIRECT_BUFFER
+    assert uploads[0][2].tolist() == [[3, 1, 0, 0, 0], [3, 1, 3, 0, 0], [3, 1, 9, 0, 0]]
+    # Items without texture don't bind any (no changes of state)
+    assert stats["textures"] == 0
+    # Without multi-draw the ranges are drawn (and counted) one by one
+    render.indirect = False
+    stats = queue.submit(render, Camera())
+    assert stats["draws"] == 3 and stats["instances"] == 3
@@ -8,8 +8,10 @@ class RenderComponent(Component):
     # Defaut type/name the component will have
     DEFAULT_TYPE = "render"
 
+    # Group is the name of the primitive group to render (None for all)
     defaults = dict({"mode" : "triangles", 
-                     "usage": "static_draw"})
+                     "usage": "static_draw",
+                     "group": None})
 
     def __init__(self, *args, **kwargs):
         """ Render initialization
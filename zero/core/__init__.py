@@ -2,8 +2,8 @@ from __future__ import absolute_import, division, print_function
 
 # Base Catalogue
 from .base.utils import *
-from .base import ( Base, Defaults, DBase, Datasheet, Thread,
-                    EntityCatalogue, Component, Entity, 
+from .base import ( Base, Defaults, DBase, Datasheet, Thread, AttributeTable,
+                    EntityCatalogue, Component, Entity, CommandBuffer,
                     Event,Actions,Action,
                     Settings )
 
@@ -16,6 +16,13 @@ from .geometry import ( Camera,ProjectionType,
                         Geometry, Material, Transform )
 
 from .geometry.create import *
+from .geometry.cache import *
+from .geometry.importers import *
+from .geometry.optimize import *
+from .geometry.simplify import *
+from .geometry.group import *
+from .geometry.hierarchy import *
+from .geometry.batch import *
 
 # Controllers Package
 from .controllers import ( Device, DeviceController, Display, DisplayController,
@@ -26,6 +33,7 @@ from .controllers import ( Device, DeviceController, Display, DisplayController,
 
 # Main classes Engine and Scene Graph
 from .engine import CoreEngine
+from .scheduler import SystemScheduler
 from .scene import SceneGraph
 
 
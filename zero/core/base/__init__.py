@@ -1,8 +1,10 @@
 from __future__ import absolute_import, division, print_function
 
 from .base import Base, Defaults, DBase, Datasheet, Thread
+from .table import AttributeTable
 from .events import Event, Actions, Action
 from .ecs import EntityCatalogue, Entity, Component
+from .commands import CommandBuffer
 from .settings import Settings
 from .utils import *
 
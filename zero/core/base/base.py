@@ -1,9 +1,9 @@
 from collections import OrderedDict as dict
 import threading
 import numpy as np
-import pandas as pd
 import uuid
 from .utils import *
+from .table import AttributeTable
 
 __all__ = ['Base', 
            'Defaults',
@@ -117,12 +117,20 @@ class Base(object):
 
             Base.DEFAULT_UUID = Base.UUID1
 
+        Ids are converted into strings, except for Base.HANDLE. In this case the
+        ids will be compact integer handles (index + generation) that can be
+        used directly as indexes and be checked whether they are stale or not.
+
+            Base.DEFAULT_UUID = Base.HANDLE
+            Base.HANDLE.is_valid(base.id)
+
     """
 
     # Available UUID functions
     UUID1 = uuid.uuid1 # make a UUID based on the host ID and current time
     UUID4 = uuid.uuid4 # make a random UUID
     COUNTER = BasicCounter(1)
+    HANDLE = HandleAllocator() # make an int64 handle (index + generation)
 
     # Default UUID
     DEFAULT_UUID = UUID4
@@ -150,7 +158,7 @@ class Base(object):
             setattr(self, key, value)
         # Initialize custom paremters if none
         self.name = self.name or self.__class__.__name__
-        self.id = self.id or str(Base.DEFAULT_UUID()) 
+        self.id = self.id or Base.create_id()
         self.type = self.type or self.DEFAULT_TYPE or self.__class__.__name__
 
     def __del__(self):
@@ -158,6 +166,20 @@ class Base(object):
         """
         pass
 
+    def create_id():
+        """ Create a new id using the default UUID function
+        """
+        if isinstance(Base.DEFAULT_UUID, HandleAllocator):
+            return Base.DEFAULT_UUID()
+        return str(Base.DEFAULT_UUID())
+
+    def release_ids(ids):
+        """ Release the ids given so they can be reused. This is
+        only needed for integer handles.
+        """
+        if isinstance(Base.DEFAULT_UUID, HandleAllocator):
+            Base.DEFAULT_UUID.free_many(id for id in ids if isinstance(id, int))
+
     def __str__(self):
         """Returns the string representation of this instance
         """
@@ -352,8 +374,8 @@ class Datasheet(DBase):
     """ Data Base Class
 
         This element will create and store all the elements in
-        small dataframes. Data frames can be accessed by a 
-        Key methods sinde the are going to e stored in a dict.
+        tables of attributes. Tables can be accessed by a Key
+        methods since the are going to be stored in a dict.
 
         This class manages two types of collections data and 
         attrbiutes that are connected together. The attributes
@@ -364,11 +386,19 @@ class Datasheet(DBase):
         Parameters:
             name, id and type wil be inherited from Base
 
-            data: Dictionary with the data that will be stored
+            tables: Dictionary with the tables that will be stored
                   In case we want to store "People", "Product"
-                  we will have two items. Inside each item wwill 
-                  store a data frame with the attributes.
-                  data.keys() = ["People","Product"]
+                  we will have two items. Inside each item will
+                  store an AttributeTable with the attributes.
+                  tables.keys() = ["People","Product"]
+
+                  Each attribute is stored in a contiguous numpy
+                  array with shape (n, size), so get() returns the
+                  values without any copy.
+
+            data: Dictionary with pandas dataframes for each table.
+                  The dataframes are only created when requested
+                  so they must be used only for debugging.
 
             attributes: Attributes will be stored per data index.
                  In previous example we will have different attributes
@@ -379,8 +409,8 @@ class Datasheet(DBase):
                  atttributes["Person"]["P"] = ["Px","Py","Pz"]
 
                  This means attributes that more size tham 1, will
-                 be divided into multiple indexes, x, y and z.
-                 See multiple_index = ["x","y","z","w"]
+                 be divided into multiple columns in the dataframe,
+                 x, y and z. See multiple_index = ["x","y","z","w"]
 
                  How ever to access to this attribute, it's only needed
                  the first part atttributes["Person"]["P"], since the
@@ -390,104 +420,48 @@ class Datasheet(DBase):
     """
 
     # Slots to fix Memory allocation and ensure integrity in the data
-    __slots__ = ["name","id","type","data","attributes"] 
+    __slots__ = ["name","id","type","tables"] 
 
     # Declare the subindex that will be used for multiple (vector) attribites
-    multiple_index = ["x","y","z","w"]
+    multiple_index = AttributeTable.multiple_index
+
+    @property
+    def data(self):
+        """ Return the dataframes for all the tables (debugging)
+        """
+        return dict((index, table.dataframe()) for index, table in self.tables.items())
+
+    @property
+    def attributes(self):
+        """ Return the columns for all the attributes in the tables
+        """
+        return dict((index, dict((name, table.columns(name)) for name in table))
+                    for index, table in self.tables.items())
 
     def __init__(self, *args, **kwargs):
         """This is the main contructor of the class.
 
         """
         super(Datasheet,self).__init__(*args,**kwargs)
-        # Initialize data variable where dataframe will be stored
-        self.data = dict()
-        # Initialize groups for attribute in Data frames
-        self.attributes = dict()
+        # Initialize the tables where the attributes will be stored
+        self.tables = dict()
    
     def __del__(self):
         # Dispose all the objects and memory allocated
         pass
-    
-    def _create_attribute(self, df, name, size=3, values=None, default=None, dtype=None):
-        """ This will create a n Attribute inside the current df.
-        
-        Parameters:
-            df: dataframe where the attribute will be created
-            name: name for the new attribute to create.
-            size: if value has 3 elements (vector) or scalar 1
-                -> if size > 1 the attrribute will be splitted in
-                  different columns inside the data. The new columns
-                  will depend on the multiple_index
-            values: The values that will be set by default if any.
-            default: value that will be set if no values are defined.
-                -> If no values and not default the function will return
-                  without performing any operation.
-            dtype: type of the data that will be inserted. For example,
-            np.float32, np.int32, etc...
-
-        """
-        #Check the data type if any
-        if dtype is None:
-            if empty(values):
-                # Assign a default value
-                dtype = np.float32
-            else:
-                # Get the type from the values
-                if not isinstance(values,(np.ndarray)):
-                    # If not numpy then get the numppy array 
-                    values = np.array(values)
-                #Finally get the type from the numpy array
-                dtype = values.dtype 
-        # Check any values or default values has been provided
-        if empty(values) and empty(default):
-            if df is None or df.empty:
-                # If nothing to add exit the function
-                return None
-            else:
-                # Create a default value (float)
-                default = np.zeros((size), dtype=dtype)
-        # Check the index value depending on the size
-        if size > 1:
-            columns = [name + self.multiple_index[i] for i in range(size)]
-        else:
-            columns = [name]
-        # Check if values has been already defined
-        if empty(values) and (df is not None and not df.empty):
-            # create an array with the same number of rows as the current
-            values = np.tile(default,(len(df.index)))
-        # Reshape the values [ Maybe should be normalized and flatten]
-        values = np.array(np.reshape(values,(-1, size)),dtype=dtype)
-        # Check if the DataFrame is empty
-        if df is None or df.empty:
-            # Add the current data into the attributes frame
-            df = pd.DataFrame(values,columns=columns)
-        else:
-            # Add the current data into the attributes frame
-            dfvalues = pd.DataFrame(values,columns=columns)
-            # Append both dataframes
-            df = pd.merge(df, dfvalues,how='inner',left_index=True,right_index=True)
-        # Set the columns into the the current Point attribute
-        return (df, columns)
 
     def get(self, index, name):
-        return self.data[index][self.attributes[index][name]].values
+        return self.tables[index].get(name)
 
     def remove(self, index, name):
-        self.data[index].drop(self.attributes[index][name],axis=1,inplace=True)
+        self.tables[index].remove(name)
 
     def add(self, index, name, values=None, size=3, default=None, dtype=None):
-        # Check if current data frame is not create
-        if (index not in self.data):
-            self.data[index] = pd.DataFrame()
-            self.attributes[index] = dict()
-        # Get the new attribute and dataframe
-        result = self._create_attribute(self.data[index],name,size,values,default,dtype)
-        if not empty(result):
-            # Set the returned dataframe with the new attribute
-            self.data[index] = result[0]
-            # Set the columns into the the current attribute
-            self.attributes[index][name] = result[1]
+        # Check if current table is not create
+        if (index not in self.tables):
+            self.tables[index] = AttributeTable()
+        # Add the new attribute into the table
+        self.tables[index].add(name, values, size, default, dtype)
 
     def __str__(self):
         """Returns the string representation of this instance
@@ -495,14 +469,14 @@ class Datasheet(DBase):
         # Get parents string represenation
         #base = super(DataBase, self).__str__()
         current = ""
-        for item in self.data:
+        for item in self.tables:
             # Get the list of attributes
             current += "-----------------------------------------------------------\n"
             current += " {}\n".format(item)
             current += "-----------------------------------------------------------\n"
             current += str(self.attributes[item]) + "\n"
             current += "-----------------------------------------------------------\n"
-            current += self.data[item].head().to_string()  + "\n"
+            current += self.tables[item].dataframe().head().to_string()  + "\n"
             current += "-----------------------------------------------------------\n"
 
         # Returns the base and 
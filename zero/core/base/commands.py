@@ -0,0 +1,171 @@
+from collections import OrderedDict as dict
+import threading
+from .base import Base
+from .ecs import Entity
+
+__all__ = ['CommandBuffer']
+
+class CommandBuffer(object):
+    """ CommandBuffer class.
+
+    Systems could create or remove entities and components while they
+    are iterating over the catalogue (i.e. scripts executed by inputs).
+    Instead of modifying the catalogue immediately, the changes are
+    recorded into a command buffer and applied later, at a sync point,
+    when no system is iterating.
+
+        commands = CommandBuffer()
+        for entity in catalogue.query("input"):
+            commands.despawn(entity)
+        commands.flush()
+
+    Commands are applied in the same order they were recorded. However
+    consecutive commands of the same type are merged, so for example
+    all the entities despawned are removed at once and the catalogue
+    is only notified once per group.
+
+    The commands that can be recorded are:
+
+        spawn(cls, components, name, active): create new entities
+        despawn(entity): remove the entity and its components
+        add(entity, components): add components to the entity
+        remove(entity, components): remove components from the entity
+        set(component, **properties): modify the properties
+        call(function, *args, **kwargs): call any other function
+
+    Recording is thread-safe, so systems running in parallel can share
+    the same command buffer.
+    """
+
+    # Types of commands
+    SPAWN = 0
+    DESPAWN = 1
+    ADD = 2
+    REMOVE = 3
+    SET = 4
+    CALL = 5
+
+    def __init__(self):
+        """ Initialize the list of commands
+        """
+        self._commands = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """ Return the number of commands recorded
+        """
+        return len(self._commands)
+
+    def _record(self, command, key, data):
+        """ Record a new command. Key is used to know which commands
+        could be merged together.
+        """
+        with self._lock:
+            self._commands.append((command, key, data))
+
+    def spawn(self, cls=Entity, components=None, name=None, active=True):
+        """ Record the creation of an entity. Components must be the
+        list of Component classes to create with the entity.
+        """
+        components = tuple(components or [])
+        self._record(CommandBuffer.SPAWN, (cls, components, name, active), None)
+
+    def despawn(self, entity):
+        """ Record the removal of an entity (object or id)
+        """
+        self._record(CommandBuffer.DESPAWN, None, entity)
+
+    def add(self, entity, components):
+        """ Record the components (objects or ids) to add to the entity
+        """
+        self._record(CommandBuffer.ADD, None, (entity, components))
+
+    def remove(self, entity, components):
+        """ Record the components (ids) to remove from the entity
+        """
+        self._record(CommandBuffer.REMOVE, None, (entity, components))
+
+    def set(self, component, **properties):
+        """ Record the properties to set into the component
+        """
+        self._record(CommandBuffer.SET, None, (component, properties))
+
+    def call(self, function, *args, **kwargs):
+        """ Record any other function to be called at the sync point
+        """
+        self._record(CommandBuffer.CALL, None, (function, args, kwargs))
+
+    def clear(self):
+        """ Remove all the commands recorded without applying them
+        """
+        with self._lock:
+            del self._commands[:]
+
+    def flush(self):
+        """ Apply all the commands recorded. Consecutive commands of the
+        same type are applied at once. Return the entities spawned.
+        """
+        with self._lock:
+            commands, self._commands = self._commands, []
+        spawned = []
+        start = 0
+        while start < len(commands):
+            command, key = commands[start][:2]
+            end = start + 1
+            while end < len(commands) and commands[end][:2] == (command, key):
+                end += 1
+            data = [commands[index][2] for index in range(start, end)]
+            if command == CommandBuffer.SPAWN:
+                spawned.extend(self._spawn(key, end - start))
+            elif command == CommandBuffer.DESPAWN:
+                self._despawn(data)
+            elif command == CommandBuffer.ADD:
+                for entity, components in data:
+                    self._get_entity(entity).set_items(components)
+            elif command == CommandBuffer.REMOVE:
+                for entity, components in data:
+                    self._get_entity(entity).remove_items(components)
+            elif command == CommandBuffer.SET:
+                self._set(data)
+            else:
+                for function, args, kwargs in data:
+                    function(*args, **kwargs)
+            start = end
+        return spawned
+
+    def _get_entity(self, entity):
+        """ Return the entity object given the object or the id
+        """
+        if not isinstance(entity, Base):
+            entity = Entity.Catalogue.get(entity)
+        return entity
+
+    def _spawn(self, key, count):
+        """ Spawn all the entities with the same parameters at once
+        """
+        cls, components, name, active = key
+        return cls.spawn_many(count, list(components), name, active)
+
+    def _despawn(self, entities):
+        """ Despawn all the entities at once, ignoring the entities
+        recorded more than once or already removed
+        """
+        ids = dict()
+        catalogue = Entity.Catalogue
+        for entity in entities:
+            id = entity.id if isinstance(entity, Base) else entity
+            if id in catalogue[catalogue.index]:
+                ids[id] = True
+        if ids:
+            Entity.despawn_many(list(ids))
+
+    def _set(self, data):
+        """ Set the properties merging all the changes per component,
+        so each component is only updated once
+        """
+        components = dict()
+        for component, properties in data:
+            components.setdefault(id(component), (component, dict()))[1].update(properties)
+        for component, properties in components.values():
+            for key, value in properties.items():
+                setattr(component, key, value)
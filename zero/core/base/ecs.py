@@ -1,7 +1,7 @@
 from collections import OrderedDict as dict
 from .utils import *
 from .base import Base
-from ..catalogue import Catalogue, CatalogueTree, CatalogueDict
+from ..catalogue import Catalogue, CatalogueTree, CatalogueDict, ComponentPool
 
 __all__ = ['EntityCatalogue',
            'Entity', 
@@ -156,6 +156,9 @@ class Entity(CatalogueTree):
         """ Set wether the entity is active or not
         """
         self._active = value
+        # Update the catalogue so inactive entities are filtered
+        if self.id is not None:
+            self.Catalogue.set_active(self.id, value)
 
     def __init__(self, *args, **kwargs):
         """This is the main contructor of the class.
@@ -167,9 +170,47 @@ class Entity(CatalogueTree):
 
         """
         super(Entity,self).__init__(*args,**kwargs)
-        # Set default variables
+        # Set default variables (active could be given in the constructor)
+        self.active = self.__dict__.get("_active", True)
+
+    def _init_instance(self, name=None):
+        """ Initialize the instance without adding it into the catalogue.
+        """
+        super(Entity,self)._init_instance(name)
         self._active = True
 
+    @classmethod
+    def spawn_many(cls, count, components=None, name=None, active=True):
+        """ Create several entities at once. Ids are allocated and all 
+        the components are bound in one operation per column, so the
+        catalogue is notified once instead of per entity and component.
+
+        Components must be a list with the columns to bind. Each column
+        could be a Component class, so new components will be created
+        with the default values, or a list with one component per entity.
+
+            entities = Entity.spawn_many(1000, components=[TransformComponent,
+                                                           GeometryComponent])
+
+        """
+        columns = []
+        for column in components or []:
+            if isinstance(column, type):
+                column = column.create_many(count)
+            columns.append(column)
+        entities = cls.create_many(count, name, columns)
+        if not active:
+            for entity in entities:
+                entity.active = False
+        return entities
+
+    @classmethod
+    def despawn_many(cls, entities):
+        """ Remove several entities (objects or ids) and the components
+        bound to them from the catalogue at once.
+        """
+        return cls.remove_many(entities)
+
 class Component(CatalogueDict):
     """ Component Class
     This is the base component class that all component must
@@ -182,11 +223,31 @@ class Component(CatalogueDict):
         defaults = dict({"mode":0,
                          "orbit":False,
                          "view": np.reshape(range(9),(3,3))})
+
+    Components could also be stored in a pool (sparse set) instead of
+    the dictionary by setting pooled to True. The defaults are used as
+    the schema of the pool, so each property is stored in a contiguous
+    numpy array with the dtype and shape of its default value. The
+    properties are still accessed as attributes of the component.
+
+    class Body(Component):
+        pooled = True
+        defaults = dict({"velocity": np.zeros(3, np.float32),
+                         "mass": np.float32(1.0)})
+
+    body = Body("body", velocity=[0.0, 1.0, 0.0])
+    Body.Catalogue["Body"].pool.field("velocity")
+    >> array([[0., 1., 0.]], dtype=float32)
+
+    Pools are only used when the components are grouped by type.
     """
 
     # Default dinctionary with properties
     defaults = dict()
 
+    # Store the components in a pool using the defaults as schema
+    pooled = False
+
     # Get the current Vatalogue to manage the entity and component bindings
     Catalogue = EntityCatalogue.instance()
 
@@ -195,13 +256,96 @@ class Component(CatalogueDict):
            Initially set the dafult valiues
         """
         super().__init__(*args,**kwargs)
-        # Update the default properties if None
-        self._update_properties(self.defaults, False)
+        pool = self._get_pool()
+        if pool is not None:
+            # Move the properties given in the constructor into the pool
+            for param in self.defaults:
+                if param in self.__dict__:
+                    pool.set(self.id, param, self.__dict__.pop(param))
+        else:
+            # Update the default properties if None
+            self._update_properties(self.defaults, False)
                 
+    def _init_instance(self, name=None):
+        """ Initialize the instance without adding it into the catalogue.
+        """
+        super(Component,self)._init_instance(name)
+        if self._get_pool() is None:
+            self._update_properties(self.defaults, False)
+
+    def _get_group(self):
+        """ Return the group where the component is stored. The group
+        is created with a pool if the component is pooled.
+        """
+        if self.pooled and self.key == CatalogueDict.DEFAULT_KEY:
+            if self.type not in self.Catalogue:
+                self.Catalogue.add_group(self.type, ComponentPool(self.defaults))
+            return self.Catalogue[self.type]
+        return super(Component,self)._get_group()
+
+    def _get_pool(self):
+        """ Return the pool where the properties are stored or None
+        """
+        if self.pooled and self.key == CatalogueDict.DEFAULT_KEY:
+            return self._get_group().pool
+        return None
+
+    def __getattr__(self, key):
+        """ Return the properties stored in the pool, otherwise search
+        inside the items
+        """
+        if self.pooled and key in self.defaults:
+            pool = self._get_pool()
+            if pool is not None and self.id in pool:
+                return pool.get(self.id, key)
+        return super(Component,self).__getattr__(key)
+
+    def __setattr__(self, key, value):
+        """ Set the properties stored in the pool. Properties set are
+        marked as changed in the catalogue.
+        """
+        if key in self.defaults:
+            pool = self._get_pool()
+            if pool is not None and self.id in pool:
+                pool.set(self.id, key, value)
+            else:
+                super(Component,self).__setattr__(key, value)
+            self.touch()
+        else:
+            super(Component,self).__setattr__(key, value)
+
+    def touch(self):
+        """ Mark the component as changed, so systems can filter the
+        entities with changed components. This is done automatically
+        when properties are set, however properties modified inplace
+        (i.e. numpy arrays or objects) must be touched manually.
+        """
+        self.Catalogue.touch(self.id)
+
+    @classmethod
+    def create_many(cls, count, name=None, items=None, properties=None):
+        """ Create several components at once. Properties could be a 
+        dictionary with the values for all the components or a list with 
+        one dictionary per component.
+        """
+        components = super(Component, cls).create_many(count, name, items)
+        if properties is not None:
+            if not isinstance(properties, (list, tuple)):
+                properties = [properties] * count
+            for component, values in zip(components, properties):
+                component._update_properties(values)
+        return components
+
     def _update_properties(self, properties, force=True):
         """ Update current properties given in the parameters
         """ 
+        pool = self._get_pool()
         for param in properties:
-            if force or (not force and param not in self.items):
+            if pool is not None and param in pool.fields:
+                if force:
+                    pool.set(self.id, param, properties[param])
+            elif force or (not force and param not in self.items):
                  self.items[param] = properties[param] 
+        if force:
+            self.touch()
        
\ No newline at end of file
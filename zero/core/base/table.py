@@ -0,0 +1,275 @@
+from collections import OrderedDict as dict
+import numpy as np
+import pandas as pd
+
+__all__ = ['AttributeTable']
+
+class AttributeTable(object):
+    """ Attribute Table Class
+
+    This is a columnar store used by Datasheet to store the attributes
+    of the same element (i.e. points or prims). Each attribute is stored
+    into one contiguous numpy array with shape (n, size) and its own
+    dtype, so attributes can be returned without copying the data.
+
+        table = AttributeTable()
+        table.add("P", [0.0,0.0,0.0, 1.0,0.0,0.0], size=3)
+        table.add("Cd", default=[1.0,1.0,1.0,1.0], size=4)
+        table.get("P")
+        >> array([[0., 0., 0.],
+                  [1., 0., 0.]], dtype=float32)
+
+    Attributes are independent arrays, so adding or removing attributes
+    doesn't modify the rest of them. Arrays are allocated with some
+    capacity in advance, so rows can be appended in O(1) amortized.
+
+    Each attribute has a version that is incremented every time the
+    attribute is modified using the table, so the data computed from
+    the attributes can be cached. Arrays returned by get() are views,
+    so if they are modified inplace touch() must be called.
+
+    Attributes can be also attached from existing arrays without any
+    copy (i.e. memory mapped arrays from a file). These arrays are only
+    copied into memory if the table needs to grow.
+
+    The dataframe is only created when requested (for debugging). The
+    attributes with size > 1 are splitted into several columns using
+    the suffixes given, like ["Px","Py","Pz"].
+    """
+
+    # Declare the subindex that will be used for multiple (vector) attribites
+    multiple_index = ["x","y","z","w"]
+
+    # Initial capacity for the rows
+    DEFAULT_CAPACITY = 16
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def version(self):
+        return self._version
+
+    def __init__(self, capacity=None):
+        """ Initialize the arrays for the attributes
+        """
+        self._count = 0
+        self._capacity = capacity or AttributeTable.DEFAULT_CAPACITY
+        # Attributes arrays and default values (name -> array)
+        self._arrays = dict()
+        self._defaults = dict()
+        # Version for all the table and each attribute
+        self._version = 0
+        self._versions = dict()
+        # Cache for the dataframe
+        self._dataframe = None
+        self._dataframe_version = -1
+
+    def __len__(self):
+        """ Return the number of rows in the table
+        """
+        return self._count
+
+    def __contains__(self, name):
+        """ Return whether the attribute exists or not
+        """
+        return name in self._arrays
+
+    def __iter__(self):
+        """ Iterate over the attributes names
+        """
+        for name in self._arrays:
+            yield name
+
+    def _modified(self, name=None):
+        """ The table (or the attribute given) has been modified
+        """
+        self._version += 1
+        if name is not None:
+            self._versions[name] = self._version
+
+    def _grow(self, capacity):
+        """ Grow all the arrays to store the capacity given
+        """
+        while self._capacity < capacity:
+            self._capacity = max(self._capacity * 2, 1)
+        for name, array in self._arrays.items():
+            # Attached arrays could be smaller than the capacity
+            if len(array) < capacity:
+                result = np.empty((self._capacity,) + array.shape[1:], dtype=array.dtype)
+                result[:self._count] = array[:self._count]
+                self._arrays[name] = result
+
+    def columns(self, name):
+        """ Return the names of the columns for the attribute
+        """
+        size = self.size(name)
+        if size > 1:
+            return [name + self.multiple_index[index] for index in range(size)]
+        return [name]
+
+    def size(self, name):
+        """ Return the size of the attribute
+        """
+        return self._arrays[name].shape[1]
+
+    def dtype(self, name):
+        """ Return the dtype of the attribute
+        """
+        return self._arrays[name].dtype
+
+    def attribute_version(self, name):
+        """ Return the version of the attribute given
+        """
+        return self._versions[name]
+
+    def add(self, name, values=None, size=3, default=None, dtype=None):
+        """ Add a new attribute into the table (or replace it).
+
+        Parameters:
+            name: name for the new attribute to create.
+            size: if value has 3 elements (vector) or scalar 1
+            values: The values for all the rows.
+            default: value that will be set if no values are defined.
+                -> If no values and not default the attribute will be
+                  created with zeros (only if the table has rows).
+            dtype: type of the data that will be inserted. For example,
+            np.float32, np.int32, etc...
+
+        If the table is empty, the number of rows will be set by the
+        values given. Otherwise the values must have the same number of
+        rows. The function returns False if nothing has been added.
+        """
+        if values is not None and not isinstance(values, np.ndarray):
+            values = np.array(values)
+        if dtype is None:
+            dtype = np.float32 if values is None or not values.size else values.dtype
+        if default is None:
+            default = np.zeros(size, dtype=dtype)
+        default = np.resize(np.asarray(default, dtype=dtype), size)
+        if values is None or not values.size:
+            # Nothing to add if there are no rows
+            if not self._count:
+                return False
+            values = np.broadcast_to(default, (self._count, size))
+        values = np.reshape(values, (-1, size))
+        if not self._arrays or list(self._arrays.keys()) == [name]:
+            # First attribute (or replaced) set the number of rows
+            self._count = len(values)
+            self._capacity = max(self._capacity, self._count)
+        elif len(values) != self._count:
+            raise ValueError("Attribute {} has {} rows, but {} expected".format(
+                                                    name, len(values), self._count))
+        array = np.empty((self._capacity, size), dtype=dtype)
+        array[:self._count] = values
+        self._arrays[name] = array
+        self._defaults[name] = default
+        self._modified(name)
+        return True
+
+    def attach(self, name, array, default=None):
+        """ Add a new attribute (or replace it) using the array given with
+        shape (n, size) directly as storage, so the data is not copied.
+        """
+        if array.ndim != 2:
+            raise ValueError("Attribute {} must have shape (n, size)".format(name))
+        if not self._arrays or list(self._arrays.keys()) == [name]:
+            self._count = len(array)
+            self._capacity = max(self._capacity, self._count)
+        elif len(array) != self._count:
+            raise ValueError("Attribute {} has {} rows, but {} expected".format(
+                                                    name, len(array), self._count))
+        if default is None:
+            default = np.zeros(array.shape[1], dtype=array.dtype)
+        self._arrays[name] = array
+        self._defaults[name] = np.resize(np.asarray(default, dtype=array.dtype), array.shape[1])
+        self._modified(name)
+        return True
+
+    def remove(self, name):
+        """ Remove the attribute from the table
+        """
+        del self._arrays[name]
+        del self._defaults[name]
+        del self._versions[name]
+        if not self._arrays:
+            self._count = 0
+        self._modified()
+
+    def get(self, name):
+        """ Return the values for the attribute with shape (n, size). The
+        array returned is a view, so no data is copied.
+        """
+        return self._arrays[name][:self._count]
+
+    def set(self, name, values, rows=None):
+        """ Set the values for the attribute (all the rows or only the
+        rows given).
+        """
+        if rows is None:
+            rows = slice(0, self._count)
+        self._arrays[name][rows] = values
+        self._modified(name)
+
+    def touch(self, name):
+        """ Mark the attribute as modified. This is needed when the arrays
+        returned are modified inplace.
+        """
+        self._modified(name)
+
+    def append(self, values=None, count=None):
+        """ Append new rows at the end of the table. Values must be a
+        dictionary with the values (name -> values) for the new rows.
+        Attributes not given will be set with their defaults. It returns
+        the positions of the rows added.
+        """
+        values = values or dict()
+        if count is None:
+            count = max([len(np.reshape(value, (-1, self.size(name))))
+                         for name, value in values.items()] or [0])
+        start, end = self._count, self._count + count
+        self._grow(end)
+        for name, array in self._arrays.items():
+            if name in values:
+                array[start:end] = np.reshape(values[name], (-1, array.shape[1]))
+            else:
+                array[start:end] = self._defaults[name]
+        self._count = end
+        self._modified()
+        for name in self._arrays:
+            self._versions[name] = self._version
+        return np.arange(start, end)
+
+    def take(self, rows):
+        """ Keep only the rows given (indexes) in the same order, so the
+        rows can be removed and reordered at once.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        for name, array in self._arrays.items():
+            self._arrays[name] = array[:self._count][rows]
+        self._count = self._capacity = len(rows)
+        self._modified()
+        for name in self._arrays:
+            self._versions[name] = self._version
+        return self
+
+    def dataframe(self):
+        """ Create a pandas dataframe with all the attributes. Attributes
+        with size > 1 are splitted into several columns. The dataframe is
+        cached until the table is modified.
+        """
+        if self._dataframe_version != self._version:
+            data = dict()
+            for name in self._arrays:
+                values = self.get(name)
+                for index, column in enumerate(self.columns(name)):
+                    data[column] = values[:, index]
+            self._dataframe = pd.DataFrame(data)
+            self._dataframe_version = self._version
+        return self._dataframe
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        return "AttributeTable({}, rows:{})".format(list(self._arrays.keys()), self._count)
@@ -1,4 +1,5 @@
 from collections import OrderedDict as dict
+from collections import deque
 from enum import Enum
 import os
 import json
@@ -19,6 +20,7 @@ __all__ = ['file_exists',
            'ParseDict', 
            'get_cmd_parameters',
            'BasicCounter',
+           'HandleAllocator',
            'EnumBase',
            'ProgressBar',
            'timeit']
@@ -167,6 +169,125 @@ class BasicCounter(object):
         self._counter += 1
         return self._counter
 
+class HandleAllocator(object):
+    """ Allocator for compact integer handles.
+
+    Each handle is a 32-bit index and a 31-bit generation packed into
+    an int64 (always positive). Indexes are reused from a free list once the handles are
+    freed, incrementing the generation of the index. This way a stale
+    handle (freed) can be detected in O(1) just comparing the generation.
+
+        allocator = HandleAllocator()
+        handle = allocator()
+        HandleAllocator.index(handle)
+        >> 0
+        allocator.free(handle)
+        allocator.is_valid(handle)
+        >> False
+
+    Since indexes are compact, they can be used directly as indexes
+    for arrays. The first generation is 1, so handles are never 0.
+    Generations wrap to 1 after 2^31 - 1, so the handles always fit
+    into int64 arrays.
+    """
+
+    # Bits used for the index part of the handle
+    INDEX_BITS = 32
+    INDEX_MASK = (1 << 32) - 1
+    # Bits used for the generation (the sign bit of the int64 is not used)
+    GENERATION_BITS = 31
+    GENERATION_MASK = (1 << 31) - 1
+
+    def __init__(self, capacity=1024):
+        self._generations = np.ones(capacity, dtype=np.uint32)
+        self._free = deque()
+        self._size = 0
+
+    def __call__(self):
+        """ Allocate a new handle
+        """
+        if self._free:
+            index = self._free.popleft()
+        else:
+            index = self._size
+            if index >= len(self._generations):
+                self._grow(index + 1)
+            self._size += 1
+        return (int(self._generations[index]) << HandleAllocator.INDEX_BITS) | index
+
+    def __len__(self):
+        """ Return the number of handles alive
+        """
+        return self._size - len(self._free)
+
+    def _grow(self, capacity):
+        """ Grow the generations to store the capacity given
+        """
+        size = len(self._generations)
+        while size < capacity:
+            size *= 2
+        generations = np.ones(size, dtype=np.uint32)
+        generations[:len(self._generations)] = self._generations
+        self._generations = generations
+
+    def allocate_many(self, count):
+        """ Allocate several handles at once. It returns an array
+        with the handles (int64)
+        """
+        reused = min(count, len(self._free))
+        indexes = [self._free.popleft() for _ in range(reused)]
+        if self._size + count - reused > len(self._generations):
+            self._grow(self._size + count - reused)
+        indexes = np.concatenate([np.array(indexes, dtype=np.int64),
+                                  np.arange(self._size, self._size + count - reused, dtype=np.int64)])
+        self._size += count - reused
+        generations = self._generations[indexes].astype(np.int64)
+        return (generations << HandleAllocator.INDEX_BITS) | indexes
+
+    def free(self, handle):
+        """ Free the handle, so the index can be reused
+        """
+        if not self.is_valid(handle):
+            return
+        index = handle & HandleAllocator.INDEX_MASK
+        # Increment the generation (wrap to 1 when it overflows)
+        generation = (int(self._generations[index]) + 1) & HandleAllocator.GENERATION_MASK
+        self._generations[index] = generation or 1
+        self._free.append(index)
+
+    def free_many(self, handles):
+        """ Free several handles at once
+        """
+        for handle in handles:
+            self.free(int(handle))
+
+    def is_valid(self, handle):
+        """ Return whether the handle is still alive or not
+        """
+        index = handle & HandleAllocator.INDEX_MASK
+        if index >= self._size:
+            return False
+        return int(self._generations[index]) == (handle >> HandleAllocator.INDEX_BITS)
+
+    def valid(self, handles):
+        """ Return a boolean array with the handles that are alive
+        """
+        handles = np.asarray(handles, dtype=np.int64)
+        indexes = handles & HandleAllocator.INDEX_MASK
+        result = indexes < self._size
+        generations = self._generations[np.where(result, indexes, 0)].astype(np.int64)
+        return result & (generations == (handles >> HandleAllocator.INDEX_BITS))
+
+    def index(handle):
+        """ Return the index part of the handle
+        """
+        return handle & HandleAllocator.INDEX_MASK
+
+    def generation(handle):
+        """ Return the generation part of the handle
+        """
+        return handle >> HandleAllocator.INDEX_BITS
+
 class EnumBase(Enum):
     def __eq__(self, item):
         if isinstance(item, (Enum)):
@@ -1,5 +1,8 @@
 from __future__ import absolute_import, division, print_function
 
+from .storage import Archetype, CatalogueStorage
+from .query import CatalogueQuery
+from .pool import ComponentPool
 from .catalogue import Catalogue, CatalogueGroup
 from .collections import CatalogueDict, CatalogueTree
 
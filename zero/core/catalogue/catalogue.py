@@ -1,6 +1,7 @@
 from collections import OrderedDict as dict
-import pandas as pd
-import numpy as np
+from .storage import CatalogueStorage
+from .query import CatalogueQuery
+from .pool import ComponentPool
 
 __all__ = ['CatalogueGroup', 
            'Catalogue']
@@ -33,6 +34,17 @@ class CatalogueGroup(object):
         name: name of the current GRoup or dictionary
         key: the item that has been, added, removed or modifed
         option: action performed added, removed or modifed
+
+    When several items are added or removed at once, using add_many or
+    remove_many functions, the callback is only called once and the key
+    will be a list with all the keys added or removed.
+
+    Optionally, a ComponentPool could be given as the backend to store
+    the items instead of the dictionary. In this case the items are
+    stored in dense arrays (sparse set), so the order is not preserved
+    when items are removed.
+
+        group = CatalogueGroup("transform", callback, ComponentPool(defaults))
     """
     ADDED = 0
     REMOVED = 1
@@ -46,11 +58,19 @@ class CatalogueGroup(object):
     def name(self):
         return self._name
 
-    def __init__(self, name, callback=None):
+    @property
+    def pool(self):
+        """ Return the pool used as backend or None if not pooled
+        """
+        if isinstance(self._items, ComponentPool):
+            return self._items
+        return None
+
+    def __init__(self, name, callback=None, pool=None):
         """ Initialize all the variables
         """
         self._name = name
-        self._items = dict()
+        self._items = dict() if pool is None else pool
         self._callback = callback
 
     def _notify(self, key, option):
@@ -88,6 +108,25 @@ class CatalogueGroup(object):
         """
         return key in self._items
 
+    def add_many(self, items):
+        """ Add several items at once. Items must be a list with
+        (key, value) pairs. Only one notification will be sent.
+        """
+        items = list(items)
+        self._items.update(items)
+        # Finally callback once with all the keys
+        self._notify([key for key, value in items], CatalogueGroup.ADDED)
+
+    def remove_many(self, keys):
+        """ Remove several items at once using the keys given. Only
+        one notification will be sent.
+        """
+        keys = [key for key in keys if key in self._items]
+        for key in keys:
+            del self._items[key]
+        # Finally callback once with all the keys
+        self._notify(keys, CatalogueGroup.REMOVED)
+
     def __iter__(self):
         """Retrieve the items elements using loops statements. 
         This usually are more efficent in terms of memory
@@ -121,8 +160,12 @@ class Catalogue(object):
     (The same catalog should be shared between the three groups)
 
     The index will be "Entity", this means we can bind and Entity with a 
-    component_typeXX. Then we can use the pandas dataframe to pick
-    the elements you need.
+    component_typeXX. The bindings are stored in a CatalogueStorage, where
+    the indexes with the same columns bound (archetypes) are stored in
+    contiguous tables. Bind and unbind are O(1) amortized.
+    
+    For debugging, the pandas dataframe can be used to pick the elements
+    you need. The dataframe is only created when it's requested.
 
         >> #Get the dataframe form the catalogue
         >> df = Catalogue.dataframe
@@ -248,7 +291,15 @@ class Catalogue(object):
     """
     @property
     def dataframe(self):
-        return self._dataframe
+        return self._storage.dataframe()
+
+    @property
+    def storage(self):
+        return self._storage
+
+    @property
+    def tick(self):
+        return self._storage.tick
 
     @property
     def index(self):
@@ -266,8 +317,10 @@ class Catalogue(object):
         self._groups = dict()
         self._items = dict()
         self._index = index
-        # Create the datafram to map the entity - components
-        self._dataframe = pd.DataFrame()
+        # Create the storage to map the entity - components
+        self._storage = CatalogueStorage()
+        # Queries registered (columns -> query)
+        self._queries = dict()
             
     def __setitem__(self, key, value):
         """ Catlogue doesn't allow to create new items manually
@@ -287,6 +340,14 @@ class Catalogue(object):
         """
         return key in self._groups
 
+    def add_group(self, key, pool=None):
+        """ Create a new group using the pool given as backend. If the
+        group already exists the current group is returned.
+        """
+        if key not in self._groups:
+            self._groups[key] = CatalogueGroup(key, self._callback_group, pool)
+        return self._groups[key]
+
     def __iter__(self):
         """Retrieve the items elements using loops statements. 
         This usually are more efficent in terms of memory
@@ -297,10 +358,9 @@ class Catalogue(object):
     def __getattr__(self, key):
         """  If not in attrbites the search on pandas dataframe
         """
-        if key in self.__dict__:
-            return getattr(self, key)
-        else:
-            return getattr(self._dataframe, key)
+        if key.startswith("_"):
+            raise AttributeError(key)
+        return getattr(self.dataframe, key)
 
     def __str__(self):
         """ Build the default function to represent the catalogue
@@ -324,17 +384,25 @@ class Catalogue(object):
         #print("Element added in {}: {}".format(id,key))
         # Add current iten into the all list
         self._items[item] = self[key][item]
+        # Set the item to the queries that match the index
+        if key == self._index:
+            self._storage.add(item)
+            self._update_queries(item)
     
     def  _item_removed(self, key, item):
         """ Item has been removed from the Dict
         """   
         #print("Element removed in {}: {}".format(id,key))
-        if key == self._index and key in self._dataframe.index:
+        if key == self._index:
             # Remove the current row
-            self._dataframe.drop(item, inplace=True)
+            self._storage.remove(item)
+            for query in self._queries.values():
+                query._remove(item)
         else:
-            # Remove the element from the curren col
-            self.unbind(key, item, None)
+            # Remove the element from the index is bound to
+            indexes = self._storage.discard(item)
+            if indexes:
+                self._update_queries(indexes)
         # Remove the item from the full list
         del self._items[item]
 
@@ -343,12 +411,48 @@ class Catalogue(object):
         """  
         # Replace the item 
         self._items[item] = self[key][item]
+        self._storage.touch(item)
+        # Replace the item in the queries that match the index
+        if key == self._index:
+            self._resolve_queries(item)
     
+    def _items_added(self, key, items):
+        """ Several items have been added at once
+        """
+        group = self[key]
+        self._items.update((item, group[item]) for item in items)
+        if key == self._index:
+            self._storage.add_many(items)
+            self._update_queries(items)
+
+    def _items_removed(self, key, items):
+        """ Several items have been removed at once
+        """
+        if key == self._index:
+            # Remove all the rows
+            self._storage.remove_many(items)
+            for query in self._queries.values():
+                for item in items:
+                    query._remove(item)
+        else:
+            # Remove the elements from the indexes are bound to
+            indexes = [index for item in items for index in self._storage.discard(item)]
+            self._update_queries(indexes)
+        # Remove the items from the full list
+        for item in items:
+            del self._items[item]
+
     def _callback_group(self, key, item, option):
         """ Function call-call back when new element is
         inserted into a list.
         """
-        if option == CatalogueGroup.ADDED:
+        if isinstance(item, list):
+            # Several items added or removed at once
+            if option == CatalogueGroup.ADDED:
+                self._items_added(key, item)
+            elif option == CatalogueGroup.REMOVED:
+                self._items_removed(key, item)
+        elif option == CatalogueGroup.ADDED:
             # Create new mapping based on the added item
             self._item_added(key, item)
         elif option == CatalogueGroup.REMOVED:
@@ -358,6 +462,101 @@ class Catalogue(object):
             # Create new mapping based on the added item
             self._item_modified(key, item)
 
+    def _update_queries(self, index):
+        """ Update the queries once the index (or a list of indexes)
+        has been moved
+        """
+        if not self._queries:
+            return
+        if isinstance(index, list):
+            # Group the indexes by archetype to match them once
+            groups = dict()
+            for current in index:
+                archetype = self._storage.archetype(current)
+                key = None if archetype is None else archetype.signature
+                groups.setdefault(key, (archetype, []))[1].append(current)
+            for archetype, indexes in groups.values():
+                items = [self._items.get(current) for current in indexes]
+                for query in self._queries.values():
+                    query._update_many(indexes, archetype, items)
+        else:
+            archetype = self._storage.archetype(index)
+            item = self._items.get(index)
+            for query in self._queries.values():
+                query._update(index, archetype, item)
+
+    def _resolve_queries(self, index):
+        """ Set the current item for the index in the queries
+        """
+        item = self._items.get(index)
+        for query in self._queries.values():
+            query._resolve(index, item)
+
+    def query(self, *columns, **kwargs):
+        """ Return a query with all the indexes that have all the
+        columns bound. Queries are registered once and updated
+        every time the catalogue is modified.
+
+            >> for entity in catalogue.query("geometry","render"):
+            >>     print(entity.name)
+
+        Also any_of and none_of columns can be given as parameters.
+        """
+        # Columns can be given also as a collection
+        if len(columns) == 1 and isinstance(columns[0], (list, tuple, set)):
+            columns = columns[0]
+        masks = (self._storage.mask(columns), 
+                 self._storage.mask(kwargs.get("any_of")),
+                 self._storage.mask(kwargs.get("none_of")))
+        if masks not in self._queries:
+            query = CatalogueQuery(columns, *masks, storage=self._storage)
+            # Get the initial indexes (vectorized over all the slots)
+            slots = self._storage.select(*masks, active=False)
+            for index in self._storage.keys(slots):
+                query._update(index, self._storage.archetype(index), self._items.get(index))
+            self._queries[masks] = query
+        return self._queries[masks]
+
+    def select(self, all_of=None, any_of=None, none_of=None, active=True,
+                     changed=None, added=None, since=0):
+        """ Return the indexes that match the given columns. The selection
+        is performed using vectorized operations with the bitmasks of the
+        signatures for all the indexes at once. If active is True only
+        active indexes will be returned.
+
+            >> catalogue.select(all_of=["geometry","render"], none_of="light")
+            >> array(['entity01', 'entity02'], dtype=object)
+
+        Indexes could be also filtered by the columns changed or added
+        since the given tick.
+
+            >> catalogue.select(all_of="render", changed="transform", since=tick)
+
+        """
+        slots = self._storage.select(self._storage.mask(all_of),
+                                     self._storage.mask(any_of),
+                                     self._storage.mask(none_of), active,
+                                     self._storage.mask(changed),
+                                     self._storage.mask(added), since)
+        return self._storage.keys(slots)
+
+    def advance(self):
+        """ Advance the change tick and return the new one. Systems must
+        keep the tick returned to get the changes in the next run.
+        """
+        return self._storage.advance()
+
+    def touch(self, item):
+        """ Mark the item as changed in the column where it's bound
+        """
+        self._storage.touch(item)
+
+    def set_active(self, index, value):
+        """ Set whether the index is active or not. Inactive indexes will
+        be filtered when selecting.
+        """
+        self._storage.set_active(index, value)
+
     def get(self, item):
         """ This function will look for the current key item
         inside all the items stored
@@ -368,18 +567,21 @@ class Catalogue(object):
         """ This function will map the current item with the
         given index and col.
         """
-        # Bind the current index, col using dataframe
-        if self._dataframe.empty:
-            # Add the current data into the attributes frame
-            self._dataframe = pd.DataFrame([item], index = [index], columns=[column])
-        else:
-            # Add the current data into the attributes frame
-            self._dataframe.loc[index,column] = item
+        self._storage.bind(index, column, item)
+        self._update_queries(index)
     
+    def bind_many(self, indexes, columns):
+        """ Bind several columns to all the indexes given at once.
+        Columns must be a dictionary with column:items, where items
+        has one item per index.
+        """
+        indexes = list(indexes)
+        self._storage.bind_many(indexes, columns)
+        self._update_queries(indexes)
+
     def unbind(self, index, column, item):
         """ This function will unbind the current key from the catalogue.
         """
-        if column in self._dataframe.columns and index in self._dataframe.index:
-            # Remove the element from the curren col
-            self._dataframe.loc[index,column] = np.NaN
+        self._storage.unbind(index, column)
+        self._update_queries(index)
        
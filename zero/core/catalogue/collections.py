@@ -164,7 +164,86 @@ class CatalogueDict(Base):
         # Extract from parameters and update items instance
         self._update_items(items)
          # Add current instance to the catalogue set
-        self.Catalogue[getattr(self,self.key)][self.id] = self
+        self._get_group()[self.id] = self
+
+    def _init_instance(self, name=None):
+        """ Initialize the instance without adding it into the catalogue.
+        This is used to create several instances at once.
+        """
+        Base.__init__(self, name)
+        self.items = dict()
+        self.key = CatalogueDict.DEFAULT_KEY
+
+    def _get_group(self):
+        """ Return the group in the Catalogue where the instance is
+        stored. Subclasses could override this to create the group
+        with a different backend.
+        """
+        return self.Catalogue[getattr(self,self.key)]
+
+    @classmethod
+    def create_many(cls, count, name=None, items=None):
+        """ Create several instances at once. All the instances will be
+        added into the Catalogue in one operation, so the catalogue will 
+        be notified only once.
+
+        Items must be a list of columns. Each column is a list with the
+        items (one per instance) to bind with the new instances.
+
+            transforms = [Transform("transform{}".format(i)) for i in range(10)]
+            entities = Entity.create_many(10, items=[transforms])
+
+        """
+        instances = [cls.__new__(cls) for _ in range(count)]
+        for instance in instances:
+            instance._init_instance(name)
+        if not instances:
+            return instances
+        # Add all the instances into the catalogue in one operation
+        ids = [instance.id for instance in instances]
+        instances[0]._get_group().add_many(zip(ids, instances))
+        # Bind the items for each column in one operation
+        columns = dict()
+        for column in items or []:
+            column = list(column)
+            for instance, item in zip(instances, column):
+                instance.items[str(getattr(item,item.key)).lower()] = item
+            columns[getattr(column[0],column[0].key)] = [item.id for item in column]
+        if columns:
+            cls.Catalogue.bind_many(ids, columns)
+        return instances
+
+    @classmethod
+    def remove_many(cls, instances):
+        """ Remove several instances from the Catalogue at once. Items 
+        bound to the instances will be also removed from the Catalogue,
+        unless they are shared with other instances not removed.
+        Instances could be the objects or the ids.
+        """
+        instances = [cls.Catalogue.get(instance) if not isinstance(instance,(Base)) 
+                     else instance for instance in instances]
+        # Group the instances and the items by their groups in the Catalogue
+        groups = dict()
+        items = dict()
+        for instance in instances:
+            groups.setdefault(getattr(instance,instance.key), []).append(instance.id)
+            for key in instance.items:
+                item = instance.items[key]
+                if isinstance(item,(Base)):
+                    references = items.setdefault(item.id, [item, 0])
+                    references[1] += 1
+            instance.items.clear()
+        # Items still bound to other instances are kept
+        storage = cls.Catalogue.storage
+        for item, count in items.values():
+            if storage.references(item.id) <= count:
+                groups.setdefault(getattr(item,item.key), []).append(item.id)
+        # Remove each group in one operation
+        for group in groups:
+            cls.Catalogue[group].remove_many(groups[group])
+            # Release the ids so they can be reused (handles)
+            Base.release_ids(groups[group])
+        return instances
 
     def _update_items(self, catalogue):
         """ Update catalogue based on the 
@@ -178,6 +257,8 @@ class CatalogueDict(Base):
             # Bind current items that are derived from Base class
             if isinstance(item,(Base)):                        
                 self.Catalogue.bind(self.id, getattr(item,item.key), item.id)
+        # Mark the instance as changed where it's bound
+        self.Catalogue.touch(self.id)
 
     def _remove_items(self, catalogue):
         # Remove given items from catalogue
@@ -314,8 +395,10 @@ class CatalogueDict(Base):
                 self.Catalogue.unbind(self.id, getattr(item,item.key), item.id)
         # Clean all the items
         self.items.clear()
-         # Remove also the references from the catalog
-        del self.Catalogue[getattr(self,self.key)][self.id]
+         # Remove also the references from the catalog (if not removed yet)
+        group = self._get_group()
+        if self.id in group:
+            del group[self.id]
         # Finally del base class
         super(CatalogueDict, self).__del__()
 
@@ -420,6 +503,10 @@ class CatalogueTree(CatalogueDict):
     # Slots that allows the instances based on Tree class
     __slots__ = ["name","id","type","items","key","parent","children"]
 
+    # Incremented every time the tree changes (parents set or removed),
+    # so systems can check if the hierarchy must be processed again.
+    hierarchy_version = 0
+
     def __init__(self, *args, **kwargs):
         """This is the main contructor of the class.
 
@@ -433,12 +520,35 @@ class CatalogueTree(CatalogueDict):
         # Extract current Catalogue and update
         self._update_children(children)
 
+    def _init_instance(self, name=None):
+        """ Initialize the instance without adding it into the catalogue.
+        """
+        super(CatalogueTree,self)._init_instance(name)
+        self.children = dict()
+
+    @classmethod
+    def remove_many(cls, instances):
+        """ Remove several instances from the Catalogue at once. The
+        instances will be also removed from the tree.
+        """
+        instances = super(CatalogueTree, cls).remove_many(instances)
+        CatalogueTree.hierarchy_version += 1
+        for instance in instances:
+            if instance.parent is not None:
+                instance.parent.children.pop(instance.id, None)
+                instance.parent = None
+            for child in instance.children:
+                instance.children[child].parent = None
+            instance.children.clear()
+        return instances
+
     def _set_parent(self, value):
         """ This function will set the current value as the parent
 
         """
         #Set current parent
         self.parent = self._get_item(value)
+        CatalogueTree.hierarchy_version += 1
         # Aso add self to the parents childs
         if self.parent:
             self.parent.set_children(children=self)
@@ -471,17 +581,51 @@ class CatalogueTree(CatalogueDict):
         All the dictiionaries iterates using the key so they can be deleted
         inside the for loop. This warranty no errors during the deletion.
         """
-        # Remove all the childs
-        for key in self.children.keys():
-            # Finally remove the item from the dictionary (chain?)
+        # Remove all the childs (they won't have parent anymore)
+        for key in list(self.children.keys()):
+            self.children[key].parent = None
             del self.children[key]
         # Check if has parent to unset this child.
         if self.parent is not None:
             # Remove current entity from the parent childs
-            parent.remove_children(children=self.id)
+            self.parent.children.pop(self.id, None)
+            self.parent = None
         # Finally del base class
         super(CatalogueTree, self).__del__()
 
+    def destroy(self, recursive=True):
+        """ Destroy the instance and remove it from the Catalogue with
+        all the items bound. If recursive, all the subtree is destroyed,
+        otherwise the children will be detached from the tree.
+
+        The subtree is walked only once to get all the instances, and
+        then all of them are removed from the Catalogue at once (one
+        operation per group). Ids are released so they can be reused.
+
+            root = Entity("root", children=[Entity("child")])
+            root.destroy()
+
+        It returns the ids of the instances destroyed.
+        """
+        instances = [self]
+        if recursive:
+            position = 0
+            while position < len(instances):
+                children = instances[position].children
+                instances.extend(children[key] for key in children)
+                position += 1
+        else:
+            for key in list(self.children.keys()):
+                self.children[key].parent = None
+            self.children.clear()
+        # Detach the instance from the parent
+        if self.parent is not None:
+            self.parent.children.pop(self.id, None)
+            self.parent = None
+        ids = [instance.id for instance in instances]
+        self.__class__.remove_many(instances)
+        return ids
+
     def set_parent(self, value):
         """ This function will set the current value as the parent
         """
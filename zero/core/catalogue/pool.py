@@ -0,0 +1,273 @@
+from collections import OrderedDict as dict
+import numpy as np
+from ..base.utils import HandleAllocator
+
+__all__ = ['ComponentPool']
+
+class ComponentPool(object):
+    """ ComponentPool class.
+
+    A pool is a sparse set that can be used as the backend of a
+    CatalogueGroup instead of the default dictionary. Items are stored
+    in dense arrays without holes, and a sparse array maps each key
+    (entity or component handle) to its position in the dense arrays.
+
+    The fields of the items are also stored in the pool, each field
+    into a contiguous numpy array with one row per item. The fields are
+    created from a typed defaults schema. Numpy values and numbers will
+    be stored with their dtype and shape, any other value is stored in
+    an array of objects.
+
+        pool = ComponentPool(dict({"velocity": np.zeros(3, np.float32),
+                                   "mass": np.float32(1.0),
+                                   "shape": None}))
+        pool[handle] = component
+        pool.set(handle, "velocity", [0.0, 1.0, 0.0])
+        pool.field("velocity")
+        >> array([[0., 1., 0.]], dtype=float32)
+
+    Add and remove are O(1). Removed items are replaced by the last item
+    (swap and pop), so the order of the items is not preserved once an
+    item is removed.
+
+    Integer keys (handles) are mapped using the index of the handle
+    into the sparse array, so the generation of the handle is also
+    checked. Any other key (i.e. uuid strings) is mapped by a dictionary.
+    """
+
+    # Initial capacity for the dense arrays
+    DEFAULT_CAPACITY = 64
+
+    @property
+    def fields(self):
+        return self._fields
+
+    @property
+    def count(self):
+        return self._count
+
+    def __init__(self, defaults, capacity=None):
+        """ Initialize the dense arrays for the fields in defaults
+        """
+        self._defaults = dict(defaults)
+        self._fields = dict()
+        for name, value in self._defaults.items():
+            self._fields[name] = ComponentPool.schema(value)
+        self._count = 0
+        self._capacity = capacity or ComponentPool.DEFAULT_CAPACITY
+        # Dense arrays with the keys and the items
+        self._keys = np.empty(self._capacity, dtype=object)
+        self._values = np.empty(self._capacity, dtype=object)
+        self._data = dict()
+        for name, (dtype, shape) in self._fields.items():
+            self._data[name] = np.empty((self._capacity,) + shape, dtype=dtype)
+        # Sparse array (handle index -> dense) and lookup for other keys
+        self._sparse = np.full(self._capacity, -1, dtype=np.int64)
+        self._lookup = dict()
+
+    def schema(value):
+        """ Return the (dtype, shape) to store the given default value
+        """
+        if isinstance(value, (np.ndarray, np.generic, bool, int, float)):
+            value = np.asarray(value)
+            return (value.dtype, value.shape)
+        return (np.dtype(object), ())
+
+    def __len__(self):
+        """ Return the number of items in the pool
+        """
+        return self._count
+
+    def __contains__(self, key):
+        """ Return whether the key is in the pool or not
+        """
+        return self.index(key) >= 0
+
+    def __iter__(self):
+        """ Iterate over the keys in dense order
+        """
+        for key in self._keys[:self._count]:
+            yield key
+
+    def __getitem__(self, key):
+        """ Return the item stored for the key
+        """
+        index = self.index(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._values[index]
+
+    def __setitem__(self, key, value):
+        """ Add a new item or replace the existing one. New items will
+        have the default values in all the fields.
+        """
+        index = self.index(key)
+        if index >= 0:
+            self._values[index] = value
+        else:
+            self._append([key], [value])
+
+    def __delitem__(self, key):
+        """ Remove the item by moving the last item into its place
+        """
+        index = self.index(key)
+        if index < 0:
+            raise KeyError(key)
+        last = self._count - 1
+        if index != last:
+            moved = self._keys[last]
+            self._keys[index] = moved
+            self._values[index] = self._values[last]
+            for data in self._data.values():
+                data[index] = data[last]
+            self._set_index(moved, index)
+        self._set_index(key, -1)
+        # Release the references for the objects
+        self._keys[last] = None
+        self._values[last] = None
+        for name, (dtype, shape) in self._fields.items():
+            if dtype == object:
+                self._data[name][last] = None
+        self._count = last
+
+    def _grow(self, count):
+        """ Grow the dense arrays to store count items at least
+        """
+        if count <= self._capacity:
+            return
+        capacity = max(count, self._capacity * 2)
+        def resize(array):
+            result = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+            result[:self._count] = array[:self._count]
+            return result
+        self._keys = resize(self._keys)
+        self._values = resize(self._values)
+        for name in self._data:
+            self._data[name] = resize(self._data[name])
+        self._capacity = capacity
+
+    def _set_index(self, key, index):
+        """ Map the key to the dense index given (-1 to unmap)
+        """
+        if isinstance(key, (int, np.integer)):
+            slot = int(key) & HandleAllocator.INDEX_MASK
+            if slot >= len(self._sparse):
+                sparse = np.full(max(slot + 1, len(self._sparse) * 2), -1, dtype=np.int64)
+                sparse[:len(self._sparse)] = self._sparse
+                self._sparse = sparse
+            self._sparse[slot] = index
+        elif index < 0:
+            self._lookup.pop(key, None)
+        else:
+            self._lookup[key] = index
+
+    def _append(self, keys, values):
+        """ Append new items at the end of the dense arrays
+        """
+        start, count = self._count, len(keys)
+        self._grow(start + count)
+        end = start + count
+        for offset, (key, value) in enumerate(zip(keys, values)):
+            self._keys[start + offset] = key
+            self._values[start + offset] = value
+            self._set_index(key, start + offset)
+        # Set the default values to all the new rows at once
+        for name, default in self._defaults.items():
+            if self._fields[name][0] == object:
+                self._data[name][start:end].fill(default)
+            else:
+                self._data[name][start:end] = default
+        self._count = end
+
+    def index(self, key):
+        """ Return the dense index for the key or -1 if not in the pool
+        """
+        if isinstance(key, (int, np.integer)):
+            slot = int(key) & HandleAllocator.INDEX_MASK
+            if slot >= len(self._sparse):
+                return -1
+            index = int(self._sparse[slot])
+            if index < 0 or self._keys[index] != key:
+                return -1
+            return index
+        return self._lookup.get(key, -1)
+
+    def indexes(self, keys):
+        """ Return the dense indexes for the keys (-1 if not in the pool).
+        Integer handles are resolved at once using the sparse array.
+        """
+        keys = np.asarray(keys)
+        if keys.dtype.kind not in "iu":
+            return np.array([self.index(key) for key in keys], dtype=np.int64)
+        slots = keys.astype(np.int64) & HandleAllocator.INDEX_MASK
+        result = np.full(len(keys), -1, dtype=np.int64)
+        inside = slots < len(self._sparse)
+        result[inside] = self._sparse[slots[inside]]
+        found = result >= 0
+        found[found] = self._keys[result[found]] == keys[found]
+        result[~found] = -1
+        return result
+
+    def keys(self):
+        """ Return the keys in dense order
+        """
+        return self._keys[:self._count]
+
+    def values(self):
+        """ Return the items in dense order
+        """
+        return self._values[:self._count]
+
+    def items(self):
+        """ Return the (key, item) pairs in dense order
+        """
+        return zip(self.keys(), self.values())
+
+    def update(self, items):
+        """ Add or replace several items given as (key, value) pairs.
+        New items are appended at once.
+        """
+        keys, values = [], []
+        for key, value in items:
+            index = self.index(key)
+            if index >= 0:
+                self._values[index] = value
+            else:
+                keys.append(key)
+                values.append(value)
+        if keys:
+            self._append(keys, values)
+
+    def clear(self):
+        """ Remove all the items in the pool
+        """
+        for key in list(self.keys()):
+            del self[key]
+
+    def field(self, name):
+        """ Return the dense array with the values for the field. The
+        array is a view so it can be modified inplace, however it won't
+        be valid once items are added or removed.
+        """
+        return self._data[name][:self._count]
+
+    def get(self, key, name):
+        """ Return the value of the field for the given key
+        """
+        index = self.index(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._data[name][index]
+
+    def set(self, key, name, value):
+        """ Set the value of the field for the given key
+        """
+        index = self.index(key)
+        if index < 0:
+            raise KeyError(key)
+        self._data[name][index] = value
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        return "ComponentPool({}, count:{})".format(list(self._fields), self._count)
@@ -0,0 +1,154 @@
+from collections import OrderedDict as dict
+import numpy as np
+
+__all__ = ['CatalogueQuery']
+
+class CatalogueQuery(object):
+    """ CatalogueQuery class.
+
+    A query is a cached set with all the indexes (i.e. Entities) that
+    have bound all the columns (i.e. Components) requested. Queries are
+    created and registered by the catalogue:
+
+        >> query = catalogue.query("geometry","render")
+        >> for entity in query:
+        >>     print(entity.name)
+
+    Optionally, queries can also require any_of or none_of some columns:
+
+        >> query = catalogue.query("geometry", none_of=["light","camera"])
+
+    Queries use the bitmasks of the columns to match the signature of
+    the archetypes where the indexes are stored.
+
+    Queries are registered only once for the same columns, so calling
+    catalogue.query() again with the same columns will return the same
+    instance. The results are computed once when the query is created
+    and then the catalogue keeps them updated every time an item is
+    bound, unbound, added, removed or modified. This way iterate over
+    the query doesn't need to scan all the table or search each index
+    inside the catalogue.
+
+    The items for the indexes are also cached, so the entities are
+    returned directly without looking for them in the catalogue.
+
+    Queries can also be filtered to get only the items with some columns
+    changed or added since a tick. This way systems only need to process
+    the entities that actually changed since the last time they ran.
+
+        >> last, tick = tick, catalogue.advance()
+        >> for entity in query.changed("transform", since=last):
+        >>     update(entity)
+    """
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def indexes(self):
+        return list(self._items.keys())
+
+    @property
+    def masks(self):
+        return (self._all_of, self._any_of, self._none_of)
+
+    def __init__(self, columns, all_of=0, any_of=0, none_of=0, storage=None):
+        """ Initialize the query with the columns and the bitmasks
+        to match. The storage is used to filter by the change ticks.
+        """
+        self._columns = tuple(columns)
+        self._storage = storage
+        self._all_of = all_of
+        self._any_of = any_of
+        self._none_of = none_of
+        # Matched indexes (index -> item)
+        self._items = dict()
+
+    def __len__(self):
+        """ Return the number of indexes matched
+        """
+        return len(self._items)
+
+    def __contains__(self, index):
+        """ Return whether the index is matched by the query or not
+        """
+        return index in self._items
+
+    def __iter__(self):
+        """ Iterate over the items matched. Indexes not added yet into
+        the catalogue are not returned.
+        """
+        for item in list(self._items.values()):
+            if item is not None:
+                yield item
+
+    def match(self, archetype):
+        """ Return whether the archetype matches the query or not
+        """
+        signature = archetype.signature
+        if (signature & self._all_of) != self._all_of:
+            return False
+        if self._any_of and not (signature & self._any_of):
+            return False
+        return not (signature & self._none_of)
+
+    def _filter(self, columns, since, added):
+        """ Return the items with all the columns changed (or added)
+        since the given tick
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        items = [(index, item) for index, item in self._items.items() if item is not None]
+        if not items or self._storage is None:
+            return []
+        result = np.ones(len(items), dtype=np.bool_)
+        indexes = [index for index, item in items]
+        for column in columns:
+            result &= self._storage.ticks(indexes, column, added) >= since
+        return [items[position][1] for position in np.flatnonzero(result)]
+
+    def changed(self, columns, since=0):
+        """ Return the items with the columns changed since the tick.
+        Columns that are added are also considered changed.
+        """
+        return self._filter(columns, since, False)
+
+    def added(self, columns, since=0):
+        """ Return the items with the columns added since the tick
+        """
+        return self._filter(columns, since, True)
+
+    def _update(self, index, archetype, item=None):
+        """ Update the index once it's moved into a new archetype
+        """
+        if archetype is not None and self.match(archetype):
+            if index not in self._items or item is not None:
+                self._items[index] = item
+        else:
+            self._items.pop(index, None)
+
+    def _update_many(self, indexes, archetype, items):
+        """ Update several indexes moved into the same archetype
+        """
+        if archetype is not None and self.match(archetype):
+            self._items.update(zip(indexes, items))
+        else:
+            for index in indexes:
+                self._items.pop(index, None)
+
+    def _resolve(self, index, item):
+        """ Set the item for an index matched by the query
+        """
+        if index in self._items:
+            self._items[index] = item
+
+    def _remove(self, index):
+        """ Remove the index from the query
+        """
+        self._items.pop(index, None)
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        return "CatalogueQuery({}, matches:{})".format(list(self._columns), len(self._items))
@@ -0,0 +1,903 @@
+from collections import OrderedDict as dict
+import pandas as pd
+import numpy as np
+from ..base.utils import HandleAllocator
+
+def _object_array(values):
+    """ Create a numpy array of objects with the given values. This
+    prevents numpy to create a multi-dimensional array when the values
+    are also collections.
+    """
+    result = np.empty(len(values), dtype=object)
+    for index, value in enumerate(values):
+        result[index] = value
+    return result
+
+__all__ = ['Archetype',
+           'CatalogueStorage']
+
+class Archetype(object):
+    """ Archetype class.
+
+    An Archetype is a table that stores all the rows (indexes) that
+    share exactly the same signature, this is the same set of columns
+    bound. Each column is stored as a contiguous numpy array, so the
+    items for the same column are contiguous in memory and can be
+    iterated or sliced without going through the rows one by one.
+
+    The arrays are allocated with some capacity in advance, so adding
+    new rows is O(1) amortized. Rows are removed by moving the last
+    row into the removed position (swap and pop) so the tables never
+    have holes inside.
+
+        archetype = Archetype(0b101, ["transform","render"])
+        row = archetype.append(slot, {"transform":"T01", "render":"R01"})
+        archetype.column("transform")
+        >> array(['T01'], dtype=object)
+
+    Archetypes also cache the edges to another archetypes, so moving a
+    row when a column is bound or unbound doesn't need to compute and
+    search for the new signature every time.
+
+    """
+
+    # Initial capacity for the tables
+    DEFAULT_CAPACITY = 16
+
+    @property
+    def signature(self):
+        return self._signature
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def slots(self):
+        """ Return the slots for all the rows stored in the archetype
+        """
+        return self._slots[:self._count]
+
+    def __init__(self, signature, columns, capacity=None):
+        """ Initialize the tables for the given columns
+        """
+        self._signature = signature
+        self._columns = list(columns)
+        self._count = 0
+        self._capacity = capacity or Archetype.DEFAULT_CAPACITY
+        # Slots that are stored in the archetype (one per row)
+        self._slots = np.empty(self._capacity, dtype=np.int64)
+        # Create the tables for each column
+        self._data = dict()
+        for column in self._columns:
+            self._data[column] = np.empty(self._capacity, dtype=object)
+        # Cache with the archetypes when a column is added or removed
+        self._edges = dict()
+
+    def __len__(self):
+        """ Return the number of rows in the table
+        """
+        return self._count
+
+    def __contains__(self, column):
+        """ Return whether the column is in the archetype or not
+        """
+        return column in self._data
+
+    def _grow(self, capacity):
+        """ Grow the tables so they can store the capacity given
+        """
+        while self._capacity < capacity:
+            self._capacity *= 2
+        # Resize the slots and all the columns
+        slots = np.empty(self._capacity, dtype=np.int64)
+        slots[:self._count] = self._slots[:self._count]
+        self._slots = slots
+        for column in self._data:
+            data = np.empty(self._capacity, dtype=object)
+            data[:self._count] = self._data[column][:self._count]
+            self._data[column] = data
+
+    def append(self, slot, values=None):
+        """ Add a new row at the end of the table. The values must be
+        a dictionary with column:item. Columns not provided will be
+        set to None. The function returns the row inserted.
+        """
+        if self._count >= self._capacity:
+            self._grow(self._count + 1)
+        row = self._count
+        self._slots[row] = slot
+        for column in self._data:
+            if values is not None and column in values:
+                self._data[column][row] = values[column]
+            else:
+                self._data[column][row] = None
+        self._count += 1
+        return row
+
+    def remove(self, row):
+        """ Remove the given row from the table. The last row will be moved
+        into the removed row. The function returns the slot that has been
+        moved into the row or -1 if no row has been moved.
+        """
+        last = self._count - 1
+        moved = -1
+        if row != last:
+            # Move the last row into the current row
+            moved = int(self._slots[last])
+            self._slots[row] = moved
+            for column in self._data:
+                self._data[column][row] = self._data[column][last]
+        # Clean the last row so the references are released
+        for column in self._data:
+            self._data[column][last] = None
+        self._count -= 1
+        return moved
+
+    def extend(self, slots, values=None):
+        """ Add several rows at the end of the table at once. The values
+        must be a dictionary with column:array, with one item per slot.
+        The function returns the rows inserted.
+        """
+        count = len(slots)
+        if self._count + count > self._capacity:
+            self._grow(self._count + count)
+        start, end = self._count, self._count + count
+        self._slots[start:end] = slots
+        for column in self._data:
+            if values is not None and column in values:
+                self._data[column][start:end] = values[column]
+            else:
+                self._data[column][start:end] = None
+        self._count = end
+        return np.arange(start, end, dtype=np.int64)
+
+    def remove_many(self, rows):
+        """ Remove several rows at once. The table is compacted keeping
+        the order of the rows that remain. The function returns the slots
+        stored in the table after the removal (one per row).
+        """
+        keep = np.ones(self._count, dtype=np.bool_)
+        keep[rows] = False
+        count = int(np.count_nonzero(keep))
+        self._slots[:count] = self._slots[:self._count][keep]
+        for column in self._data:
+            data = self._data[column]
+            data[:count] = data[:self._count][keep]
+            data[count:self._count] = None
+        self._count = count
+        return self.slots
+
+    def row(self, row):
+        """ Return a dictionary with all the values in the row
+        """
+        return dict((column, self._data[column][row]) for column in self._columns)
+
+    def get(self, row, column):
+        """ Get the item for the given row and column
+        """
+        return self._data[column][row]
+
+    def set(self, row, column, item):
+        """ Set the item for the given row and column
+        """
+        self._data[column][row] = item
+
+    def column(self, column):
+        """ Return a view with all the items for the given column
+        """
+        return self._data[column][:self._count]
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        return "Archetype({}, rows:{})".format(self._columns, self._count)
+
+
+class CatalogueStorage(object):
+    """ CatalogueStorage class.
+
+    This is the storage used by the Catalogue class to map the indexes
+    (i.e. Entities) with the items bound in each column (i.e. Components).
+
+    Indexes are grouped by the columns they have bound (archetypes)
+    into contiguous tables. Each index has an slot assigned that is
+    used to know in which archetype and row it's stored. Slots are
+    reused when indexes are removed using a free list.
+
+    Bind an item in a column that is already bound for the index only
+    replace the item. Otherwise the index is moved into the archetype
+    with the new signature. All these operations are O(1) amortized.
+
+        storage = CatalogueStorage()
+        storage.bind("entity01", "Transform", "Transform01")
+        storage.bind("entity01", "Renderable", "Renderable01")
+        storage.bind("entity02", "Transform", "Transform02")
+        print(storage.dataframe())
+
+                    Transform    Renderable
+        entity01  Transform01  Renderable01
+        entity02  Transform02           NaN
+
+    Each column registered has a bit assigned, so the signature of an
+    archetype is the bitmask with the columns bound. Signatures are also
+    stored per slot in a numpy uint64 array (one word each 64 columns)
+    together with the active flag. This allows to select the indexes
+    that match a query using vectorized operations over all the slots.
+
+        mask = storage.mask(["Transform","Renderable"])
+        slots = storage.select(all_of=mask)
+        storage.keys(slots)
+        >> array(['entity01'], dtype=object)
+
+    When the indexes are integer handles (see HandleAllocator) the index
+    part of the handle is used directly to map the handles with the slots
+    in a sparse array. So several handles can be looked up at once using
+    lookup() function, and stale handles are detected comparing the key
+    stored in the slot.
+
+    The storage also keeps the change ticks for each slot and column.
+    The current tick is stamped as added and changed every time an item
+    is bound, and as changed when the item is touched (modified). Then
+    the indexes with the columns added or changed since a given tick can
+    be selected also with vectorized operations.
+
+        tick = storage.advance()
+        storage.touch("Transform01")
+        slots = storage.select(changed=storage.mask("Transform"), since=tick)
+
+    The dataframe is only materialized when it's requested, and it's
+    cached until the storage is modified again. So it must only be
+    used for debugging or reporting.
+
+    """
+
+    # Initial capacity for the slots
+    DEFAULT_CAPACITY = 64
+
+    # Number of bits per word in the signatures
+    WORD_BITS = 64
+    WORD_MASK = (1 << 64) - 1
+
+    @property
+    def columns(self):
+        return list(self._columns.keys())
+
+    @property
+    def archetypes(self):
+        return self._archetypes
+
+    @property
+    def version(self):
+        return self._version
+
+    @property
+    def tick(self):
+        return self._tick
+
+    @property
+    def signatures(self):
+        """ Return the signatures for all the slots allocated
+        """
+        return self._signatures[:self._size]
+
+    def __init__(self, capacity=None):
+        """ Initialize the tables
+        """
+        # Columns registered (column -> bit)
+        self._columns = dict()
+        # Archetypes created (signature -> archetype)
+        self._archetypes = dict()
+        # Indexes stored (index -> slot)
+        self._slots = dict()
+        self._free = []
+        self._size = 0
+        self._capacity = capacity or CatalogueStorage.DEFAULT_CAPACITY
+        # Location for each slot (archetype and row)
+        self._keys = np.empty(self._capacity, dtype=object)
+        self._locations = np.empty(self._capacity, dtype=object)
+        self._rows = np.zeros(self._capacity, dtype=np.int64)
+        # Signatures and flags for each slot
+        self._words = 1
+        self._signatures = np.zeros((self._capacity, self._words), dtype=np.uint64)
+        self._alive = np.zeros(self._capacity, dtype=np.bool_)
+        self._active = np.zeros(self._capacity, dtype=np.bool_)
+        # Sparse array with the slots for handles (handle index -> slot)
+        self._sparse = np.full(self._capacity, -1, dtype=np.int64)
+        # Items bound to know the indexes and columns (reverse lookup). An
+        # item can be shared by several indexes (item -> {index: column})
+        self._bound = dict()
+        # Change ticks for each slot and column (added and changed). The
+        # columns of the ticks grow (doubling) with the columns registered
+        self._tick = 1
+        self._tick_columns = 0
+        self._added = np.zeros((self._capacity, self._tick_columns), dtype=np.int64)
+        self._changed = np.zeros((self._capacity, self._tick_columns), dtype=np.int64)
+        # Version and the cache for the dataframe
+        self._version = 0
+        self._dataframe = None
+        self._dataframe_version = -1
+        # Create the default archetype with no columns
+        self._empty = self._get_archetype(0)
+
+    def __len__(self):
+        """ Return the number of indexes stored
+        """
+        return len(self._slots)
+
+    def __contains__(self, index):
+        """ Return whether the index is stored or not
+        """
+        return index in self._slots
+
+    def __iter__(self):
+        """ Iterate over all the indexes stored
+        """
+        for index in self._slots:
+            yield index
+
+    def _grow(self, capacity):
+        """ Grow the slots tables so they can store the capacity given
+        """
+        size = self._capacity
+        while self._capacity < capacity:
+            self._capacity *= 2
+        keys = np.empty(self._capacity, dtype=object)
+        keys[:size] = self._keys
+        self._keys = keys
+        locations = np.empty(self._capacity, dtype=object)
+        locations[:size] = self._locations
+        self._locations = locations
+        rows = np.zeros(self._capacity, dtype=np.int64)
+        rows[:size] = self._rows
+        self._rows = rows
+        signatures = np.zeros((self._capacity, self._words), dtype=np.uint64)
+        signatures[:size] = self._signatures
+        self._signatures = signatures
+        alive = np.zeros(self._capacity, dtype=np.bool_)
+        alive[:size] = self._alive
+        self._alive = alive
+        active = np.zeros(self._capacity, dtype=np.bool_)
+        active[:size] = self._active
+        self._active = active
+        self._added = self._resize_ticks(self._added)
+        self._changed = self._resize_ticks(self._changed)
+
+    def _resize_ticks(self, ticks):
+        """ Resize the ticks for the current slots and tick columns
+        """
+        shape = (self._capacity, self._tick_columns)
+        if ticks.shape == shape:
+            return ticks
+        result = np.zeros(shape, dtype=np.int64)
+        result[:ticks.shape[0],:ticks.shape[1]] = ticks
+        return result
+
+    def _register(self, column):
+        """ Register the column if not already registered. It returns
+        the bit assigned to the column.
+        """
+        if column not in self._columns:
+            bit = len(self._columns)
+            # Add a new word to the signatures if needed
+            if bit >= self._words * CatalogueStorage.WORD_BITS:
+                signatures = np.zeros((self._capacity, self._words + 1), dtype=np.uint64)
+                signatures[:,:self._words] = self._signatures
+                self._signatures = signatures
+                self._words += 1
+            # Add columns to the ticks if needed
+            if bit >= self._tick_columns:
+                self._tick_columns = max(self._tick_columns * 2, 4)
+                self._added = self._resize_ticks(self._added)
+                self._changed = self._resize_ticks(self._changed)
+            self._columns[column] = bit
+        return self._columns[column]
+
+    def _to_words(self, mask):
+        """ Convert the bitmask into an array with the words
+        """
+        words = [(mask >> (CatalogueStorage.WORD_BITS * word)) & CatalogueStorage.WORD_MASK
+                 for word in range(self._words)]
+        return np.array(words, dtype=np.uint64)
+
+    def _get_archetype(self, signature):
+        """ Get or create the archetype for the given signature
+        """
+        if signature not in self._archetypes:
+            columns = [column for column, bit in self._columns.items()
+                       if (signature >> bit) & 1]
+            self._archetypes[signature] = Archetype(signature, columns)
+        return self._archetypes[signature]
+
+    def _get_edge(self, archetype, column, add=True):
+        """ Get the archetype when a column is added or removed from
+        the given archetype. Edges are cached in the archetypes.
+        """
+        key = (column, add)
+        if key not in archetype._edges:
+            bit = 1 << self._register(column)
+            if add:
+                signature = archetype.signature | bit
+            else:
+                signature = archetype.signature & ~bit
+            archetype._edges[key] = self._get_archetype(signature)
+        return archetype._edges[key]
+
+    def _move(self, slot, archetype, values=None):
+        """ Move the slot to the archetype given, copying the current
+        values in the row.
+        """
+        source = self._locations[slot]
+        row = self._rows[slot]
+        # Get current values and update them with the new ones
+        current = source.row(row)
+        if values is not None:
+            current.update(values)
+        # Remove the row from the current archetype
+        moved = source.remove(row)
+        if moved >= 0:
+            self._rows[moved] = row
+        # Append the row into the new archetype
+        self._locations[slot] = archetype
+        self._rows[slot] = archetype.append(slot, current)
+        self._signatures[slot] = self._to_words(archetype.signature)
+
+    def _set_sparse(self, indexes, slots):
+        """ Map the handles given with the slots in the sparse array.
+        Indexes that are not integer handles are ignored.
+        """
+        handles = [(index, slot) for index, slot in zip(indexes, slots) 
+                   if isinstance(index, (int, np.integer)) and not isinstance(index, bool)]
+        if not handles:
+            return
+        positions = np.array([index for index, slot in handles], dtype=np.int64)
+        positions &= HandleAllocator.INDEX_MASK
+        size = len(self._sparse)
+        if positions.max() >= size:
+            while size <= positions.max():
+                size *= 2
+            sparse = np.full(size, -1, dtype=np.int64)
+            sparse[:len(self._sparse)] = self._sparse
+            self._sparse = sparse
+        self._sparse[positions] = [slot for index, slot in handles]
+
+    def _modified(self):
+        """ Storage has been modified
+        """
+        self._version += 1
+
+    def _from_words(self, words):
+        """ Convert an array with the words into a bitmask
+        """
+        mask = 0
+        for word, value in enumerate(words):
+            mask |= int(value) << (CatalogueStorage.WORD_BITS * word)
+        return mask
+
+    def _get_slots(self, indexes):
+        """ Return the slots for the indexes given
+        """
+        if len(indexes) and isinstance(indexes[0], (int, np.integer)):
+            # Integer handles are looked up directly
+            return self.lookup(indexes)
+        return np.array([self._slots[index] for index in indexes], dtype=np.int64)
+
+    def _unbound(self, item, index):
+        """ Remove the index from the reverse lookup of the item
+        """
+        bound = self._bound.get(item)
+        if bound is not None:
+            bound.pop(index, None)
+            if not bound:
+                del self._bound[item]
+
+    def references(self, item):
+        """ Return the number of indexes the item is bound to
+        """
+        return len(self._bound.get(item, ()))
+
+    def _stamp(self, slots, column):
+        """ Stamp the current tick as added and changed for the column
+        """
+        bit = self._columns[column]
+        self._added[slots, bit] = self._tick
+        self._changed[slots, bit] = self._tick
+
+    def _group(self, slots):
+        """ Group the slots given by the archetype where they are stored.
+        It returns a list with the archetype and the positions of the 
+        slots that belong to each archetype.
+        """
+        words, inverse = np.unique(self._signatures[slots], axis=0, return_inverse=True)
+        inverse = np.ravel(inverse)
+        result = []
+        for group, signature in enumerate(words):
+            archetype = self._archetypes[self._from_words(signature)]
+            result.append((archetype, np.flatnonzero(inverse == group)))
+        return result
+
+    def _set_location(self, slots, archetype, rows):
+        """ Set the archetype and rows for the given slots
+        """
+        locations = np.empty(len(slots), dtype=object)
+        locations.fill(archetype)
+        self._locations[slots] = locations
+        self._rows[slots] = rows
+        self._signatures[slots] = self._to_words(archetype.signature)
+
+    def _remove_rows(self, archetype, rows):
+        """ Remove the rows from the archetype and update the rows
+        for the slots that have been moved.
+        """
+        if len(rows) * 8 < archetype.count:
+            # Few rows, so swap and pop them (higher rows first)
+            for row in np.sort(rows)[::-1]:
+                moved = archetype.remove(row)
+                if moved >= 0:
+                    self._rows[moved] = row
+        else:
+            # Compact the table and update all the rows
+            slots = archetype.remove_many(rows)
+            self._rows[slots] = np.arange(len(slots), dtype=np.int64)
+
+    def slot(self, index):
+        """ Return the slot for the given index
+        """
+        return self._slots[index]
+
+    def key(self, slot):
+        """ Return the index stored in the given slot
+        """
+        return self._keys[slot]
+
+    def keys(self, slots):
+        """ Return the indexes stored in the given slots
+        """
+        return self._keys[slots]
+
+    def lookup(self, handles):
+        """ Return the slots for the integer handles given. The lookup is
+        done directly using the index part of the handles, so it's performed
+        for all the handles at once. Handles not stored or stale will 
+        return -1.
+        """
+        handles = np.asarray(handles, dtype=np.int64)
+        positions = handles & HandleAllocator.INDEX_MASK
+        inside = positions < len(self._sparse)
+        slots = np.where(inside, self._sparse[np.where(inside, positions, 0)], -1)
+        # Check the handle stored in the slots is the same (not stale)
+        found = slots >= 0
+        keys = self._keys[np.where(found, slots, 0)]
+        found[found] = keys[found] == handles[found]
+        return np.where(found, slots, -1)
+
+    def archetype(self, index):
+        """ Return the archetype where the index is stored or None
+        """
+        if index not in self._slots:
+            return None
+        return self._locations[self._slots[index]]
+
+    def mask(self, columns):
+        """ Return the bitmask for the given columns. Columns not
+        registered yet will be registered.
+        """
+        if columns is None:
+            return 0
+        if isinstance(columns, str):
+            columns = [columns]
+        mask = 0
+        for column in columns:
+            mask |= 1 << self._register(column)
+        return mask
+
+    def add(self, index, active=True):
+        """ Add a new index into the storage. The index will be stored
+        into the archetype with no columns. It returns the slot assigned.
+        """
+        if index in self._slots:
+            return self._slots[index]
+        # Get a free slot or a new one
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = self._size
+            if slot >= self._capacity:
+                self._grow(slot + 1)
+            self._size += 1
+        self._slots[index] = slot
+        self._keys[slot] = index
+        self._set_sparse([index], [slot])
+        self._locations[slot] = self._empty
+        self._rows[slot] = self._empty.append(slot)
+        self._signatures[slot] = 0
+        self._alive[slot] = True
+        self._active[slot] = active
+        self._modified()
+        return slot
+
+    def add_many(self, indexes, active=True):
+        """ Add all the indexes given into the storage at once. Indexes
+        already stored will be ignored. It returns the slots assigned.
+        """
+        indexes = [index for index in indexes if index not in self._slots]
+        count = len(indexes)
+        if not count:
+            return np.empty(0, dtype=np.int64)
+        # Get the free slots first and then the new ones
+        reused = min(len(self._free), count)
+        free = self._free[len(self._free) - reused:]
+        del self._free[len(self._free) - reused:]
+        if self._size + count - reused > self._capacity:
+            self._grow(self._size + count - reused)
+        slots = np.concatenate([np.array(free, dtype=np.int64), 
+                                np.arange(self._size, self._size + count - reused, dtype=np.int64)])
+        self._size += count - reused
+        # Store all the indexes into the default archetype
+        self._slots.update(zip(indexes, slots.tolist()))
+        self._keys[slots] = _object_array(indexes)
+        self._set_sparse(indexes, slots.tolist())
+        self._set_location(slots, self._empty, self._empty.extend(slots))
+        self._alive[slots] = True
+        self._active[slots] = active
+        self._modified()
+        return slots
+
+    def bind_many(self, indexes, columns):
+        """ Bind several columns for all the indexes given at once. Columns
+        must be a dictionary with column:items, with one item per index.
+        Indexes are moved between archetypes in blocks.
+
+            storage.bind_many(["entity01","entity02"], 
+                              {"Transform": ["Transform01","Transform02"],
+                               "Renderable": ["Renderable01","Renderable02"]})
+
+        """
+        indexes = list(indexes)
+        if not indexes:
+            return
+        self.add_many(indexes)
+        slots = self._get_slots(indexes)
+        values = dict((column, _object_array(items)) for column, items in columns.items())
+        mask = self.mask(list(values.keys()))
+        for source, positions in self._group(slots):
+            group = slots[positions]
+            rows = self._rows[group]
+            # Remove the reverse lookup for the items to be replaced
+            for column in values:
+                if column in source:
+                    for item, index in zip(source._data[column][rows], self._keys[group]):
+                        self._unbound(item, index)
+            target = self._get_archetype(source.signature | mask)
+            if target is source:
+                # Only replace the items
+                for column in values:
+                    source._data[column][rows] = values[column][positions]
+            else:
+                # Move the rows into the new archetype
+                current = dict((column, source._data[column][rows]) for column in source.columns)
+                for column in values:
+                    current[column] = values[column][positions]
+                self._remove_rows(source, rows)
+                self._set_location(group, target, target.extend(group, current))
+        # Update the reverse lookup for the new items
+        for column in values:
+            for item, index in zip(values[column], indexes):
+                self._bound.setdefault(item, dict())[index] = column
+            self._stamp(slots, column)
+        self._modified()
+
+    def remove_many(self, indexes):
+        """ Remove all the indexes given and the items bound to them
+        """
+        slots = np.array([self._slots.pop(index) for index in indexes 
+                          if index in self._slots], dtype=np.int64)
+        if not len(slots):
+            return
+        for archetype, positions in self._group(slots):
+            rows = self._rows[slots[positions]]
+            for column in archetype.columns:
+                for item, index in zip(archetype._data[column][rows], self._keys[slots[positions]]):
+                    self._unbound(item, index)
+            self._remove_rows(archetype, rows)
+        # Free the slots so they can be reused
+        self._keys[slots] = None
+        self._locations[slots] = None
+        self._signatures[slots] = 0
+        self._alive[slots] = False
+        self._active[slots] = False
+        self._free.extend(slots.tolist())
+        self._modified()
+
+    def remove(self, index):
+        """ Remove the index and all the items bound to it
+        """
+        if index not in self._slots:
+            return
+        slot = self._slots.pop(index)
+        archetype = self._locations[slot]
+        # Remove reverse lookup for the items bound
+        for column in archetype.columns:
+            self._unbound(archetype.get(self._rows[slot], column), index)
+        # Remove the row from the archetype
+        moved = archetype.remove(self._rows[slot])
+        if moved >= 0:
+            self._rows[moved] = self._rows[slot]
+        # Free the slot so it can be reused
+        self._keys[slot] = None
+        self._locations[slot] = None
+        self._signatures[slot] = 0
+        self._alive[slot] = False
+        self._active[slot] = False
+        self._free.append(slot)
+        self._modified()
+
+    def bind(self, index, column, item):
+        """ Bind the item with the given index and column.
+        """
+        slot = self.add(index)
+        archetype = self._locations[slot]
+        if column in archetype:
+            # Replace the current item (if it's not the same)
+            row = self._rows[slot]
+            if archetype.get(row, column) == item:
+                return
+            self._unbound(archetype.get(row, column), index)
+            archetype.set(row, column, item)
+        else:
+            # Move to the archetype with the column
+            self._move(slot, self._get_edge(archetype, column, True), {column: item})
+        self._bound.setdefault(item, dict())[index] = column
+        self._stamp(slot, column)
+        self._modified()
+
+    def unbind(self, index, column):
+        """ Unbind the item in the given index and column.
+        """
+        if index not in self._slots:
+            return
+        slot = self._slots[index]
+        archetype = self._locations[slot]
+        if column not in archetype:
+            return
+        # Remove the reverse lookup and move to the new archetype
+        self._unbound(archetype.get(self._rows[slot], column), index)
+        self._move(slot, self._get_edge(archetype, column, False))
+        self._modified()
+
+    def discard(self, item):
+        """ Unbind the given item from all the indexes is bound to. It
+        returns the list of indexes (empty if the item was not bound).
+        """
+        bound = list(self._bound.get(item, dict()).items())
+        for index, column in bound:
+            self.unbind(index, column)
+        return [index for index, _ in bound]
+
+    def advance(self):
+        """ Advance the current tick. Changes from now on will be
+        stamped with the new tick, that is returned.
+        """
+        self._tick += 1
+        return self._tick
+
+    def touch(self, item):
+        """ Stamp the current tick as changed for the index and column
+        where the item is bound. Items not bound are ignored.
+        """
+        for index, column in self._bound.get(item, dict()).items():
+            self._changed[self._slots[index], self._columns[column]] = self._tick
+
+    def ticks(self, indexes, column, added=False):
+        """ Return the ticks when the column was changed (or added) for
+        the indexes given
+        """
+        bit = self._register(column)
+        ticks = self._added if added else self._changed
+        indexes = list(indexes)
+        slots = self._get_slots(indexes)
+        if np.any(slots < 0):
+            missing = [index for index, slot in zip(indexes, slots) if slot < 0]
+            raise KeyError("Indexes not stored: {}".format(missing))
+        return ticks[slots, bit]
+
+    def get(self, index, column):
+        """ Get the item bound in the given index and column
+        """
+        slot = self._slots[index]
+        archetype = self._locations[slot]
+        if column not in archetype:
+            return None
+        return archetype.get(self._rows[slot], column)
+
+    def row(self, index):
+        """ Return a dictionary with all the items bound to the index
+        """
+        slot = self._slots[index]
+        return self._locations[slot].row(self._rows[slot])
+
+    def is_active(self, index):
+        """ Return whether the index is active or not
+        """
+        return bool(self._active[self._slots[index]])
+
+    def set_active(self, index, value):
+        """ Set whether the index is active or not
+        """
+        if index in self._slots:
+            self._active[self._slots[index]] = bool(value)
+
+    def select(self, all_of=0, any_of=0, none_of=0, active=True,
+                     changed=0, added=0, since=0):
+        """ Return the slots that match the given bitmasks. The selection
+        is computed using vectorized operations over all the slots.
+
+            all_of: all the columns in the mask must be bound
+            any_of: at least one of the columns must be bound
+            none_of: none of the columns can be bound
+            active: if True, only the active slots are returned
+            changed: the columns must be changed since the tick given
+            added: the columns must be added since the tick given
+
+        Masks can be created using mask() function.
+        """
+        signatures = self._signatures[:self._size]
+        result = self._alive[:self._size].copy()
+        if active:
+            result &= self._active[:self._size]
+        if all_of:
+            words = self._to_words(all_of)
+            result &= np.all((signatures & words) == words, axis=1)
+        if any_of:
+            words = self._to_words(any_of)
+            result &= np.any((signatures & words) != 0, axis=1)
+        if none_of:
+            words = self._to_words(none_of)
+            result &= np.all((signatures & words) == 0, axis=1)
+        for ticks, mask in ((self._changed, changed), (self._added, added)):
+            if mask:
+                # Columns must be also bound
+                words = self._to_words(mask)
+                result &= np.all((signatures & words) == words, axis=1)
+                bits = [bit for bit in range(mask.bit_length()) if (mask >> bit) & 1]
+                result &= np.all(ticks[:self._size, bits] >= since, axis=1)
+        return np.flatnonzero(result)
+
+    def dataframe(self):
+        """ Materialize the storage into a pandas dataframe. Index not bound
+        in a column will be NaN. The dataframe is cached until the storage
+        is modified.
+        """
+        if self._dataframe_version == self._version:
+            return self._dataframe
+        if not self._slots:
+            self._dataframe = pd.DataFrame()
+        else:
+            # Position of the slots in the dataframe (insertion order)
+            slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+            order = np.zeros(self._capacity, dtype=np.int64)
+            order[slots] = np.arange(len(slots))
+            # Fill all the data using the archetypes tables
+            data = np.full((len(slots), len(self._columns)), np.nan, dtype=object)
+            for archetype in self._archetypes.values():
+                if not archetype.count:
+                    continue
+                rows = order[archetype.slots]
+                for column in archetype.columns:
+                    data[rows, self._columns[column]] = archetype.column(column)
+            self._dataframe = pd.DataFrame(data, index=list(self._slots.keys()),
+                                           columns=self.columns)
+        self._dataframe_version = self._version
+        return self._dataframe
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        result = ""
+        for archetype in self._archetypes.values():
+            result += "   {}\n".format(str(archetype))
+        return result
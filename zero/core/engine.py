@@ -1,7 +1,8 @@
 import time
-from .base import Thread
+from .base import Thread, CommandBuffer
+from .scheduler import SystemScheduler
 from .controllers import DisplayController, DeviceController
-from ..system import InputManager, SceneManager, RenderManager
+from ..system import InputManager, SceneManager, TransformManager, RenderManager
 
 __all__ = ['CoreEngine']
 
@@ -30,6 +31,24 @@ class CoreEngine(Thread):
         """
         return self._render
 
+    @property
+    def commands(self):
+        """ Return the command buffer shared by all the systems
+        """
+        return self._commands
+
+    @property
+    def scheduler(self):
+        """ Return the scheduler that runs the systems
+        """
+        return self._scheduler
+
+    @property
+    def transforms(self):
+        """ Return the system that computes the world matrices
+        """
+        return self._transform_manager
+
     @property
     def scene(self):
         """ Get current Scene Graph
@@ -89,9 +108,14 @@ class CoreEngine(Thread):
         self._render = render
         self._scene = scene
         self._fps = fps
+        # Structural changes recorded by the systems during the frame
+        self._commands = CommandBuffer()
+        # Scheduler to run the systems each frame
+        self._scheduler = SystemScheduler()
         # Initialize the variables for the Managers
         self._input_manager = None
         self._scene_manager = None
+        self._transform_manager = None
         self._render_manager = None
 
     def __del__(self):
@@ -105,7 +129,17 @@ class CoreEngine(Thread):
         """
         self._input_manager = InputManager(self).init()
         self._scene_manager = SceneManager(self).init()
+        self._transform_manager = TransformManager(self).init()
         self._render_manager = RenderManager(self).init()
+        # Add the systems into the scheduler in order. Commands are
+        # applied after the updates as a barrier before render. World
+        # matrices are computed once the hierarchy has been updated.
+        self._scheduler.add(self._input_manager)
+        self._scheduler.add(self._scene_manager)
+        self._scheduler.add(self._commands.flush, writes=[SystemScheduler.ALL],
+                            main_thread=True, name="CommandBuffer")
+        self._scheduler.add(self._transform_manager)
+        self._scheduler.add(self._render_manager)
         # Return itself for Cascade
         return self
 
@@ -113,7 +147,15 @@ class CoreEngine(Thread):
     def _process(self):
         """ Main process running the engine
 
-        Basically the overal loop will be: Input, Update and Render           
+        Basically the overal loop will be: Input, Update and Render
+
+        The systems are run by the scheduler depending on the components
+        they read and write, so systems without conflicts run in parallel.
+        Render and Input are pinned to the main thread (the engine thread).
+
+        The changes recorded by the systems into the command buffer
+        (entities or components created, removed or modified) are
+        applied once per frame, after the updates and before render.
         """
         # Display must be created in the same context (thread) as OpenGL
         self.display.init()
@@ -121,14 +163,9 @@ class CoreEngine(Thread):
         # Start the Main loop for the program
         while self.running:     
 
-            # Process Inputs from the user
-            self._input_manager.run(False)
-
-            # Update Scene, Physics, Logic and solvers
-            self._scene_manager.run()
-
-            # Finally render the scene
-            self._render_manager.run()
+            # Process Inputs, update Scene, Physics, Logic and solvers,
+            # apply the commands recorded and finally render the scene
+            self._scheduler.run()
 
             time.sleep(1/60)
 
@@ -142,6 +179,8 @@ class CoreEngine(Thread):
         """This method force to Stops the engine and close the window
         """
         super(CoreEngine,self).stop()
+        # Wait for the workers of the scheduler
+        self._scheduler.shutdown()
         # Close All the windows and dipose
         self.display.close(True)
 
@@ -6,5 +6,12 @@ from .geometry import Geometry
 from .material import Material
 from .transform import Transform
 from .create import *
+from .cache import *
+from .importers import *
+from .optimize import *
+from .simplify import *
+from .group import *
+from .hierarchy import *
+from .batch import *
 
 
@@ -0,0 +1,82 @@
+""" Geometry Batching
+
+    Merge several geometries into one geometry, transforming the points
+    by the world matrix of each geometry (pre-transformed). The merged
+    geometry can be drawn with one draw call instead of one per object,
+    so it's used for static geometry (objects that don't move).
+
+        geometry, ranges = merge_geometries(geometries, matrices)
+        geometry.get_bounds()   # bounds of the batch in world space
+        ranges[i]               # (first, count) in the indices of i
+
+    Only the point attributes shared by all the geometries are merged.
+    Positions are transformed by the matrices (row vectors), normals by
+    the inverse transpose and tangents by the rotation and scale.
+"""
+
+import numpy as np
+from .geometry import Geometry
+
+__all__ = ['merge_geometries']
+
+def _transform_points(values, matrix):
+    """ Transform the points (n, 3 or 4) by the matrix (row vectors)
+    """
+    result = values.astype(np.float64)
+    points = np.dot(result[:, :3], matrix[:3, :3]) + matrix[3, :3]
+    result[:, :3] = points
+    return result
+
+def _transform_vectors(values, matrix, normals=False):
+    """ Transform the directions (n, 3 or 4) by the matrix (row vectors).
+    Normals use the inverse transpose of the matrix.
+    """
+    result = values.astype(np.float64)
+    linear = matrix[:3, :3]
+    if normals:
+        linear = np.linalg.inv(linear).T
+    vectors = np.dot(result[:, :3], linear)
+    length = np.linalg.norm(vectors, axis=1, keepdims=True)
+    result[:, :3] = np.divide(vectors, length, out=np.zeros_like(vectors), where=length > 0)
+    return result
+
+def merge_geometries(geometries, matrices, name="batch"):
+    """ Return the geometry with all the geometries given transformed by
+    their world matrices (n, 4, 4), and the range (first, count) of the
+    indices of each geometry. The indices use uint16 if the number of
+    points allows it.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    if len(geometries) != len(matrices):
+        raise ValueError("Each geometry must have a world matrix")
+    tables = [geometry.tables[geometry.geometry_types.points] for geometry in geometries]
+    # Attributes shared by all the geometries (in the order of the first)
+    names = [name for name in tables[0] if all(name in table for table in tables[1:])] \
+            if tables else []
+    counts = np.array([table.count for table in tables], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    triangles = [geometry._triangles() for geometry in geometries]
+    sizes = np.array([triangle.size for triangle in triangles], dtype=np.int64)
+    index_type = np.uint16 if offsets[-1] <= np.iinfo(np.uint16).max + 1 else Geometry.index_type
+    result = Geometry(name)
+    for attribute in names:
+        values = []
+        for table, matrix in zip(tables, matrices):
+            value = table.get(attribute)
+            if attribute == Geometry.point.position:
+                value = _transform_points(value, matrix)
+            elif attribute == Geometry.point.normal:
+                value = _transform_vectors(value, matrix, normals=True)
+            elif attribute == Geometry.point.tangent:
+                value = _transform_vectors(value, matrix)
+            values.append(value)
+        size = tables[0].size(attribute)
+        dtype = tables[0].dtype(attribute)
+        values = np.concatenate(values).astype(dtype).reshape(-1, size)
+        result.add_point_attrib(attribute, values, size=size, dtype=dtype)
+    indices = np.concatenate([triangle.ravel().astype(np.int64) + offset
+                              for triangle, offset in zip(triangles, offsets[:-1])]) \
+              if triangles else np.zeros(0, dtype=np.int64)
+    result.add_indices(indices.reshape(-1, 3).astype(index_type), dtype=index_type)
+    firsts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+    return result, np.stack([firsts, sizes], axis=1)
@@ -0,0 +1,122 @@
+""" Geometry Cache Format
+
+    Binary container to store the geometry so it can be loaded without
+    any parse step. The file has the following layout:
+
+        header      magic, version, number of attributes, alignment
+                    and the name of the geometry (64 bytes)
+        attributes  one entry per attribute with the table, name,
+                    dtype, size, rows and the offset of the data
+        data        raw arrays, each one aligned to a page (4096)
+
+    The geometry is read by mapping the whole file into memory with
+    np.memmap, and the attributes are views of the mapped file. So the
+    data is only paged in by the OS when the attributes are accessed,
+    and several processes could share the same pages.
+
+        write_geometry(geometry, "cube.geo")
+        geometry = read_geometry("cube.geo")
+
+    By default the file is mapped as copy-on-write ("c"), so the
+    attributes can be modified without modifying the file.
+"""
+
+import numpy as np
+from ..base import AttributeTable
+from .geometry import Geometry
+
+__all__ = ['write_geometry', 'read_geometry', 'GEOMETRY_CACHE_VERSION']
+
+# Magic and current version of the format
+GEOMETRY_CACHE_MAGIC = b"ZGEO"
+GEOMETRY_CACHE_VERSION = 1
+
+# Alignment for the raw arrays (page size)
+GEOMETRY_CACHE_ALIGNMENT = 4096
+
+# Header and attributes entries
+_header_dtype = np.dtype([("magic", "S4"),
+                          ("version", "<u4"),
+                          ("count", "<u4"),
+                          ("alignment", "<u4"),
+                          ("name", "S48")])
+_entry_dtype = np.dtype([("table", "S16"),
+                         ("name", "S32"),
+                         ("dtype", "S8"),
+                         ("size", "<u4"),
+                         ("reserved", "<u4"),
+                         ("rows", "<u8"),
+                         ("offset", "<u8")])
+
+def _align(offset, alignment=GEOMETRY_CACHE_ALIGNMENT):
+    """ Return the next offset aligned
+    """
+    return (offset + alignment - 1) // alignment * alignment
+
+def _encode(value, dtype, field):
+    """ Encode the value (utf-8) for the fixed size field of the dtype.
+    Values that don't fit raise ValueError instead of being truncated.
+    """
+    encoded = str(value).encode("utf-8")
+    size = dtype.fields[field][0].itemsize
+    if len(encoded) > size:
+        raise ValueError("Geometry cache {} '{}' is too long ({} bytes, max {})".format(
+                         field, value, len(encoded), size))
+    return encoded
+
+def write_geometry(geometry, filename):
+    """ Write all the attributes of the geometry into the file given
+    using the geometry cache format. Names longer than the fields of
+    the format (encoded in utf-8) raise ValueError.
+    """
+    arrays = [(index, name, np.ascontiguousarray(table.get(name)))
+              for index, table in geometry.tables.items() for name in table]
+    header = np.zeros(1, dtype=_header_dtype)
+    header["magic"] = GEOMETRY_CACHE_MAGIC
+    header["version"] = GEOMETRY_CACHE_VERSION
+    header["count"] = len(arrays)
+    header["alignment"] = GEOMETRY_CACHE_ALIGNMENT
+    header["name"] = _encode(geometry.name, _header_dtype, "name")
+    entries = np.zeros(len(arrays), dtype=_entry_dtype)
+    offset = _align(_header_dtype.itemsize + _entry_dtype.itemsize * len(arrays))
+    for entry, (index, name, values) in zip(entries, arrays):
+        entry["table"] = _encode(index, _entry_dtype, "table")
+        entry["name"] = _encode(name, _entry_dtype, "name")
+        entry["dtype"] = _encode(values.dtype.str, _entry_dtype, "dtype")
+        entry["size"] = values.shape[1]
+        entry["rows"] = values.shape[0]
+        entry["offset"] = offset
+        offset = _align(offset + values.nbytes)
+    with open(filename, "wb") as file:
+        file.write(header.tobytes())
+        file.write(entries.tobytes())
+        for entry, (index, name, values) in zip(entries, arrays):
+            file.seek(int(entry["offset"]))
+            file.write(values.tobytes())
+        file.truncate(max(offset, file.tell()))
+
+def read_geometry(filename, mode="c"):
+    """ Create a new geometry with the attributes of the file. The
+    attributes are memory mapped so nothing is read until they are
+    accessed.
+    """
+    data = np.memmap(filename, dtype=np.uint8, mode=mode)
+    header = data[:_header_dtype.itemsize].view(_header_dtype)[0]
+    if header["magic"] != GEOMETRY_CACHE_MAGIC:
+        raise ValueError("{} is not a geometry cache file".format(filename))
+    if header["version"] > GEOMETRY_CACHE_VERSION:
+        raise ValueError("Geometry cache version {} not supported".format(header["version"]))
+    start = _header_dtype.itemsize
+    entries = data[start:start + _entry_dtype.itemsize * int(header["count"])].view(_entry_dtype)
+    geometry = Geometry(header["name"].decode("utf-8") or None)
+    for entry in entries:
+        index = entry["table"].decode("utf-8")
+        dtype = np.dtype(entry["dtype"].decode("utf-8"))
+        shape = (int(entry["rows"]), int(entry["size"]))
+        offset = int(entry["offset"])
+        nbytes = shape[0] * shape[1] * dtype.itemsize
+        values = data[offset:offset + nbytes].view(dtype).reshape(shape)
+        if index not in geometry.tables:
+            geometry.tables[index] = AttributeTable()
+        geometry.tables[index].attach(entry["name"].decode("utf-8"), values)
+    return geometry
@@ -138,6 +138,15 @@ class Camera:
                                                                 self._rect[2],self._rect[3],
                                                                 self._zNear,self._zFar)     
 
+    def screen_size(self, center, radius):
+        """ Return the projected size of the sphere (center, radius) as
+        a fraction of the height of the viewport (perspective).
+        """
+        distance = length(nparray(center)[0:3] - nparray(self.position)[0:3])
+        if distance <= radius:
+            return float("inf")
+        return float(radius / (distance * np.tan(radians(self._fov) * 0.5)))
+
     def yaw(self, value):
         """Rotate using up direction
         """
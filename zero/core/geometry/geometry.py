@@ -1,6 +1,10 @@
 import numpy as np
 from ..base import Datasheet
 from ..base.utils import *
+from .optimize import (weld_vertices, remove_degenerates, reorder_triangles,
+                       reorder_vertices, acmr, DEFAULT_CACHE_SIZE)
+from .simplify import simplify
+from .group import GeometryGroup
 
 class Geometry(Datasheet):
     """ Geometry Class 
@@ -8,23 +12,69 @@ class Geometry(Datasheet):
     This class will create and store all the geometry needed
     to create points, vertices, primitives, etc..
 
-    The way this class works in by inherit from DataBase. This super
+    The way this class works in by inherit from Datasheet. This super
     class has two main members:
-        - data: dictionary where the geometry types will be stored.
-        For each item in data it will be stored one geomtry type:
+        - tables: dictionary where the geometry types will be stored.
+        For each item in tables it will be stored one geomtry type:
         points, vertices, prims, etc.. 
 
-        This uses pandas libraries to store all the data, because
-        it provides good performances manipulating the data.
+        Each attribute is stored in a contiguous numpy array with
+        shape (n, size), so the attributes can be used directly by
+        the drivers without any copy.
+
+            geometry.get_point_attrib("P")  # (n, 3) array (view)
 
         - attributes: This is another dictionary, where all the 
         attrbiutes will be stored. For multivalues attributes
         like vectors, matrizes, etc.. the data will be splitted into
-        size parts. Each column's name will be the name of the attributes
-        and a siffix (index_cols).
+        size parts in the dataframes (data). Each column's name will be
+        the name of the attributes and a siffix (index_cols).
 
             postion (vector3) -> { "P" : [Px, Py, Pz] }
 
+    The point attributes can be also packed into an interleaved vertex
+    buffer (structured numpy array) with all the attributes for each
+    vertex together. The layout of the buffer (offsets and stride) is
+    given by the dtype of the array. The buffer is cached until any
+    point attribute is modified.
+
+        buffer = geometry.get_vertex_buffer()
+        buffer.dtype.itemsize       # stride
+        buffer.dtype.fields["N"]    # (dtype, offset)
+
+    Normals, tangents and bounds are computed using vectorized numpy
+    operations (scatter with bincount) and cached until the positions,
+    indices or textcoords used are modified. The results can be also
+    stored as point attributes.
+
+        geometry.compute_normals()  # Add "N" (area weighted)
+        geometry.get_bounds()       # (min, max)
+
+    Indexed geometry can be optimized for rendering. Points are welded,
+    degenerate triangles removed and triangles and points reordered for
+    the vertex cache. The indices use uint16 if the points allow it.
+
+        stats = geometry.optimize()
+        stats["acmr"]               # (before, after)
+
+    Levels of detail (LOD) are generated by simplifying the geometry
+    (quadric error metric). Each level has the given ratio of the
+    triangles of the previous one and is used when the projected size
+    on screen is lower than its screen size (half of the previous).
+
+        geometry.generate_lods(levels=3, ratio=0.25)
+        level = geometry.select_lod(camera.screen_size(center, radius))
+        geometry.lods[level]
+
+    Points and primitives can be selected into named groups (see
+    GeometryGroup), stored as sorted indexes or bitsets. Groups are
+    used to wrangle or draw only a subset of the geometry, using views
+    of the contiguous ranges of the group instead of copies.
+
+        geometry.add_prim_group("top", normals[:, 1] > 0.0)
+        geometry.wrangle(function, group="top", prims=True)
+        geometry.get_draw_ranges("top")  # (first, count) in the indices
+
     """
 
     # Declare the subindex that will be used for multiple (vector) attribites
@@ -46,7 +96,8 @@ class Geometry(Datasheet):
                         "scale":"pscale",
                         "velocity":"V",
                         "life":"life",
-                        "acceleration":"accel"})
+                        "acceleration":"accel",
+                        "tangent":"T"})
 
     # prims attributes
     primitive = ParseDict({"indices":"Id",
@@ -68,14 +119,38 @@ class Geometry(Datasheet):
     # When a group is created it use a prefix to differenciate between normal attribs
     group_preffix = "group_"
 
+    # Maximum number of ranges to wrangle using views, groups with more
+    # ranges are gathered into a copy and scattered back
+    wrangle_ranges = 64
+
+    @property
+    def lods(self):
+        """ Return the levels of detail. The first level is the geometry
+        """
+        return self._lods
+
+    @property
+    def lod_sizes(self):
+        """ Return the screen size used for each level of detail
+        """
+        return self._lod_sizes
+
     @property
     def indexed(self):
         """ Property to return if the geometry has vertex indexing (faces)
         """
-        if self.primitive.indices in self.attributes[self._prims_index]:
-            return True
-        return False
+        if self._prims_index not in self.tables:
+            return False
+        return self.primitive.indices in self.tables[self._prims_index]
     
+    @property
+    def version(self):
+        """ Key that changes when the point attributes or the indices are
+        modified (the geometry must be uploaded or merged again)
+        """
+        return (self._vertex_buffer_layout()[0],
+                self._attributes_key([(self._prims_index, self.primitive.indices)]))
+
     def __init__(self,*args, **kwargs):
         """This is the main contructor of the class.
 
@@ -84,6 +159,16 @@ class Geometry(Datasheet):
         # Get the indexed in the create (simplify the code) 
         self._prims_index = self.geometry_types.primitives
         self._points_index = self.geometry_types.points
+        # Interleaved vertex buffer cached
+        self._vertex_buffer = None
+        self._vertex_buffer_key = None
+        # Values computed from the attributes (name -> (key, value))
+        self._computed = dict()
+        # Levels of detail and the screen size for each level
+        self._lods = [self]
+        self._lod_sizes = [float("inf")]
+        # Groups for each geometry type (group_preffix + name -> group)
+        self._groups = dict({self._points_index: dict(), self._prims_index: dict()})
         # Extract attributes in defaults
         self._extract_attributes()
 
@@ -144,20 +229,434 @@ class Geometry(Datasheet):
 
     def add_vertices(self, values, size=3, dtype=np.float32):
         #Add point Attributes Position
-        self.add_point_attrib(self.point.position, values, size, dtype)
+        self.add_point_attrib(self.point.position, values, size, dtype=dtype)
         return self
 
     def add_normals(self, values, size=3, dtype=np.float32):
         #Add point Attributes Normals
-        self.add_point_attrib(self.point.normal, values, size, dtype)
+        self.add_point_attrib(self.point.normal, values, size, dtype=dtype)
         return self
 
     def add_textcoords(self, values, size=3, dtype=np.float32):
             #Add point Attributes Normals
-        self.add_point_attrib(self.point.textcoords, values, size, dtype)
+        self.add_point_attrib(self.point.textcoords, values, size, dtype=dtype)
         return self
     
     def add_colors(self, values, size=3, dtype=np.float32):
             #Add point Attributes Normals
-        self.add_point_attrib(self.point.color, values, size, dtype)
+        self.add_point_attrib(self.point.color, values, size, dtype=dtype)
+        return self
+
+    def _count(self, index):
+        """ Return the number of elements of the geometry type. Not
+        indexed geometry has one primitive for every three points.
+        """
+        if index == self._prims_index and not self.indexed:
+            return len(self._triangles())
+        return self.tables[index].count if index in self.tables else 0
+
+    def _add_group(self, index, name, selection):
+        """ Add the group with the selection given: a GeometryGroup, a
+        boolean mask or the indexes of the elements
+        """
+        count = self._count(index)
+        if not isinstance(selection, GeometryGroup):
+            selection = np.asarray(selection)
+            if selection.dtype == bool:
+                selection = GeometryGroup.from_mask(selection)
+            else:
+                selection = GeometryGroup.from_indices(selection, count)
+        if selection.size != count:
+            raise ValueError("Group {} size {} doesn't match the {} {}".format(
+                                            name, selection.size, count, index))
+        self._groups[index][self.group_preffix + name] = selection
+        return self
+
+    def _get_group(self, index, name):
+        """ Return the group with the name given (or the group itself).
+        Groups are resized if elements have been added or removed.
+        """
+        if isinstance(name, GeometryGroup):
+            return name
+        group = self._groups[index][self.group_preffix + name]
+        count = self._count(index)
+        if group.size != count:
+            group = group.resize(count)
+            self._groups[index][self.group_preffix + name] = group
+        return group
+
+    def _group_names(self, index):
+        return [name[len(self.group_preffix):] for name in self._groups[index]]
+
+    @property
+    def point_groups(self):
+        """ Return the names of the point groups
+        """
+        return self._group_names(self._points_index)
+
+    @property
+    def prim_groups(self):
+        """ Return the names of the primitive groups
+        """
+        return self._group_names(self._prims_index)
+
+    def add_point_group(self, name, selection):
+        self._add_group(self._points_index, name, selection)
+        return self
+
+    def get_point_group(self, name):
+        return self._get_group(self._points_index, name)
+
+    def remove_point_group(self, name):
+        del self._groups[self._points_index][self.group_preffix + name]
+        return self
+
+    def add_prim_group(self, name, selection):
+        self._add_group(self._prims_index, name, selection)
         return self
+
+    def get_prim_group(self, name):
+        return self._get_group(self._prims_index, name)
+
+    def remove_prim_group(self, name):
+        del self._groups[self._prims_index][self.group_preffix + name]
+        return self
+
+    def wrangle(self, function, names=None, group=None, prims=False):
+        """ Call the function with a dictionary (name -> values) with the
+        point (or primitive) attributes of the elements in the group. The
+        function is called for each contiguous range of the group with
+        views of the attributes, so the values must be modified inplace:
+
+            def function(attributes):
+                attributes["P"] += [0.0, 1.0, 0.0]
+
+        Groups with more than wrangle_ranges ranges are gathered into a
+        copy and scattered back after calling the function once.
+        """
+        index = self._prims_index if prims else self._points_index
+        table = self.tables[index]
+        names = list(names or table)
+        arrays = dict((name, table.get(name)) for name in names)
+        if group is None:
+            ranges = [(0, table.count)]
+        else:
+            group = self._get_group(index, group)
+            ranges = group.ranges().tolist()
+        if len(ranges) <= self.wrangle_ranges:
+            for start, stop in ranges:
+                function(dict((name, values[start:stop]) for name, values in arrays.items()))
+        else:
+            rows = group.indices()
+            selected = dict((name, values[rows]) for name, values in arrays.items())
+            function(selected)
+            for name, values in selected.items():
+                arrays[name][rows] = values
+        for name in names:
+            table.touch(name)
+        return self
+
+    def get_draw_ranges(self, group=None):
+        """ Return the ranges (first, count) to draw the primitives in the
+        group. For indexed geometry the ranges are offsets in the indices
+        (elements) and for not indexed geometry they are in the points.
+        """
+        size = self.tables[self._prims_index].size(self.primitive.indices) \
+               if self.indexed else 3
+        if group is None:
+            count = self._count(self._prims_index)
+            ranges = np.array([[0, count]], dtype=np.int64) if count else \
+                     np.zeros((0, 2), dtype=np.int64)
+        else:
+            ranges = self._get_group(self._prims_index, group).ranges()
+        return np.stack([ranges[:, 0] * size, (ranges[:, 1] - ranges[:, 0]) * size], axis=1)
+
+    def _vertex_buffer_layout(self):
+        """ Return the key with the versions of the point attributes and
+        the attributes sorted (position first and standard attributes)
+        """
+        table = self.tables.get(self._points_index)
+        if table is None:
+            return (None, [])
+        standard = [name for name in self.point.__dict__.values() if name in table]
+        names = standard + [name for name in table if name not in standard]
+        key = (table.count, tuple((name, table.attribute_version(name)) for name in names))
+        return (key, names)
+
+    def get_vertex_buffer(self):
+        """ Return the point attributes interleaved into a tightly packed
+        structured array, where each attribute is a field with shape
+        (size,). The position is always the first field. The buffer is
+        cached until the point attributes are modified.
+        """
+        key, names = self._vertex_buffer_layout()
+        if key is None:
+            return None
+        if key != self._vertex_buffer_key:
+            table = self.tables[self._points_index]
+            dtype = np.dtype([(name, table.dtype(name), (table.size(name),)) for name in names])
+            buffer = np.empty(table.count, dtype=dtype)
+            for name in names:
+                buffer[name] = table.get(name)
+            self._vertex_buffer = buffer
+            self._vertex_buffer_key = key
+        return self._vertex_buffer
+
+    def _attributes_key(self, attributes):
+        """ Return the key with the versions of the attributes given as
+        (index, name) pairs. None is used for missing attributes.
+        """
+        key = []
+        for index, name in attributes:
+            table = self.tables.get(index)
+            if table is None or name not in table:
+                key.append(None)
+            else:
+                key.append((id(table), table.count, table.attribute_version(name)))
+        return tuple(key)
+
+    def _compute(self, name, attributes, function):
+        """ Return the value computed by the function, cached until any
+        of the attributes (index, name) is modified.
+        """
+        key = self._attributes_key(attributes)
+        if name not in self._computed or self._computed[name][0] != key:
+            self._computed[name] = (key, function())
+        return self._computed[name][1]
+
+    def _triangles(self):
+        """ Return the indices of the triangles. If the geometry is not
+        indexed every three points are considered a triangle.
+        """
+        if self.indexed:
+            return self.get_prim_attrib(self.primitive.indices).reshape(-1, 3)
+        count = len(self.get_point_attrib(self.point.position))
+        return np.arange(count - count % 3).reshape(-1, 3)
+
+    def _scatter(self, indices, values, count):
+        """ Sum the values of the triangles (m, size) into the points of
+        the triangles indices (m, 3).
+        """
+        indices = indices.ravel()
+        result = np.empty((count, values.shape[1]), dtype=np.float64)
+        for column in range(values.shape[1]):
+            result[:, column] = np.bincount(indices, np.repeat(values[:, column], 3),
+                                            minlength=count)
+        return result
+
+    def _normalize(values):
+        """ Normalize the vectors, ignoring the ones with zero length
+        """
+        length = np.linalg.norm(values, axis=1, keepdims=True)
+        return np.divide(values, length, out=np.zeros_like(values), where=length > 0)
+
+    def _cross_products(self):
+        """ Return the cross product of the edges for each triangle. The
+        length of the vector is two times the area of the triangle.
+        """
+        positions = self.get_point_attrib(self.point.position)[:, :3].astype(np.float64)
+        triangles = self._triangles()
+        p0, p1, p2 = (positions[triangles[:, corner]] for corner in range(3))
+        return np.cross(p1 - p0, p2 - p0)
+
+    def _position_key(self):
+        return [(self._points_index, self.point.position),
+                (self._prims_index, self.primitive.indices)]
+
+    def get_prim_normals(self):
+        """ Return the normals (unit length) of the triangles
+        """
+        return self._compute("prim_normals", self._position_key(),
+            lambda: Geometry._normalize(self._cross_products()).astype(np.float32))
+
+    def get_normals(self):
+        """ Return the area weighted normals of the points, computed
+        from the normals of the triangles that share each point
+        """
+        def normals():
+            count = len(self.get_point_attrib(self.point.position))
+            normals = self._scatter(self._triangles(), self._cross_products(), count)
+            return Geometry._normalize(normals).astype(np.float32)
+        return self._compute("normals", self._position_key(), normals)
+
+    def compute_normals(self):
+        """ Compute the normals of the points and store them as the
+        normal attribute ("N")
+        """
+        self.add_normals(self.get_normals())
+        return self
+
+    def get_tangents(self, textcoords=None):
+        """ Return the tangents of the points (x, y, z, w), where w is
+        the handedness of the bitangent (1 or -1). Tangents are computed
+        per triangle from the textcoords, accumulated in the points and
+        orthogonalized with the normals, like MikkTSpace does.
+        """
+        textcoords = textcoords or self.point.textcoords
+        attributes = self._position_key() + [(self._points_index, textcoords),
+                                             (self._points_index, self.point.normal)]
+        def tangents():
+            positions = self.get_point_attrib(self.point.position)[:, :3].astype(np.float64)
+            uvs = self.get_point_attrib(textcoords)[:, :2].astype(np.float64)
+            if self.point.normal in self.tables[self._points_index]:
+                normals = self.get_point_attrib(self.point.normal)[:, :3].astype(np.float64)
+            else:
+                normals = self.get_normals().astype(np.float64)
+            triangles = self._triangles()
+            p0, p1, p2 = (positions[triangles[:, corner]] for corner in range(3))
+            t0, t1, t2 = (uvs[triangles[:, corner]] for corner in range(3))
+            edge1, edge2 = p1 - p0, p2 - p0
+            duv1, duv2 = t1 - t0, t2 - t0
+            # Inverse of the determinant of the uv matrix (zero if degenerate)
+            det = duv1[:, 0] * duv2[:, 1] - duv2[:, 0] * duv1[:, 1]
+            inverse = np.divide(1.0, det, out=np.zeros_like(det), where=det != 0)[:, None]
+            sdir = (edge1 * duv2[:, 1:2] - edge2 * duv1[:, 1:2]) * inverse
+            tdir = (edge2 * duv1[:, 0:1] - edge1 * duv2[:, 0:1]) * inverse
+            count = len(positions)
+            tangent = self._scatter(triangles, sdir, count)
+            bitangent = self._scatter(triangles, tdir, count)
+            # Gram-Schmidt orthogonalize and compute the handedness
+            tangent -= normals * np.sum(normals * tangent, axis=1, keepdims=True)
+            tangent = Geometry._normalize(tangent)
+            handedness = np.where(np.sum(np.cross(normals, tangent) * bitangent, axis=1) < 0.0,
+                                  -1.0, 1.0)
+            return np.hstack([tangent, handedness[:, None]]).astype(np.float32)
+        return self._compute("tangents", attributes, tangents)
+
+    def compute_tangents(self, textcoords=None):
+        """ Compute the tangents of the points and store them as the
+        tangent attribute ("T")
+        """
+        self.add_point_attrib(self.point.tangent, self.get_tangents(textcoords),
+                              size=4, dtype=np.float32)
+        return self
+
+    def get_bounds(self):
+        """ Return the axis aligned bounding box (min, max) of the points
+        """
+        def bounds():
+            positions = self.get_point_attrib(self.point.position)[:, :3]
+            if not len(positions):
+                return (np.zeros(3, np.float32), np.zeros(3, np.float32))
+            return (positions.min(axis=0), positions.max(axis=0))
+        return self._compute("bounds", self._position_key()[:1], bounds)
+
+    def get_bounding_sphere(self):
+        """ Return the bounding sphere (center, radius) of the points.
+        The center of the sphere is the center of the bounding box.
+        """
+        def sphere():
+            minimum, maximum = self.get_bounds()
+            center = (minimum + maximum) * 0.5
+            positions = self.get_point_attrib(self.point.position)[:, :3]
+            if not len(positions):
+                return (center, 0.0)
+            radius = np.sqrt(np.max(np.sum((positions - center) ** 2, axis=1)))
+            return (center, float(radius))
+        return self._compute("bounding_sphere", self._position_key()[:1], sphere)
+
+    def optimize(self, tolerance=1e-6, cache_size=DEFAULT_CACHE_SIZE, weld=True, measure=True):
+        """ Optimize the indexed geometry for rendering:
+            - weld the points closer than the tolerance (with the same
+              attributes values)
+            - remove the degenerate triangles
+            - reorder the triangles for the vertex cache (Tipsify)
+            - reorder the points by first use (fetch locality)
+            - use uint16 indices if the number of points allows it
+        It returns the statistics with the values (before, after) for
+        "acmr", "points" and "triangles". The ACMR is simulated with a
+        python loop, so it's only computed if measure (0.0 otherwise).
+        """
+        if not self.indexed or self.tables[self._prims_index].size(self.primitive.indices) != 3:
+            raise ValueError("Only indexed triangle geometry can be optimized")
+        points = self.tables[self._points_index]
+        prims = self.tables[self._prims_index]
+        triangles = self._triangles().astype(np.int64)
+        positions = self.get_point_attrib(self.point.position)
+        stats = dict({"acmr": (acmr(triangles, cache_size) if measure else 0.0, 0.0),
+                      "points": (len(positions), 0),
+                      "triangles": (len(triangles), 0)})
+        if weld:
+            others = [points.get(name) for name in points if name != self.point.position]
+            triangles = weld_vertices(positions, tolerance, others)[triangles]
+        # Remove degenerate triangles and reorder them for the vertex cache
+        valid = np.flatnonzero(remove_degenerates(triangles, positions))
+        order = valid[reorder_triangles(triangles[valid], len(positions), cache_size)]
+        # Reorder the points by first use and remove the ones not used
+        vertices, triangles = reorder_vertices(triangles[order], len(positions))
+        index_type = np.uint16 if len(vertices) <= np.iinfo(np.uint16).max + 1 else self.index_type
+        prims.take(order)
+        points.take(vertices)
+        # Remap the groups to the new order of the elements
+        for index, rows in ((self._prims_index, order), (self._points_index, vertices)):
+            for name, group in self._groups[index].items():
+                self._groups[index][name] = group.take(rows)
+        self.add_indices(triangles.astype(index_type), dtype=index_type)
+        if measure:
+            stats["acmr"] = (stats["acmr"][0], acmr(triangles, cache_size))
+        stats["points"] = (stats["points"][0], len(vertices))
+        stats["triangles"] = (stats["triangles"][0], len(triangles))
+        return stats
+
+    def simplify(self, target):
+        """ Return a new geometry simplified to have target triangles at
+        most. The point attributes are averaged for the merged points.
+        """
+        positions = self.get_point_attrib(self.point.position)
+        vertices, triangles, clusters = simplify(positions, self._triangles(), target)
+        geometry = Geometry(self.name)
+        geometry.add_vertices(vertices.astype(np.float32))
+        table = self.tables[self._points_index]
+        used = clusters >= 0
+        weights = np.maximum(np.bincount(clusters[used], minlength=len(vertices)), 1)
+        for name in table:
+            if name == self.point.position:
+                continue
+            values = table.get(name)[used].astype(np.float64)
+            result = np.stack([np.bincount(clusters[used], values[:, column],
+                                           minlength=len(vertices))
+                               for column in range(values.shape[1])], axis=1)
+            result /= weights[:, None]
+            if name in (self.point.normal, self.point.tangent):
+                result[:, :3] = Geometry._normalize(result[:, :3])
+            geometry.add_point_attrib(name, result, size=values.shape[1],
+                                      dtype=table.dtype(name))
+        index_type = self.get_prim_attrib(self.primitive.indices).dtype if self.indexed \
+                     else self.index_type
+        geometry.add_indices(triangles.astype(index_type), dtype=index_type)
+        return geometry
+
+    def generate_lods(self, levels=3, ratio=0.25, screen_size=0.5):
+        """ Generate the levels of detail by simplifying the geometry.
+        Each level has ratio of the triangles of the previous level and
+        it's used when the size on screen is lower than its screen size.
+        """
+        count = len(self._triangles())
+        self._lods = [self]
+        self._lod_sizes = [float("inf")]
+        for level in range(1, levels + 1):
+            target = int(count * ratio ** level)
+            if target < 1:
+                break
+            self._lods.append(self.simplify(target))
+            self._lod_sizes.append(screen_size * 0.5 ** (level - 1))
+        return self
+
+    def select_lod(self, screen_size, current=None, hysteresis=0.1):
+        """ Return the level of detail to use for the size on screen.
+        If the current level is given, the level only changes when the
+        size is beyond the screen size of the level by the hysteresis
+        factor, so the level doesn't flicker around the limits.
+        """
+        sizes = self._lod_sizes
+        if current is None:
+            level = 0
+            while level + 1 < len(sizes) and screen_size < sizes[level + 1]:
+                level += 1
+            return level
+        level = min(current, len(sizes) - 1)
+        while level + 1 < len(sizes) and screen_size < sizes[level + 1] * (1.0 - hysteresis):
+            level += 1
+        while level > 0 and screen_size > sizes[level] * (1.0 + hysteresis):
+            level -= 1
+        return level
@@ -0,0 +1,267 @@
+""" Geometry Groups
+
+    Named subsets of points or primitives of a geometry (see
+    Geometry.add_point_group and Geometry.add_prim_group). Groups are
+    stored as sorted indexes or packed bitsets depending on their
+    density, and they are combined using vectorized set algebra.
+"""
+
+import numpy as np
+
+__all__ = ['GeometryGroup']
+
+class GeometryGroup(object):
+    """ Geometry Group Class
+
+    A group is a subset of the elements (points or primitives) of a
+    geometry with size elements. Groups are stored as sorted arrays of
+    indexes when they are sparse, or as packed bitsets (one bit per
+    element) when they are dense. The representation is chosen by the
+    density of the group, so both use the minimum memory.
+
+        group = GeometryGroup.from_indices([0, 5, 6], size=10)
+        group = GeometryGroup.from_mask(positions[:, 1] > 0.0)
+        group.indices()
+        >> array([0, 5, 6])
+
+    Groups support vectorized set algebra. Sparse groups are combined
+    using the sorted indexes and dense groups using bitwise operations.
+
+        selected = (top | front) - hidden
+        selected = top.intersection(front)
+        ~selected
+
+    The contiguous ranges of the group can be used to access to the
+    elements of the group using slices (views) instead of copies.
+
+        for start, stop in group.ranges():
+            positions[start:stop]
+    """
+
+    # Density (count / size) from which the bitset is used. Indexes use
+    # 32 bits per element while the bitset uses 1 bit per element.
+    DENSITY = 1.0 / 32.0
+
+    @property
+    def size(self):
+        """ Number of elements of the geometry (points or primitives)
+        """
+        return self._size
+
+    @property
+    def dense(self):
+        """ Return whether the group is stored as a bitset or not
+        """
+        return self._bits is not None
+
+    def __init__(self, size, indices=None, bits=None):
+        """ Create the group with the sorted indexes (unique) or the
+        packed bits given. Use from_indices or from_mask instead.
+        """
+        self._size = int(size)
+        self._indices = None
+        self._bits = None
+        self._count = None
+        if bits is not None:
+            self._bits = bits
+        else:
+            if indices is None:
+                indices = np.zeros(0, dtype=np.int64)
+            self._indices = indices
+            self._count = len(indices)
+
+    def _create(size, indices=None, bits=None):
+        """ Create the group using the representation for its density
+        """
+        group = GeometryGroup(size, indices, bits)
+        dense = len(group) > size * GeometryGroup.DENSITY
+        if dense and not group.dense:
+            return GeometryGroup(size, bits=group.bits())
+        if not dense and group.dense:
+            return GeometryGroup(size, indices=group.indices())
+        return group
+
+    def from_indices(indices, size):
+        """ Create the group with the indexes given (unsorted or repeated)
+        """
+        indices = np.unique(np.asarray(indices, dtype=np.int64).ravel())
+        if len(indices) and (indices[0] < 0 or indices[-1] >= size):
+            raise IndexError("Group indexes out of range [0, {})".format(size))
+        return GeometryGroup._create(size, indices=indices)
+
+    def from_mask(mask):
+        """ Create the group with the elements where the mask is True
+        """
+        mask = np.asarray(mask, dtype=bool).ravel()
+        return GeometryGroup._create(len(mask), bits=np.packbits(mask, bitorder="little"))
+
+    def full(size):
+        """ Create the group with all the elements
+        """
+        return GeometryGroup.from_mask(np.ones(size, dtype=bool))
+
+    def __len__(self):
+        """ Return the number of elements in the group
+        """
+        if self._count is None:
+            if hasattr(np, "bitwise_count"):
+                self._count = int(np.bitwise_count(self._bits).sum())
+            else:
+                self._count = int(np.unpackbits(self._bits).sum())
+        return self._count
+
+    def __iter__(self):
+        """ Iterate over the indexes of the group
+        """
+        for index in self.indices():
+            yield int(index)
+
+    def __contains__(self, index):
+        """ Return whether the element is in the group
+        """
+        return bool(self.contains(np.asarray([index]))[0])
+
+    def contains(self, indices):
+        """ Return the mask with the indexes given that are in the group
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        inside = (indices >= 0) & (indices < self._size)
+        result = np.zeros(len(indices), dtype=bool)
+        values = indices[inside]
+        if self.dense:
+            result[inside] = (self._bits[values >> 3] >> (values & 7)) & 1 == 1
+        else:
+            position = np.minimum(np.searchsorted(self._indices, values), max(len(self._indices) - 1, 0))
+            result[inside] = self._indices[position] == values if len(self._indices) else False
+        return result
+
+    def indices(self):
+        """ Return the sorted indexes of the elements in the group
+        """
+        if self.dense:
+            return np.flatnonzero(self.mask())
+        return self._indices
+
+    def mask(self):
+        """ Return the boolean mask (size) with the elements in the group
+        """
+        if self.dense:
+            return np.unpackbits(self._bits, count=self._size, bitorder="little").view(bool)
+        mask = np.zeros(self._size, dtype=bool)
+        mask[self._indices] = True
+        return mask
+
+    def bits(self):
+        """ Return the packed bits (little bit order) of the group
+        """
+        if self.dense:
+            return self._bits
+        return np.packbits(self.mask(), bitorder="little")
+
+    def ranges(self):
+        """ Return the contiguous ranges (start, stop) of the group
+        """
+        indices = self.indices()
+        if not len(indices):
+            return np.zeros((0, 2), dtype=np.int64)
+        breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+        starts = indices[np.r_[0, breaks]]
+        stops = indices[np.r_[breaks - 1, len(indices) - 1]] + 1
+        return np.stack([starts, stops], axis=1)
+
+    def take(self, rows):
+        """ Return the group for the elements reordered or filtered by
+        the rows given (new element i is the old element rows[i])
+        """
+        return GeometryGroup.from_mask(self.mask()[np.asarray(rows, dtype=np.int64)])
+
+    def resize(self, size):
+        """ Return the group for the size given. New elements are not in
+        the group and the elements beyond the size are removed.
+        """
+        if size >= self._size:
+            return GeometryGroup._create(size, indices=self.indices())
+        indices = self.indices()
+        return GeometryGroup._create(size, indices=indices[:np.searchsorted(indices, size)])
+
+    def _check(self, other):
+        if self._size != other.size:
+            raise ValueError("Groups with different sizes {} != {}".format(
+                                                        self._size, other.size))
+
+    def _clear_padding(self, bits):
+        """ Clear the bits after the size of the group
+        """
+        padding = len(bits) * 8 - self._size
+        if padding:
+            bits[-1] &= np.uint8(0xFF >> padding)
+        return bits
+
+    def union(self, other):
+        """ Return the elements in any of the groups
+        """
+        self._check(other)
+        if not self.dense and not other.dense:
+            return GeometryGroup._create(self._size, indices=np.union1d(self._indices, other._indices))
+        return GeometryGroup._create(self._size, bits=self.bits() | other.bits())
+
+    def intersection(self, other):
+        """ Return the elements in both groups
+        """
+        self._check(other)
+        if not self.dense and not other.dense:
+            return GeometryGroup._create(self._size, indices=np.intersect1d(
+                                        self._indices, other._indices, assume_unique=True))
+        if not self.dense or not other.dense:
+            sparse, dense = (self, other) if not self.dense else (other, self)
+            return GeometryGroup._create(self._size,
+                                        indices=sparse._indices[dense.contains(sparse._indices)])
+        return GeometryGroup._create(self._size, bits=self._bits & other._bits)
+
+    def difference(self, other):
+        """ Return the elements in the group that are not in the other
+        """
+        self._check(other)
+        if not self.dense:
+            return GeometryGroup._create(self._size,
+                                        indices=self._indices[~other.contains(self._indices)])
+        return GeometryGroup._create(self._size, bits=self._bits & ~other.bits())
+
+    def symmetric_difference(self, other):
+        """ Return the elements in only one of the groups
+        """
+        self._check(other)
+        if not self.dense and not other.dense:
+            return GeometryGroup._create(self._size, indices=np.setxor1d(
+                                        self._indices, other._indices, assume_unique=True))
+        return GeometryGroup._create(self._size, bits=self.bits() ^ other.bits())
+
+    def complement(self):
+        """ Return the elements that are not in the group
+        """
+        return GeometryGroup._create(self._size, bits=self._clear_padding(~self.bits()))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetric_difference
+    __invert__ = complement
+
+    def __eq__(self, other):
+        """ Return whether both groups have the same elements
+        """
+        if not isinstance(other, GeometryGroup):
+            return False
+        return (self._size == other.size and len(self) == len(other) and
+                np.array_equal(self.indices(), other.indices()))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        return "GeometryGroup(count:{}, size:{}, {})".format(
+                            len(self), self._size, "bits" if self.dense else "indices")
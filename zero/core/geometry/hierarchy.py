@@ -0,0 +1,260 @@
+""" Transform Hierarchy
+
+    Structure of arrays with the local transformations (position,
+    rotation and scale) of all the nodes of a hierarchy. Nodes are
+    sorted in topological order (parents before children) and grouped
+    by depth, so the local and world matrices of all the nodes are
+    computed with a few vectorized passes (one per level):
+
+        world = local                       (roots)
+        world = local * world[parent]       (children, row vectors)
+
+    Only the nodes modified and their subtrees are computed again.
+
+        hierarchy = TransformHierarchy()
+        hierarchy.build(["root", "child"], [None, "root"])
+        hierarchy.set("root", position=[0.0, 1.0, 0.0])
+        hierarchy.update()
+        hierarchy.world_matrix("child")
+
+    The matrices use the same convention as Transform.model, so the
+    world matrix of a root is equal to the model of its transform.
+"""
+
+import numpy as np
+
+__all__ = ['TransformHierarchy']
+
+def _quaternion_multiply(a, b):
+    """ Multiply (Hamilton product) the quaternions (n, 4) as (x, y, z, w)
+    """
+    ax, ay, az, aw = a.T
+    bx, by, bz, bw = b.T
+    return np.stack([aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw,
+                     aw * bw - ax * bx - ay * by - az * bz], axis=1)
+
+def _quaternions(rotations):
+    """ Return the quaternions (n, 4) for the rotations in degrees (n, 3).
+    Rotations are composed in the same order used by Transform.
+    """
+    angles = np.radians(np.asarray(rotations, dtype=np.float64).reshape(-1, 3)) * 0.5
+    sin, cos = np.sin(angles), np.cos(angles)
+    zeros = np.zeros(len(angles))
+    qx = np.stack([sin[:, 0], zeros, zeros, cos[:, 0]], axis=1)
+    qy = np.stack([zeros, sin[:, 1], zeros, cos[:, 1]], axis=1)
+    qz = np.stack([zeros, zeros, sin[:, 2], cos[:, 2]], axis=1)
+    return _quaternion_multiply(_quaternion_multiply(qy, qx), qz)
+
+def _rotation_matrices(quaternions):
+    """ Return the rotation matrices (n, 3, 3) for the quaternions
+    """
+    x, y, z, w = quaternions.T
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], axis=1),
+        np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], axis=1),
+        np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=1)],
+        axis=1)
+
+class TransformHierarchy(object):
+    """ Transform Hierarchy Class
+
+    Nodes are identified by their keys (i.e. entity ids) and stored in
+    rows sorted by depth. Positions and scales are (n, 3) arrays and
+    rotations are quaternions (n, 4). World matrices are (n, 4, 4)
+    float32 arrays that can be used directly by the drivers. Every time
+    the world matrix of a node is computed its version is incremented.
+    """
+
+    @property
+    def count(self):
+        return len(self._keys)
+
+    @property
+    def keys(self):
+        """ Keys of the nodes in topological order
+        """
+        return self._keys
+
+    @property
+    def parents(self):
+        """ Row of the parent of each node (-1 for roots)
+        """
+        return self._parents
+
+    @property
+    def positions(self):
+        return self._positions
+
+    @property
+    def rotations(self):
+        return self._rotations
+
+    @property
+    def scales(self):
+        return self._scales
+
+    @property
+    def local(self):
+        return self._local
+
+    @property
+    def world(self):
+        return self._world
+
+    @property
+    def versions(self):
+        return self._versions
+
+    def __init__(self):
+        """ Initialize the hierarchy without nodes
+        """
+        self._keys = []
+        self._rows = dict()
+        self._levels = []
+        self._parents = np.zeros(0, dtype=np.int64)
+        self._positions = np.zeros((0, 3))
+        self._rotations = np.zeros((0, 4))
+        self._scales = np.zeros((0, 3))
+        self._local = np.zeros((0, 4, 4))
+        self._world64 = np.zeros((0, 4, 4))
+        self._world = np.zeros((0, 4, 4), dtype=np.float32)
+        self._versions = np.zeros(0, dtype=np.int64)
+        self._dirty = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def build(self, keys, parents):
+        """ Build the hierarchy with the keys and the key of the parent
+        of each node (None for roots). Nodes already in the hierarchy
+        keep their transformations, new nodes have the identity.
+        """
+        keys = list(keys)
+        lookup = dict((key, index) for index, key in enumerate(keys))
+        if len(lookup) != len(keys):
+            raise ValueError("Hierarchy keys must be unique")
+        parent = np.array([-1 if key is None else lookup[key] for key in parents],
+                          dtype=np.int64).reshape(-1)
+        # Depth of the nodes, resolved one level at a time
+        depth = np.zeros(len(keys), dtype=np.int64)
+        known = parent < 0
+        while not np.all(known):
+            resolved = ~known & known[np.maximum(parent, 0)]
+            if not np.any(resolved):
+                raise ValueError("Hierarchy has cycles")
+            depth[resolved] = depth[parent[resolved]] + 1
+            known |= resolved
+        order = np.argsort(depth, kind="stable")
+        inverse = np.empty(len(keys), dtype=np.int64)
+        inverse[order] = np.arange(len(keys))
+        parent = parent[order]
+        parent[parent >= 0] = inverse[parent[parent >= 0]]
+        depth = depth[order]
+        # Keep the transformations of the nodes already in the hierarchy
+        count = len(keys)
+        positions, scales = np.zeros((count, 3)), np.ones((count, 3))
+        rotations = np.zeros((count, 4))
+        rotations[:, 3] = 1.0
+        versions = np.zeros(count, dtype=np.int64)
+        keys = [keys[index] for index in order]
+        previous = np.array([self._rows.get(key, -1) for key in keys], dtype=np.int64)
+        kept = previous >= 0
+        positions[kept] = self._positions[previous[kept]]
+        rotations[kept] = self._rotations[previous[kept]]
+        scales[kept] = self._scales[previous[kept]]
+        versions[kept] = self._versions[previous[kept]]
+        self._keys = keys
+        self._rows = dict((key, row) for row, key in enumerate(keys))
+        self._parents = parent
+        self._levels = np.searchsorted(depth, np.arange(depth[-1] + 2) if count else [0]).tolist()
+        self._positions, self._rotations, self._scales = positions, rotations, scales
+        self._versions = versions
+        self._local = np.zeros((count, 4, 4))
+        self._world64 = np.zeros((count, 4, 4))
+        self._world = np.zeros((count, 4, 4), dtype=np.float32)
+        # Everything must be computed again (parents may have changed)
+        self._dirty = np.ones(count, dtype=bool)
+        return self
+
+    def row(self, key):
+        """ Return the row of the node with the key given
+        """
+        return self._rows[key]
+
+    def set(self, key, position=None, rotation=None, scale=None):
+        """ Set the transformation of the node. Rotation is given as
+        euler angles in degrees (like Transform).
+        """
+        self.set_many([self._rows[key]],
+                      None if position is None else [position],
+                      None if rotation is None else [rotation],
+                      None if scale is None else [scale])
+        return self
+
+    def set_many(self, rows, positions=None, rotations=None, scales=None):
+        """ Set the transformations of the rows given at once. Rotations
+        are given as euler angles in degrees (n, 3).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if positions is not None:
+            self._positions[rows] = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        if rotations is not None:
+            self._rotations[rows] = _quaternions(rotations)
+        if scales is not None:
+            self._scales[rows] = np.asarray(scales, dtype=np.float64).reshape(-1, 3)
+        self._dirty[rows] = True
+        return self
+
+    def _compose(self, rows):
+        """ Compute the local matrices (translation, rotation and scale)
+        """
+        rotation = _rotation_matrices(self._rotations[rows])
+        scale = self._scales[rows]
+        local = np.zeros((len(rows), 4, 4))
+        local[:, :3, :3] = rotation * scale[:, None, :]
+        local[:, 3, :3] = np.einsum("ni,nij->nj", self._positions[rows], rotation) * scale
+        local[:, 3, 3] = 1.0
+        self._local[rows] = local
+
+    def update(self):
+        """ Compute the local matrices of the nodes modified and the world
+        matrices of their subtrees. It returns the rows updated.
+        """
+        dirty = self._dirty
+        if not np.any(dirty):
+            return np.zeros(0, dtype=np.int64)
+        self._compose(np.flatnonzero(dirty))
+        changed = dirty.copy()
+        levels = self._levels
+        for level, (start, stop) in enumerate(zip(levels[:-1], levels[1:])):
+            if level == 0:
+                rows = np.flatnonzero(changed[start:stop]) + start
+                self._world64[rows] = self._local[rows]
+                continue
+            parents = self._parents[start:stop]
+            changed[start:stop] |= changed[parents]
+            rows = np.flatnonzero(changed[start:stop]) + start
+            if len(rows):
+                self._world64[rows] = np.matmul(self._local[rows],
+                                                self._world64[self._parents[rows]])
+        rows = np.flatnonzero(changed)
+        self._world[rows] = self._world64[rows]
+        self._versions[rows] += 1
+        dirty[:] = False
+        return rows
+
+    def world_matrix(self, key):
+        """ Return the world matrix (view) of the node with the key given
+        """
+        return self._world[self._rows[key]]
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        return "TransformHierarchy(count:{}, levels:{})".format(
+                                    len(self._keys), max(len(self._levels) - 1, 0))
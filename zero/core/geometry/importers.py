@@ -0,0 +1,405 @@
+""" Geometry Importers
+
+    Streaming importers for Wavefront OBJ and PLY (ascii and binary)
+    files. Files are parsed in chunks of a fixed number of rows, and
+    each chunk is converted at once into numpy arrays, so the values
+    are never stored as python floats.
+
+        geometry = read_obj("bunny.obj")
+        geometry = read_ply("bunny.ply", chunk_size=1 << 16)
+
+    OBJ files index positions, textcoords and normals independently.
+    The importer keeps the (position, textcoord, normal) tuples used by
+    each corner and deduplicates them at the end, so the geometry has
+    one point per unique tuple and the primitives are indexed. Polygons
+    with more than three vertices are triangulated as a fan, and the
+    triangles keep the order of the faces in the file.
+
+    The resulting geometry has the point attributes "P", "N", "UV" and
+    "Cd" (if present in the file) and the primitive indices "Id".
+"""
+
+import os
+from itertools import islice
+import numpy as np
+from .geometry import Geometry
+
+__all__ = ['read_obj', 'read_ply', 'read_mesh']
+
+# Default number of rows (lines, vertices or faces) per chunk
+DEFAULT_CHUNK_SIZE = 1 << 18
+
+class _Buffer(object):
+    """ Growable array to append the values of each chunk
+    """
+    def __init__(self, columns, dtype, capacity=1024):
+        self._data = np.empty((capacity, columns), dtype=dtype)
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def extend(self, values):
+        end = self._count + len(values)
+        if end > len(self._data):
+            data = np.empty((max(end, len(self._data) * 2), self._data.shape[1]),
+                            dtype=self._data.dtype)
+            data[:self._count] = self._data[:self._count]
+            self._data = data
+        self._data[self._count:end] = values
+        self._count = end
+
+    def data(self):
+        return self._data[:self._count]
+
+def _triangulate(polygons):
+    """ Triangulate the polygons (m, n) with the same number of vertices
+    using a fan. It returns the triangles with shape (m * (n - 2), 3).
+    """
+    count = polygons.shape[1]
+    if count == 3:
+        return polygons
+    first = np.repeat(polygons[:, :1], count - 2, axis=1)
+    return np.stack([first, polygons[:, 1:-1], polygons[:, 2:]], axis=2).reshape(-1, 3)
+
+def _fan_corners(sizes):
+    """ Return the corners (t, 3) of the triangles for the polygons with
+    the number of vertices given, with the corners of all the polygons
+    flattened. Each polygon is triangulated as a fan and the triangles
+    keep the order of the polygons. Polygons with less than three
+    vertices are skipped.
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    counts = np.maximum(sizes - 2, 0)
+    starts = np.cumsum(sizes) - sizes
+    first = np.repeat(starts, counts)
+    # Index of each triangle in its polygon
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.stack([first, first + local + 1, first + local + 2], axis=1)
+
+def _geometry(positions, indices, normals=None, textcoords=None, colors=None, name=None):
+    """ Create the geometry with the attributes given
+    """
+    geometry = Geometry(name)
+    geometry.add_vertices(positions)
+    if normals is not None:
+        geometry.add_normals(normals)
+    if textcoords is not None:
+        geometry.add_textcoords(textcoords, size=2)
+    if colors is not None:
+        geometry.add_colors(colors, size=4)
+    geometry.add_indices(indices.astype(Geometry.index_type))
+    return geometry
+
+def _split_values(text, dtype):
+    """ Convert the values separated by whitespaces into an array
+    """
+    return np.array(text.split(), dtype=dtype)
+
+def _parse_values(lines, columns, prefix=None, dtype=np.float32):
+    """ Parse the lines with the same number of values into an array.
+    The prefix of the lines (i.e. "v ") is removed if given.
+    """
+    text = "".join(lines)
+    if prefix is not None:
+        text = text.replace(prefix, " ")
+    values = _split_values(text, dtype)
+    if values.size != len(lines) * columns:
+        raise ValueError("Expected {} values per row".format(columns))
+    return values.reshape(-1, columns)
+
+def _obj_format(corner):
+    """ Return the components (v, vt, vn) used by the face corner
+    """
+    parts = corner.split("/")
+    if len(parts) == 1:
+        return (0,)
+    if len(parts) == 2:
+        return (0, 1)
+    if not parts[1]:
+        return (0, 2)
+    return (0, 1, 2)
+
+def _obj_bases(lines):
+    """ Return the number of positions, textcoords and normals read
+    before each face in the lines
+    """
+    bases, count = [], [0, 0, 0]
+    components = {"v ": 0, "vt": 1, "vn": 2}
+    for line in lines:
+        key = line[:2]
+        if key == "f ":
+            bases.append(tuple(count))
+        elif key in components:
+            count[components[key]] += 1
+    return np.asarray(bases, dtype=np.int64)
+
+def read_obj(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Read a Wavefront OBJ file into a new geometry
+    """
+    # Values read (positions, textcoords, normals) and corners for the triangles
+    values = [None, None, None]
+    columns = [0, 0, 0]
+    counts = [0, 0, 0]
+    corners = None
+    components = None
+    colors = None
+    prefixes = ["v ", "vt", "vn"]
+    with open(filename, "r") as file:
+        while True:
+            lines = list(islice(file, chunk_size))
+            if not lines:
+                break
+            # Split the lines by type (positions, textcoords, normals, faces)
+            rows = ([], [], [], [])
+            appends = {"v ": rows[0].append, "vt": rows[1].append,
+                       "vn": rows[2].append, "f ": rows[3].append}
+            for line in lines:
+                append = appends.get(line[:2])
+                if append is not None:
+                    append(line)
+            # Parse the values read in the chunk
+            for index, size in enumerate([3, 2, 3]):
+                if not rows[index]:
+                    continue
+                if values[index] is None:
+                    # Number of values per row in the file, since positions
+                    # could have weights (x y z w) or colors (x y z r g b)
+                    values[index] = _Buffer(size, np.float32)
+                    columns[index] = len(rows[index][0].split()) - 1
+                    if index == 0 and columns[0] >= 6:
+                        colors = _Buffer(4, np.float32)
+                array = _parse_values(rows[index], columns[index], prefixes[index])
+                if index == 0 and colors is not None:
+                    colors.extend(np.hstack([array[:, 3:6], np.ones((len(array), 1), np.float32)]))
+                values[index].extend(array[:, :size])
+                counts[index] += len(array)
+            faces = rows[3]
+            if not faces:
+                continue
+            # Parse all the corners of the faces at once
+            if components is None:
+                components = _obj_format(faces[0].split()[1])
+                corners = _Buffer(len(components), np.int64)
+            text = "".join(faces).replace("f", " ")
+            text = text.replace("//", " ") if components == (0, 2) else text.replace("/", " ")
+            indices = _split_values(text, np.int64)
+            if indices.size == len(faces) * 3 * len(components):
+                sizes = np.full(len(faces), 3)
+            else:
+                sizes = np.array([len(face.split()) - 1 for face in faces])
+            if indices.size != sizes.sum() * len(components):
+                raise ValueError("Mixed face formats are not supported")
+            indices = indices.reshape(-1, len(components))
+            # Resolve negative indices (relative to the values already read)
+            negative = indices < 0
+            indices -= 1
+            if negative.any():
+                bases = np.repeat(_obj_bases(lines), sizes, axis=0)
+                for column, component in enumerate(components):
+                    previous = counts[component] - len(rows[component])
+                    rows_negative = negative[:, column]
+                    indices[rows_negative, column] += previous + bases[rows_negative, component] + 1
+            # Triangulate the faces keeping the order of the file
+            corners.extend(indices[_fan_corners(sizes).ravel()])
+    if values[0] is None:
+        raise ValueError("{} has no vertices".format(filename))
+    positions = values[0].data()
+    if corners is None or not len(corners):
+        indices = np.zeros((0, 3), dtype=Geometry.index_type)
+        return _geometry(positions, indices, name=os.path.basename(filename))
+    corners = corners.data()
+    if len(components) == 1:
+        # Only positions, so points are already indexed
+        unique, indices = None, corners[:, 0]
+    else:
+        # Deduplicate the (position, textcoord, normal) tuples
+        bits = [max(int(counts[component]), 1).bit_length() for component in components]
+        if sum(bits) <= 63:
+            keys = np.zeros(len(corners), dtype=np.int64)
+            for column, size in enumerate(bits):
+                keys = (keys << size) | corners[:, column]
+        else:
+            keys = np.ascontiguousarray(corners).view(
+                        np.dtype((np.void, corners.dtype.itemsize * len(components)))).ravel()
+        keys, first, indices = np.unique(keys, return_index=True, return_inverse=True)
+        unique = corners[first]
+    attributes = dict()
+    if colors is not None:
+        attributes[3] = colors.data()
+    if unique is not None:
+        positions = positions[unique[:, 0]]
+        for column, component in enumerate(components):
+            if component and values[component] is not None:
+                attributes[component] = values[component].data()[unique[:, column]]
+        if colors is not None:
+            attributes[3] = attributes[3][unique[:, 0]]
+    return _geometry(positions, indices.reshape(-1, 3),
+                     normals=attributes.get(2), textcoords=attributes.get(1),
+                     colors=attributes.get(3), name=os.path.basename(filename))
+
+# PLY types
+_ply_types = {"char": "i1", "uchar": "u1", "short": "i2", "ushort": "u2",
+              "int": "i4", "uint": "u4", "float": "f4", "double": "f8",
+              "int8": "i1", "uint8": "u1", "int16": "i2", "uint16": "u2",
+              "int32": "i4", "uint32": "u4", "float32": "f4", "float64": "f8"}
+
+# PLY vertex properties used for the attributes
+_ply_attributes = [("P", ["x", "y", "z"]),
+                   ("N", ["nx", "ny", "nz"]),
+                   ("UV", ["u", "v"]),
+                   ("UV", ["s", "t"]),
+                   ("UV", ["texture_u", "texture_v"]),
+                   ("Cd", ["red", "green", "blue", "alpha"]),
+                   ("Cd", ["red", "green", "blue"])]
+
+def _read_ply_header(file):
+    """ Read the header of the PLY file. It returns the format and the
+    elements with their properties.
+    """
+    if file.readline().strip() != b"ply":
+        raise ValueError("{} is not a PLY file".format(file.name))
+    format, elements = None, []
+    while True:
+        line = file.readline()
+        if not line:
+            raise ValueError("Unexpected end of the PLY header")
+        tokens = line.decode("ascii").split()
+        if not tokens or tokens[0] in ("comment", "obj_info"):
+            continue
+        if tokens[0] == "end_header":
+            break
+        if tokens[0] == "format":
+            format = tokens[1]
+        elif tokens[0] == "element":
+            elements.append((tokens[1], int(tokens[2]), []))
+        elif tokens[0] == "property":
+            if tokens[1] == "list":
+                elements[-1][2].append((tokens[4], (_ply_types[tokens[2]], _ply_types[tokens[3]])))
+            else:
+                elements[-1][2].append((tokens[2], _ply_types[tokens[1]]))
+    return format, elements
+
+def _ply_vertex_attributes(vertices, properties, start, attributes, count):
+    """ Copy the vertices properties into the attributes arrays
+    """
+    names = [name for name, dtype in properties]
+    found = set()
+    for attribute, columns in _ply_attributes:
+        if attribute in found or not all(column in names for column in columns):
+            continue
+        found.add(attribute)
+        if attribute not in attributes:
+            size = 4 if attribute == "Cd" else len(columns)
+            attributes[attribute] = np.ones((count, size), dtype=np.float32)
+        array = attributes[attribute]
+        for index, column in enumerate(columns):
+            values = vertices[column]
+            if attribute == "Cd" and values.dtype.kind in "iu":
+                values = values / np.float32(np.iinfo(values.dtype).max)
+            array[start:start + len(vertices), index] = values
+
+def _read_ply_faces(file, ascii, order, properties, count, chunk_size, triangles):
+    """ Read the faces in chunks. Faces with the same number of vertices
+    are read at once; the size of the chunk is reduced while the number
+    of vertices changes.
+    """
+    if len(properties) != 1 or not isinstance(properties[0][1], tuple):
+        raise ValueError("Only faces with the vertex indices are supported")
+    count_type, index_type = [np.dtype(order + dtype) for dtype in properties[0][1]]
+    remaining, batch = count, chunk_size
+    while remaining:
+        rows = min(remaining, batch)
+        if ascii:
+            lines = list(islice(file, rows))
+            values = _split_values(b" ".join(lines).decode("ascii"), np.int64)
+            size = int(values[0])
+            if values.size == rows * (size + 1) and np.all(values[::size + 1] == size):
+                triangles.extend(_triangulate(values.reshape(rows, size + 1)[:, 1:]))
+            else:
+                # Faces with different sizes (keeping the order of the file)
+                sizes = np.array([len(line.split()) - 1 for line in lines], dtype=np.int64)
+                heads = np.cumsum(sizes + 1) - sizes - 1
+                indices = np.delete(values, heads)
+                triangles.extend(indices[_fan_corners(sizes)])
+            remaining -= rows
+            continue
+        # Peek the number of vertices of the next face
+        head = file.read(count_type.itemsize)
+        if len(head) < count_type.itemsize:
+            raise ValueError("Unexpected end of the PLY faces in {}".format(file.name))
+        size = int(np.frombuffer(head, count_type)[0])
+        file.seek(-count_type.itemsize, os.SEEK_CUR)
+        dtype = np.dtype([("n", count_type), ("i", index_type, (size,))])
+        data = file.read(rows * dtype.itemsize)
+        faces = np.frombuffer(data, dtype, count=len(data) // dtype.itemsize)
+        if not len(faces):
+            raise ValueError("Unexpected end of the PLY faces in {}".format(file.name))
+        different = np.flatnonzero(faces["n"] != size)
+        if len(different):
+            # Stop at the first face with a different size
+            faces = faces[:different[0]]
+            batch = max(2 * len(faces), 1)
+        else:
+            batch = min(2 * batch, chunk_size)
+        # Move back to the first byte not used (faces with other size or
+        # a partial face read at the end of the file)
+        if len(faces) * dtype.itemsize != len(data):
+            file.seek(len(faces) * dtype.itemsize - len(data), os.SEEK_CUR)
+        if size >= 3:
+            triangles.extend(_triangulate(faces["i"].astype(np.int64)))
+        remaining -= len(faces)
+
+def read_ply(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Read a PLY (ascii or binary) file into a new geometry
+    """
+    attributes = dict()
+    triangles = _Buffer(3, np.int64)
+    with open(filename, "rb") as file:
+        format, elements = _read_ply_header(file)
+        ascii = format == "ascii"
+        order = ">" if format == "binary_big_endian" else "<"
+        for position, (name, count, properties) in enumerate(elements):
+            if name == "face":
+                _read_ply_faces(file, ascii, order, properties, count, chunk_size, triangles)
+                continue
+            if any(isinstance(dtype, tuple) for _, dtype in properties):
+                if ascii:
+                    # Skip the element (one line per row)
+                    for _ in islice(file, count):
+                        pass
+                    continue
+                # Elements with lists can not be skipped in binary files
+                if any(other in ("vertex", "face") for other, _, _ in elements[position + 1:]):
+                    raise ValueError("Unsupported element {} with lists before the mesh "
+                                     "in {}".format(name, filename))
+                break
+            dtype = np.dtype([(column, order + type) for column, type in properties])
+            for start in range(0, count, chunk_size):
+                rows = min(chunk_size, count - start)
+                if ascii:
+                    values = _parse_values([line.decode("ascii") for line in islice(file, rows)],
+                                           len(properties), dtype=np.float64)
+                    chunk = np.empty(rows, dtype=dtype)
+                    for index, (column, _) in enumerate(properties):
+                        chunk[column] = values[:, index]
+                else:
+                    chunk = np.frombuffer(file.read(rows * dtype.itemsize), dtype)
+                if name == "vertex":
+                    _ply_vertex_attributes(chunk, properties, start, attributes, count)
+    if "P" not in attributes:
+        raise ValueError("{} has no vertices".format(filename))
+    return _geometry(attributes["P"], triangles.data(),
+                     normals=attributes.get("N"), textcoords=attributes.get("UV"),
+                     colors=attributes.get("Cd"), name=os.path.basename(filename))
+
+# Importers available by the extension of the file
+importers = {".obj": read_obj, ".ply": read_ply}
+
+def read_mesh(filename, chunk_size=DEFAULT_CHUNK_SIZE):
+    """ Read the mesh using the importer for the extension of the file
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in importers:
+        raise ValueError("No importer for {} files".format(extension))
+    return importers[extension](filename, chunk_size)
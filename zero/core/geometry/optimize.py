@@ -0,0 +1,218 @@
+""" Mesh Optimization
+
+    Functions used by Geometry.optimize() to prepare indexed triangle
+    meshes for rendering. All the functions work with numpy arrays:
+    positions (n, 3) and triangles (m, 3).
+
+        weld_vertices       merge the points closer than a tolerance
+        remove_degenerates  remove triangles without area
+        reorder_triangles   reorder the triangles for the vertex cache
+        reorder_vertices    reorder the points by first use (fetch)
+        acmr                average cache miss ratio (misses/triangle)
+
+    The triangles are reordered using Tipsify (Sander et al. 2007),
+    which is linear in the number of triangles and gives an ACMR close
+    to Forsyth's algorithm. The vertex cache is simulated as a FIFO.
+
+    Tipsify and the cache simulation of acmr are sequential by nature,
+    so they are python loops over the triangles (about 5us and 2us per
+    triangle). They must only be used to prepare the meshes (import or
+    load time), never per frame.
+"""
+
+import numpy as np
+
+__all__ = ['weld_vertices', 'remove_degenerates', 'reorder_triangles',
+           'reorder_vertices', 'acmr']
+
+# Default size of the post-transform vertex cache
+DEFAULT_CACHE_SIZE = 16
+
+def _neighbour_offsets():
+    """ Return the offsets (13, 3) for half of the cells around a cell.
+    The other half is covered by the neighbours (pairs are symmetric).
+    """
+    offsets = np.indices((3, 3, 3)).reshape(3, -1).T - 1
+    for axis in range(3):
+        first = np.all(offsets[:, :axis] == 0, axis=1) & (offsets[:, axis] != 0)
+        offsets = offsets[~first | (offsets[:, axis] > 0)]
+    return offsets[np.any(offsets != 0, axis=1)]
+
+def _expand(starts, stops):
+    """ Return the positions of all the ranges (start, stop) and the
+    range of each position
+    """
+    sizes = stops - starts
+    ranges = np.repeat(np.arange(len(starts)), sizes)
+    return np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes) + starts[ranges], ranges
+
+def weld_vertices(positions, tolerance=1e-6, attributes=None):
+    """ Return the point (first one) each point is welded to. Points are
+    welded when the distance between them is lower than the tolerance
+    and all the other attributes given (n, size) are equal.
+
+    Points are hashed into a grid of cells with the size of the
+    tolerance, and each point is compared with all the points of its
+    cell and the neighbour cells. The pairs within the tolerance are
+    joined (transitively) and welded to the first point.
+    """
+    positions = np.asarray(positions, dtype=np.float64)[:, :3]
+    count = len(positions)
+    if not count:
+        return np.zeros(0, dtype=np.int64)
+    target = np.arange(count)
+    if tolerance > 0:
+        cells = np.floor(positions / tolerance).astype(np.int64)
+        cells -= cells.min(axis=0)
+        bits = [max(int(value), 1).bit_length() + 1 for value in cells.max(axis=0)]
+        if sum(bits) <= 63:
+            # Pack the cells into one key and sort the points by cell
+            pack = lambda cells: ((cells[:, 0] << (bits[1] + bits[2])) |
+                                  (cells[:, 1] << bits[2]) | cells[:, 2])
+            keys = pack(cells)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            stops = np.r_[starts[1:], count]
+            cell_keys = sorted_keys[starts]
+            # Pairs of points within the tolerance (same or neighbour cells)
+            first, second = [], []
+            for offset in np.vstack([np.zeros((1, 3), np.int64), _neighbour_offsets()]):
+                neighbour = cells + offset
+                valid = np.all(neighbour >= 0, axis=1)
+                neighbour_keys = pack(neighbour)
+                index = np.minimum(np.searchsorted(cell_keys, neighbour_keys), len(cell_keys) - 1)
+                points = np.flatnonzero(valid & (cell_keys[index] == neighbour_keys))
+                slots, ranges = _expand(starts[index[points]], stops[index[points]])
+                a, b = points[ranges], order[slots]
+                keep = a < b if not np.any(offset) else np.ones(len(a), dtype=bool)
+                a, b = a[keep], b[keep]
+                distance = np.sum((positions[a] - positions[b]) ** 2, axis=1)
+                near = distance <= tolerance * tolerance
+                first.append(a[near])
+                second.append(b[near])
+            first, second = np.concatenate(first), np.concatenate(second)
+            # Join the pairs until each point has the first point joined
+            while len(first):
+                lowest = np.minimum(target[first], target[second])
+                joined = target.copy()
+                np.minimum.at(joined, first, lowest)
+                np.minimum.at(joined, second, lowest)
+                joined = joined[joined]
+                if np.array_equal(joined, target):
+                    break
+                target = joined
+    if attributes:
+        # Split the welded points with different attributes
+        columns = [target[:, None].astype(np.float64)]
+        columns += [np.asarray(values, dtype=np.float64).reshape(count, -1)
+                    for values in attributes]
+        rows = np.ascontiguousarray(np.hstack(columns))
+        keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        target = first[inverse.ravel()]
+    return target
+
+def remove_degenerates(triangles, positions=None):
+    """ Return the mask with the triangles that are not degenerate. A
+    triangle is degenerate if it has repeated indices or zero area.
+    """
+    triangles = np.asarray(triangles)
+    valid = ((triangles[:, 0] != triangles[:, 1]) &
+             (triangles[:, 1] != triangles[:, 2]) &
+             (triangles[:, 0] != triangles[:, 2]))
+    if positions is not None:
+        positions = np.asarray(positions, dtype=np.float64)[:, :3]
+        p0, p1, p2 = (positions[triangles[:, corner]] for corner in range(3))
+        valid &= np.any(np.cross(p1 - p0, p2 - p0) != 0.0, axis=1)
+    return valid
+
+def reorder_triangles(triangles, count=None, cache_size=DEFAULT_CACHE_SIZE):
+    """ Return the order of the triangles that improves the vertex cache
+    locality using Tipsify. Count is the number of points. It's a python
+    loop over the triangles, so it must not be used per frame.
+    """
+    triangles = np.asarray(triangles, dtype=np.int64)
+    if not len(triangles):
+        return np.zeros(0, dtype=np.int64)
+    flat = triangles.ravel()
+    count = count or int(flat.max()) + 1
+    # Triangles adjacent to each point (CSR)
+    live = np.bincount(flat, minlength=count)
+    offsets = np.r_[0, np.cumsum(live)].tolist()
+    adjacency = (np.argsort(flat, kind="stable") // 3).tolist()
+    live = live.tolist()
+    vertices = triangles.tolist()
+    cache_time = [0] * count
+    emitted = [False] * len(vertices)
+    output = []
+    dead_end = []
+    timestamp = cache_size + 1
+    cursor = 0
+    fanning = 0
+    while fanning >= 0:
+        candidates = []
+        for triangle in adjacency[offsets[fanning]:offsets[fanning + 1]]:
+            if emitted[triangle]:
+                continue
+            emitted[triangle] = True
+            output.append(triangle)
+            for vertex in vertices[triangle]:
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
+                if timestamp - cache_time[vertex] > cache_size:
+                    cache_time[vertex] = timestamp
+                    timestamp += 1
+        # Get the next fanning vertex (still in the cache and with triangles)
+        fanning, priority = -1, -1
+        for vertex in candidates:
+            if live[vertex] > 0:
+                age = timestamp - cache_time[vertex]
+                value = age if age + 2 * live[vertex] <= cache_size else 0
+                if value > priority:
+                    fanning, priority = vertex, value
+        if fanning < 0:
+            # Skip dead ends, using the recent vertices or the next one
+            while dead_end:
+                vertex = dead_end.pop()
+                if live[vertex] > 0:
+                    fanning = vertex
+                    break
+            while fanning < 0 and cursor < count:
+                if live[cursor] > 0:
+                    fanning = cursor
+                cursor += 1
+    return np.asarray(output, dtype=np.int64)
+
+def reorder_vertices(triangles, count=None):
+    """ Return the order of the points by their first use in the
+    triangles and the triangles remapped to the new order. Points not
+    used by any triangle are removed.
+    """
+    flat = np.asarray(triangles, dtype=np.int64).ravel()
+    count = count or (int(flat.max()) + 1 if len(flat) else 0)
+    used, first = np.unique(flat, return_index=True)
+    order = used[np.argsort(first, kind="stable")]
+    remap = np.full(count, -1, dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return order, remap[flat].reshape(-1, 3)
+
+def acmr(triangles, cache_size=DEFAULT_CACHE_SIZE):
+    """ Return the average cache miss ratio (vertices transformed per
+    triangle) using a FIFO vertex cache with the size given. It goes
+    from 3.0 (no reuse) to ~0.5 for regular meshes. The cache is
+    simulated with a python loop over the indices (statistics only).
+    """
+    flat = np.asarray(triangles, dtype=np.int64).ravel()
+    if not len(flat):
+        return 0.0
+    inserted = dict()
+    misses = 0
+    for vertex in flat.tolist():
+        # Vertex is in the FIFO if less than cache size misses since insertion
+        time = inserted.get(vertex)
+        if time is None or misses - time >= cache_size:
+            inserted[vertex] = misses
+            misses += 1
+    return misses / (len(flat) / 3.0)
@@ -0,0 +1,167 @@
+""" Mesh Simplification
+
+    Quadric error metric (QEM) simplification used to generate the
+    levels of detail of the geometry. All the operations are vectorized
+    with numpy, so the meshes are simplified by clustering the points
+    into a grid (Lindstrom 2000) instead of collapsing one edge at time:
+
+        1. Compute the quadric of each triangle (area weighted plane)
+           and accumulate the quadrics into the points.
+        2. Cluster the points into the cells of a grid and sum the
+           quadrics of the points in each cluster.
+        3. Place each cluster at the position that minimizes its
+           quadric error (or the mean if the quadric is singular).
+        4. Remap the triangles and remove the collapsed ones.
+
+    The size of the cells is searched to get the number of triangles
+    closest to the target (without exceeding it).
+
+    This replaces the edge-collapse QEM simplification (Garland and
+    Heckbert 1997), which collapses the edge with the lowest error one
+    at a time using a priority queue. Edge collapse is sequential and
+    would be a python loop per edge. Clustering is vectorized, but the
+    quadrics are only used to place the clusters, not to choose what is
+    merged. So silhouettes and thin features are approximated by the
+    grid, and the number of triangles is close to the target (usually
+    within a few percent below it) instead of exact.
+
+        positions, triangles, clusters = simplify(positions, triangles, 1000)
+"""
+
+import numpy as np
+
+__all__ = ['simplify', 'quadrics']
+
+# Iterations to search the size of the cells
+SEARCH_ITERATIONS = 12
+
+def quadrics(positions, triangles):
+    """ Return the quadrics of the points (n, 10) accumulated from the
+    planes of the triangles weighted by their area. The coefficients
+    are (xx, xy, xz, yy, yz, zz, x, y, z, 1) of the symmetric matrix.
+    """
+    positions = np.asarray(positions, dtype=np.float64)[:, :3]
+    triangles = np.asarray(triangles, dtype=np.int64)
+    p0, p1, p2 = (positions[triangles[:, corner]] for corner in range(3))
+    normals = np.cross(p1 - p0, p2 - p0)
+    area = np.linalg.norm(normals, axis=1)
+    normals = np.divide(normals, area[:, None], out=np.zeros_like(normals),
+                        where=area[:, None] > 0)
+    distance = -np.sum(normals * p0, axis=1)
+    x, y, z = normals.T
+    planes = np.stack([x * x, x * y, x * z, y * y, y * z, z * z,
+                       x * distance, y * distance, z * distance,
+                       distance * distance], axis=1) * (area * 0.5)[:, None]
+    result = np.empty((len(positions), 10))
+    flat = triangles.ravel()
+    for column in range(10):
+        result[:, column] = np.bincount(flat, np.repeat(planes[:, column], 3),
+                                        minlength=len(positions))
+    return result
+
+def _solve(quadric, mean, minimum, maximum):
+    """ Return the positions that minimize the quadrics (m, 10). Singular
+    quadrics or positions outside the bounds given use the mean.
+    """
+    xx, xy, xz, yy, yz, zz, x, y, z, _ = quadric.T
+    matrix = np.stack([np.stack([xx, xy, xz], axis=1),
+                       np.stack([xy, yy, yz], axis=1),
+                       np.stack([xz, yz, zz], axis=1)], axis=1)
+    vector = -np.stack([x, y, z], axis=1)
+    result = mean.copy()
+    # Use only the well conditioned matrices
+    scale = np.maximum(np.abs(matrix).max(axis=(1, 2)), 1e-30)
+    valid = np.abs(np.linalg.det(matrix / scale[:, None, None])) > 1e-6
+    if np.any(valid):
+        solved = np.linalg.solve(matrix[valid], vector[valid][:, :, None])[:, :, 0]
+        inside = np.all((solved >= minimum[valid]) & (solved <= maximum[valid]), axis=1)
+        indices = np.flatnonzero(valid)[inside]
+        result[indices] = solved[inside]
+    return result
+
+def _unique_rows(rows):
+    """ Return the unique rows of the integer array (m, k) with the
+    indexes of their first occurrence and the inverse indexes. The rows
+    are packed into one integer if the values allow it.
+    """
+    bits = [max(int(value), 1).bit_length() for value in rows.max(axis=0)] if len(rows) else []
+    if sum(bits) <= 63:
+        keys = np.zeros(len(rows), dtype=np.int64)
+        for column, size in enumerate(bits):
+            keys = (keys << size) | rows[:, column]
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    else:
+        _, first, inverse = np.unique(rows, axis=0, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+def _cluster(positions, size):
+    """ Return the cluster of each point for a grid with the size given
+    """
+    cells = np.floor((positions - positions.min(axis=0)) / size).astype(np.int64)
+    return _unique_rows(cells)[1]
+
+def _collapse(triangles, clusters):
+    """ Return the triangles remapped to the clusters without the
+    collapsed and duplicated triangles
+    """
+    result = clusters[triangles]
+    valid = ((result[:, 0] != result[:, 1]) & (result[:, 1] != result[:, 2]) &
+             (result[:, 0] != result[:, 2]))
+    result = result[valid]
+    # Remove the triangles repeated (same points and orientation)
+    unique = _unique_rows(_rotate_min_first(result))[0]
+    return result[np.sort(unique)]
+
+def _rotate_min_first(triangles):
+    """ Rotate the indices of the triangles so the minimum is first,
+    keeping the orientation of the triangles
+    """
+    shift = np.argmin(triangles, axis=1)
+    columns = (shift[:, None] + np.arange(3)) % 3
+    return np.take_along_axis(triangles, columns, axis=1)
+
+def simplify(positions, triangles, target):
+    """ Simplify the mesh to have target triangles or less. It returns
+    the new positions, triangles and the cluster of each original point,
+    that can be used to simplify other point attributes.
+    """
+    positions = np.asarray(positions, dtype=np.float64)[:, :3]
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    if len(triangles) <= target:
+        return positions, triangles, np.arange(len(positions))
+    extent = float(np.max(positions.max(axis=0) - positions.min(axis=0))) or 1.0
+    # Binary search (log scale) of the size of the cells
+    low, high = np.log(extent * 1e-6), np.log(extent * 2.0)
+    best = None
+    for _ in range(SEARCH_ITERATIONS):
+        size = np.exp((low + high) * 0.5)
+        clusters = _cluster(positions, size)
+        result = _collapse(triangles, clusters)
+        if len(result) <= target:
+            best = (clusters, result)
+            high = np.log(size)
+        else:
+            low = np.log(size)
+    if best is None:
+        clusters = _cluster(positions, np.exp(high))
+        best = (clusters, _collapse(triangles, clusters))
+    clusters, result = best
+    count = int(clusters.max()) + 1
+    # Optimal position for each cluster (inside the bounds of its points)
+    quadric = np.empty((count, 10))
+    point_quadrics = quadrics(positions, triangles)
+    for column in range(10):
+        quadric[:, column] = np.bincount(clusters, point_quadrics[:, column], minlength=count)
+    weights = np.bincount(clusters, minlength=count)[:, None]
+    mean = np.stack([np.bincount(clusters, positions[:, axis], minlength=count)
+                     for axis in range(3)], axis=1) / np.maximum(weights, 1)
+    minimum = np.full((count, 3), np.inf)
+    maximum = np.full((count, 3), -np.inf)
+    np.minimum.at(minimum, clusters, positions)
+    np.maximum.at(maximum, clusters, positions)
+    vertices = _solve(quadric, mean, minimum, maximum)
+    # Remove the clusters not used by the triangles
+    used, remap = np.unique(result.ravel(), return_inverse=True)
+    lookup = np.full(count, -1, dtype=np.int64)
+    lookup[used] = np.arange(len(used))
+    return vertices[used], remap.reshape(-1, 3), lookup[clusters]
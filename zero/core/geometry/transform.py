@@ -1,3 +1,4 @@
+import weakref
 import numpy as np
 from pyrr import Quaternion, matrix44, Matrix44, Vector3
 from ..base.utils import *
@@ -16,13 +17,41 @@ class Transform:
 
         Parameters:
             default position, rotation and scale can be set intially.
+
+        The model matrix is cached and only computed again when the
+        position, rotation or scale are set. The version is incremented
+        every time they are set, so consumers can compare it to know if
+        the matrix has changed. Inplace changes of the vectors (for
+        example transform.position.x = 1.0) must call invalidate().
+
+            transform.position = [0.0, 1.0, 0.0]
+            transform.version       # +1
+            transform.model         # computed once until next change
+
+        Transforms modified are also added to Transform.modified (weak
+        set), so the TransformManager only copies the transforms changed
+        since the last frame instead of checking all the versions.
+
+        Transforms in a hierarchy (see TransformManager) have also the
+        world matrix, computed with the world matrix of the parents. If
+        the transform is not in a hierarchy the world is the model.
         
         To-Do:
             Pivot implementation. So it's rotate based on a point.
             Advanced transformations such as shear, bend, twist, et..
 
     """
+
+    # Transforms modified since the TransformManager consumed them
+    modified = weakref.WeakSet()
+
     def __init__(self, position=None, rotation=None, scale=None):
+        # Model matrix cached and version of the transformation
+        self._model = None
+        self._version = 0
+        # World matrix set by the hierarchy (None to use the model)
+        self._world = None
+        self._world_version = 0
         # Create private members for the setters (properties)
         self.__position = self._get_Vector3(position)
         self.__rotation = self._get_Vector3(rotation)
@@ -55,6 +84,7 @@ class Transform:
     @position.setter
     def position(self, value):
         self.__position = self._get_Vector3(value)
+        self.invalidate()
 
     @property
     def rotation(self):
@@ -63,6 +93,7 @@ class Transform:
     @rotation.setter
     def rotation(self, value):
         self.__rotation = self._get_Vector3(value)
+        self.invalidate()
 
     @property
     def scale(self):
@@ -71,14 +102,61 @@ class Transform:
     @scale.setter
     def scale(self, value):
         self.__scale = self._get_Vector3(value)
+        self.invalidate()
+
+    @property
+    def version(self):
+        """ Version of the transformation, incremented on every change
+        """
+        return self._version
+
+    def invalidate(self):
+        """ Mark the transformation as modified, so the model matrix is
+        computed again the next time it's accessed.
+        """
+        self._model = None
+        self._version += 1
+        Transform.modified.add(self)
 
     @property
     def model(self):
         """
-            This property will perform the current transformation and
-            return a 4x4 matrix with the  transformation matrix. This
-            matrix could be send to the shader so it can perform the
-            model-view transformation for any geometry
+            This property will return a 4x4 matrix with the current
+            transformation matrix. This matrix could be send to the
+            shader so it can perform the model-view transformation for
+            any geometry. The matrix is cached (read-only) until the
+            transformation is modified.
+        """
+        if self._model is None:
+            self._model = self._compute_model()
+            self._model.flags.writeable = False
+        return self._model
+
+    @property
+    def world(self):
+        """ Return the 4x4 world matrix (model with the parents)
+        """
+        if self._world is None:
+            return self.model
+        return self._world
+
+    @world.setter
+    def world(self, value):
+        """ Set the world matrix computed by the hierarchy (None to
+        use the model)
+        """
+        self._world = value
+        self._world_version += 1
+
+    @property
+    def world_version(self):
+        """ Version of the world matrix, it changes every time the model
+        or the world matrix set change
+        """
+        return self._version + self._world_version
+
+    def _compute_model(self):
+        """ Compute the model matrix (scale, rotation and translation)
         """
         # Create scale matrix transformation
         scale = Matrix44.from_scale(self.scale)
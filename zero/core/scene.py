@@ -1,6 +1,9 @@
+import os
 from .base import Entity, Component, Settings
 from ..components import *
 from .geometry import Geometry, Camera, Material, Transform
+from .geometry.cache import read_geometry
+from .geometry.importers import importers, read_mesh
 
 __all__ = ['SceneGraph']
 
@@ -106,7 +109,7 @@ class SceneGraph(object):
         """
         pass
 
-    def _create_default_scene(self):
+    def _create_default_scene(self, geometry=None):
         # Create the main roor for all the sub-entities
         root = SceneGraph.create_empty("Root",position=[0.0,0.0,0.0])
        
@@ -121,7 +124,7 @@ class SceneGraph(object):
         # Create a default Geometrty with components 
         geometry_entity = SceneGraph.create_geometry("Geometry", 
                                                     position=[0.0,0.0,0.0],
-                                                    geometry=SceneGraph.DEFAULT_GEOMETRY,
+                                                    geometry=geometry or SceneGraph.DEFAULT_GEOMETRY,
                                                     material=SceneGraph.DEFAULT_MATERIAL)
         # Create a default lighting
         light_entity = SceneGraph.create_light(name="Light",
@@ -141,11 +144,18 @@ class SceneGraph(object):
     def load(self, file=None):
         """ Load or reset the current Scene.
         If no file is specified then a Default Scene will be created.
+        If a mesh file (OBJ or PLY) or a geometry cache file is given,
+        the geometry will be imported (or memory mapped from the cache)
+        and used in the default scene.
         The default scene will be the basic enities and components, like
         camera, basic geometry (with basic materails), lights, etc..
         """
         if (file):
-            pass
+            if os.path.splitext(file)[1].lower() in importers:
+                geometry = read_mesh(file)
+            else:
+                geometry = read_geometry(file)
+            self._root = self._create_default_scene(geometry)
         else:
             #Reset current scene and create the default root object
             self._root = self._create_default_scene()
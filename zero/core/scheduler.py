@@ -0,0 +1,187 @@
+import time
+from collections import OrderedDict as dict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+__all__ = ['SystemScheduler']
+
+class SystemScheduler(object):
+    """ System Scheduler Class
+
+    This class runs the systems of the engine every frame. Each system
+    declares the components types it reads and writes, so the scheduler
+    builds a dependency graph between the systems. Systems that don't
+    conflict will run concurrently in a pool of threads.
+
+    Two systems conflict when one of them writes a component type that
+    the other one reads or writes. In this case the system added first
+    will run first. Systems could also write ALL the types ("*"), so
+    they will behave as a barrier between the previous systems and the
+    next ones (i.e. apply the commands recorded in the frame).
+
+    Systems that must run in the main thread (the thread that calls the
+    run method) have to be pinned. For example systems that use the GL
+    context, like render, or the devices to get the events.
+
+        scheduler = SystemScheduler()
+        scheduler.add(input_manager, reads=["input"], main_thread=True)
+        scheduler.add(physics, reads=["rigid"], writes=["transform"])
+        scheduler.add(animation, reads=["skeleton"], writes=["geometry"])
+        scheduler.add(render_manager, reads=["transform","geometry"],
+                      main_thread=True)
+        scheduler.run()
+
+    Systems could be any object with a run() function or any function.
+    If reads, writes or main_thread are not given, the scheduler will
+    use the attributes with the same name defined in the system.
+
+    The time spent for each system in the last frame is stored, so it
+    can be used to know the critical path of the frame.
+
+        print(scheduler.timings)
+        print(scheduler.critical_path())
+
+    Threads are used instead of processes since the systems share the
+    catalogue and the components in memory.
+    """
+
+    # All the components types
+    ALL = "*"
+
+    @property
+    def systems(self):
+        return list(self._systems.keys())
+
+    @property
+    def timings(self):
+        """ Return the time (seconds) spent by each system in last run
+        """
+        return self._timings
+
+    def __init__(self, workers=None):
+        """ Initialize the scheduler with the maximum number of workers
+        for the pool.
+        """
+        self._workers = workers
+        self._pool = None
+        # Systems added (name -> system properties)
+        self._systems = dict()
+        self._graph = None
+        self._timings = dict()
+
+    def __del__(self):
+        """ Dispose the pool of threads
+        """
+        self.shutdown()
+
+    def shutdown(self):
+        """ Wait for the workers and dispose the pool
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def add(self, system, reads=None, writes=None, main_thread=None, name=None):
+        """ Add a new system to the scheduler. Systems will run in the
+        same order they are added if they have conflicts.
+        """
+        if reads is None:
+            reads = getattr(system, "reads", ())
+        if writes is None:
+            writes = getattr(system, "writes", ())
+        if main_thread is None:
+            main_thread = getattr(system, "main_thread", False)
+        name = name or getattr(system, "__name__", system.__class__.__name__)
+        function = getattr(system, "run", system)
+        self._systems[name] = (function, set(reads), set(writes), main_thread)
+        self._graph = None
+        return self
+
+    def remove(self, name):
+        """ Remove the system with the given name
+        """
+        del self._systems[name]
+        self._graph = None
+        return self
+
+    def _conflict(self, first, second):
+        """ Return whether the two systems access to the same types and
+        one of them writes into them.
+        """
+        reads1, writes1 = self._systems[first][1:3]
+        reads2, writes2 = self._systems[second][1:3]
+        if SystemScheduler.ALL in writes1 or SystemScheduler.ALL in writes2:
+            return True
+        return bool(writes1 & (reads2 | writes2) or writes2 & reads1)
+
+    def graph(self):
+        """ Return the dependency graph with the systems that must be
+        finished before each system (name -> dependencies)
+        """
+        if self._graph is None:
+            names = self.systems
+            self._graph = dict()
+            for index, name in enumerate(names):
+                self._graph[name] = [previous for previous in names[:index]
+                                     if self._conflict(previous, name)]
+        return self._graph
+
+    def _run_system(self, name):
+        """ Run the system and return the time spent
+        """
+        start = time.perf_counter()
+        self._systems[name][0]()
+        return time.perf_counter() - start
+
+    def run(self):
+        """ Run all the systems once (one frame). It returns when all
+        the systems have finished.
+        """
+        graph = self.graph()
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self._workers)
+        pending = list(graph.keys())
+        finished = set()
+        running = dict()
+        timings = dict()
+        while pending or running:
+            # Systems with all the dependencies finished
+            ready = [name for name in pending
+                     if all(dependency in finished for dependency in graph[name])]
+            main = [name for name in ready if self._systems[name][3]]
+            for name in ready:
+                if name not in main:
+                    pending.remove(name)
+                    running[self._pool.submit(self._run_system, name)] = name
+            if main:
+                # Run the first system pinned in the main thread
+                name = main[0]
+                pending.remove(name)
+                timings[name] = self._run_system(name)
+                finished.add(name)
+            elif running:
+                # Wait until any worker has finished
+                done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    timings[name] = future.result()
+                    finished.add(name)
+            # Collect the workers already finished
+            for future in [future for future in running if future.done()]:
+                name = running.pop(future)
+                timings[name] = future.result()
+                finished.add(name)
+        self._timings = dict((name, timings[name]) for name in graph)
+        return self
+
+    def critical_path(self):
+        """ Return the systems in the critical path (longest path in the
+        graph using the timings of the last run) and the time spent.
+        """
+        graph = self.graph()
+        paths = dict()
+        for name in graph:
+            previous = max((paths[dependency] for dependency in graph[name]),
+                           key=lambda path: path[1], default=([], 0.0))
+            paths[name] = (previous[0] + [name],
+                           previous[1] + self._timings.get(name, 0.0))
+        return max(paths.values(), key=lambda path: path[1], default=([], 0.0))
@@ -3,7 +3,9 @@ from __future__ import absolute_import, division, print_function
 from .opengl import (OpenGLBuffer, 
                      OpenGLTexture, 
                      OpenGLShader, 
-                     OpenGLRender)
+                     OpenGLRender,
+                     OpenGLResources,
+                     OpenGLInstanceBuffer)
 
 from .devices import PygameDevice
 
@@ -4,4 +4,5 @@ from .buffer import OpenGLBuffer
 from .texture import OpenGLTexture
 from .shader import OpenGLShader
 from .render import OpenGLRender
-
+from .instance import OpenGLInstanceBuffer
+from .resources import OpenGLResources
@@ -10,63 +10,123 @@ class OpenGLBuffer(object):
     """
         This element will create and store all the elements needed
         to Render a Geometrt
+
+        All the point attributes are uploaded into one interleaved
+        Vertex Buffer (one glBufferData call). Each attribute is bound
+        to the shader with the stride and offset given by the layout
+        of the vertex buffer created by the geometry. The data is only
+        uploaded again when the geometry attributes have changed.
+
+        The memory used in the GPU (vertices and indices) is given by
+        nbytes, so the buffers can be managed by OpenGLResources.
+
+        The number of elements to draw (indices or points) and the type
+        of the indices uploaded are stored with the buffer (count and
+        index_dtype), so the render uses the real size of the geometry.
+        Sub-meshes are drawn with their own ranges (see OpenGLRender).
+        Indices are uploaded again when they are modified.
     """
+
+    # Attributes names used in the shader for the point attributes
+    attribute_names = {Geometry.point.position: "position"}
   
     def __init__(self, geometry, shader, usage=UsageMode.static_draw):
         # Initialize all the variables
         self.usage = usage
         # Vertex Array Object for all the Attributtes, elements, etc.
         self._VAO = None
-        # Vertex Arrays Buffers for all the Attributes
-        self._VAB = {}
+        # Vertex Array Buffer (interleaved) for all the Attributes
+        self._VAB = None
         # Element Array Buffers for all the Attrbiutes
         self._EAB = None
+        # Vertex buffer currently uploaded and bytes used in the GPU
+        self._vertex_buffer = None
+        self._nbytes = 0
+        # Elements to draw and indices (type and version) uploaded
+        self._count = 0
+        self._index_dtype = None
+        self._indices_key = None
         # Geometry to be used for the buffer
         self.geometry = geometry
         self.shader = shader
 
+    @property
+    def nbytes(self):
+        """ Bytes uploaded into the GPU (vertices and indices)
+        """
+        return self._nbytes
+
+    @property
+    def count(self):
+        """ Number of elements to draw (indices or points if not indexed)
+        """
+        return self._count
+
+    @property
+    def index_dtype(self):
+        """ Type of the indices uploaded (None if not indexed)
+        """
+        return self._index_dtype
+
     def _dispose(self):
         # Dispose all the objects and memory allocated
-        GL.glDeleteVertexArrays(1,self._VAO)
+        if self._VAO is not None:
+            GL.glDeleteVertexArrays(1,self._VAO)
+        for buffer in (self._VAB, self._EAB):
+            if buffer is not None:
+                GL.glDeleteBuffers(1, [buffer])
+        self._VAO, self._VAB, self._EAB = None, None, None
+        self._vertex_buffer = None
+        self._nbytes = 0
+        self._count = 0
+        self._index_dtype = None
+        self._indices_key = None
+
+    def dispose(self):
+        """ Delete all the objects created in the GPU
+        """
+        self._dispose()
 
-    def _create_vertex_buffer_array(self, name, attribute_name = None):
+    def _create_vertex_buffer_array(self, vertices):
         """
             This function only make sense to do when working with
-            points (vertex) attributes.S
-            The function  will return the bind attribute attached
-            to the shader. This could be stored into a list to 
-            detach later when copy all the buffers and after unbind
-            VAO object.
+            points (vertex) attributes.
+            The function will upload the interleaved vertex buffer in
+            one call and return the bind attributes attached to the 
+            shader. This could be stored into a list to detach later 
+            when copy all the buffers and after unbind VAO object.
         """
-        # Check if not attribute name has been mapped for the bidinng
-        if attribute_name is None:
-            attribute_name = name
-        # Get the current vertices (flatten is not needed)
-        vertices =  self.geometry.get_point_attrib(name)
-        # Create the vertex array buffer and send the positions into the GPU buffers
-        self._VAB[name] = GL.glGenBuffers(1)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._VAB[name] )
+        # Create the vertex array buffer and send all the vertices into the GPU buffers
+        self._VAB = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._VAB)
         GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices.nbytes, vertices, opengl_usagemode_wrapper[self.usage])
-
-        # Bind Attribute to the current shader. 
-        return self.shader.bind(attribute_name, len(vertices[0]), vertices.dtype)
+        # Bind Attributes to the current shader using the layout of the buffer
+        attributes = []
+        stride = vertices.dtype.itemsize
+        for name in vertices.dtype.names:
+            dtype, offset = vertices.dtype.fields[name][:2]
+            attribute_name = self.attribute_names.get(name, name)
+            attributes.append(self.shader.bind(attribute_name, dtype.shape[0], dtype.base,
+                                               stride, offset))
+        return attributes
 
     def _copy_to_buffer(self):
         # Bind the shaders attributes for the current geometry
         if self.shader is None:
             print("ERROR: No shader specified")
       
-        # Create a list with the attributes created and binded
-        shader_attributes = []
-
         # Create a new VAO (Vertex Array Object). Only (1) VAO.
         #   Note. Using bpp > 16bits doesn't work. This depend on the Graphic Card.
         self._VAO = GL.glGenVertexArrays(1)
         # Every time we want to use VAO we just have to bind it
         GL.glBindVertexArray(self._VAO)
 
-        # Create the first attribute "position" (location = 0) (Mandatory)
-        shader_attributes.append(self._create_vertex_buffer_array(Geometry.point.position,"position"))
+        # Create the interleaved buffer with "position" (location = 0) first
+        vertices = self.geometry.get_vertex_buffer()
+        shader_attributes = self._create_vertex_buffer_array(vertices)
+        self._vertex_buffer = vertices
+        self._nbytes = vertices.nbytes
+        self._count = len(vertices)
         
         # Check wether the geometry has indexes
         if self.geometry.indexed:
@@ -76,11 +136,10 @@ class OpenGLBuffer(object):
             self._EAB = GL.glGenBuffers(1)
             GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER,  self._EAB);
             GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, opengl_usagemode_wrapper[self.usage]);
-        
-        # Create and bind other Attributes
-        for attrib in self.geometry.attributes[Geometry.geometry_types.points].keys():
-            if attrib != "P":
-                shader_attributes.append(self._create_vertex_buffer_array(attrib))
+            self._nbytes += indices.nbytes
+            self._count = indices.size
+            self._index_dtype = indices.dtype
+            self._indices_key = self.geometry.version[1]
 
         # Unbind VAO from OpenGL. Set to None = 0
         GL.glBindVertexArray(0)
@@ -89,8 +148,45 @@ class OpenGLBuffer(object):
         # Unbind all the Attributes "position" + Additionals
         for attribute in shader_attributes:
             self.shader.unbind(attribute)
+
+    def _update_buffer(self, vertices):
+        """ Upload the vertices again into the current vertex buffer
+        """
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._VAB)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, vertices.nbytes, vertices, opengl_usagemode_wrapper[self.usage])
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        self._nbytes += vertices.nbytes - self._vertex_buffer.nbytes
+        self._vertex_buffer = vertices
+        if self._index_dtype is None:
+            self._count = len(vertices)
+
+    def _update_indices(self):
+        """ Upload the indices again into the current element buffer
+        """
+        indices = self.geometry.get_prim_attrib(Geometry.primitive.indices)
+        GL.glBindVertexArray(self._VAO)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self._EAB)
+        GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, opengl_usagemode_wrapper[self.usage])
+        GL.glBindVertexArray(0)
+        self._nbytes += indices.nbytes - self._count * self._index_dtype.itemsize
+        self._count = indices.size
+        self._index_dtype = indices.dtype
+        self._indices_key = self.geometry.version[1]
   
     def update(self):
         # Depenging on the method to update the vertices using GPU or 
         # inmediate OpenGL the update will be different.
-        self._copy_to_buffer()
\ No newline at end of file
+        if self._VAO is None:
+            self._copy_to_buffer()
+            return
+        vertices = self.geometry.get_vertex_buffer()
+        if (vertices.dtype != self._vertex_buffer.dtype or
+                self.geometry.indexed != (self._index_dtype is not None)):
+            # The layout has changed, so the VAO must be created again
+            self._dispose()
+            self._copy_to_buffer()
+            return
+        if vertices is not self._vertex_buffer:
+            self._update_buffer(vertices)
+        if self._index_dtype is not None and self.geometry.version[1] != self._indices_key:
+            self._update_indices()
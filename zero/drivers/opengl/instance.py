@@ -0,0 +1,97 @@
+import ctypes
+import numpy as np
+import OpenGL.GL as GL
+from ...core.base.utils import *
+
+class OpenGLInstanceBuffer(object):
+    """
+        This element will store the per-instance attributes used to
+        render several instances of the same buffer with one draw call.
+
+        The world matrices of the instances are uploaded into one buffer
+        (n, 4, 4) float32, and bound to the Vertex Array Object of the
+        buffer as a mat4 attribute (4 vec4 columns) with divisor 1, so
+        each instance uses its own matrix.
+
+            instances = OpenGLInstanceBuffer(buffer, shader)
+            instances.update(matrices)
+            render.draw_instanced(buffer, instances.count)
+    """
+
+    # Name of the attribute used in the shader for the world matrices
+    attribute_name = "instance_matrix"
+
+    @property
+    def count(self):
+        """ Number of instances uploaded
+        """
+        return len(self._matrices)
+
+    @property
+    def nbytes(self):
+        return self._capacity * 64
+
+    def __init__(self, buffer, shader):
+        # Buffer (VAO) and shader used by the instances
+        self.buffer = buffer
+        self.shader = shader
+        # Vertex buffer with the matrices and VAO where it's bound
+        self._VBO = None
+        self._VAO = None
+        self._capacity = 0
+        self._matrices = np.zeros((0, 4, 4), dtype=np.float32)
+
+    def _dispose(self):
+        # Dispose the buffer with the matrices
+        if self._VBO is not None:
+            GL.glDeleteBuffers(1, [self._VBO])
+        self._VBO, self._VAO = None, None
+        self._capacity = 0
+
+    def dispose(self):
+        """ Delete the buffer created in the GPU
+        """
+        self._dispose()
+
+    def _attach(self):
+        """ Bind the matrices as attribute of the VAO of the buffer
+        """
+        if self._VBO is None:
+            self._VBO = GL.glGenBuffers(1)
+        location = GL.glGetAttribLocation(self.shader._program, self.attribute_name)
+        GL.glBindVertexArray(self.buffer._VAO)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._VBO)
+        if location != -1:
+            # mat4 attributes use four consecutive locations (columns)
+            for column in range(4):
+                GL.glEnableVertexAttribArray(location + column)
+                GL.glVertexAttribPointer(location + column, 4, GL.GL_FLOAT, False, 64,
+                                         ctypes.c_void_p(column * 16))
+                GL.glVertexAttribDivisor(location + column, 1)
+        else:
+            print ("Warning: Current attribute {} is not in the shader".format(self.attribute_name))
+        GL.glBindVertexArray(0)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        self._VAO = self.buffer._VAO
+
+    def update(self, matrices):
+        """ Upload the world matrices (n, 4, 4) of the instances. The data
+        is only uploaded if the matrices have changed.
+        """
+        matrices = np.ascontiguousarray(matrices, dtype=np.float32).reshape(-1, 4, 4)
+        self.buffer.update()
+        if self._VAO is None or self._VAO != self.buffer._VAO:
+            # The VAO has been created again (or it's the first time)
+            self._attach()
+            self._capacity = 0
+        elif np.array_equal(matrices, self._matrices):
+            return
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._VBO)
+        if len(matrices) > self._capacity:
+            # Allocate the buffer with the new size (orphaning the old one)
+            GL.glBufferData(GL.GL_ARRAY_BUFFER, matrices.nbytes, matrices, GL.GL_DYNAMIC_DRAW)
+            self._capacity = len(matrices)
+        else:
+            GL.glBufferSubData(GL.GL_ARRAY_BUFFER, 0, matrices.nbytes, matrices)
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, 0)
+        self._matrices = matrices.copy()
@@ -2,7 +2,7 @@ import ctypes
 import numpy as np
 import OpenGL.GL as GL
 from ...core.base.utils import *
-from ...core import DrawMode
+from ...core import DrawMode, Geometry
 from .wrapper import opengl_drawmode_wrapper
 from .wrapper import gldtype
 
@@ -11,6 +11,22 @@ class OpenGLRender(object):
         This Class will render the Buffers stored in GPU
         openGL. It will use OpenGL and a double buffer so
         it can sweep between the buffers per frame.
+
+        The draw calls use the number of elements (indices or points)
+        and the type of the indices stored with each buffer (see
+        OpenGLBuffer). Sub-meshes are drawn with ranges, where each row
+        is (first, count[, base_vertex[, base_instance[, instances]]]):
+        the first element, the number of elements, the offset added to
+        the indices, the first instance (row of the instance attributes,
+        see OpenGLInstanceBuffer) and the number of instances.
+
+        Several ranges of the same buffer are drawn with one multi-draw
+        indirect call if it's supported. The commands of the draws are
+        built with numpy and uploaded into an indirect buffer:
+
+            commands = render.commands(buffer, ranges)
+            >> [[count, instances, first, base_vertex, base_instance], ...]
+            render.multi_draw(buffer, ranges)
     """
 
     # Default Background Color
@@ -20,12 +36,17 @@ class OpenGLRender(object):
         """ Initialize the Render Class
         """
         self.mode = mode
+        # Multi-draw indirect support (checked with the context) and buffer
+        self.indirect = False
+        self._indirect_buffer = None
 
     def init(self):
          """ This function will initialize OpenGL with some functions
          by default. This case depth test is enabled by default initially.
          """
          GL.glEnable(GL.GL_DEPTH_TEST)
+         self.indirect = bool(GL.glMultiDrawElementsIndirect) and \
+                         bool(GL.glMultiDrawArraysIndirect)
 
     def clear(self, color = defaulBGColor):
         """ This function wll clean the buffers on the GPU
@@ -33,19 +54,119 @@ class OpenGLRender(object):
         GL.glClearColor(*color)
         GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
 
-    def render(self, buffer):
-        """
+    def bind(self, buffer):
+        """ Bind the Vertex Array Object of the buffer
         """
-        # Bind the created Vertex Array Object
         GL.glBindVertexArray(buffer._VAO)
+
+    def unbind(self):
+        """ Unbind the current Vertex Array Object
+        """
+        GL.glBindVertexArray(0)
+
+    def draw(self, buffer, ranges=None):
+        """ Draw the geometry of the buffer (already bound). If ranges
+        (first, count) are given only those ranges are drawn (see
+        Geometry.get_draw_ranges). It returns the draw calls issued.
+        """
         # Draw the current geoemtry. Check if indices have been added
-        if buffer.geometry.indexed:
-            thistype =  gldtype(buffer.geometry.index_type)
-            GL.glDrawElements(opengl_drawmode_wrapper[self.mode], 3 * 3, 
-                              gldtype(buffer.geometry.index_type), ctypes.c_void_p(0))
+        if ranges is not None:
+            return self._render_ranges(buffer, ranges)
+        if buffer.index_dtype is not None:
+            # Indices could use a smaller type than the default (optimized)
+            GL.glDrawElements(opengl_drawmode_wrapper[self.mode], int(buffer.count),
+                              gldtype(buffer.index_dtype), ctypes.c_void_p(0))
+        else:
+            GL.glDrawArrays(opengl_drawmode_wrapper[self.mode], 0, int(buffer.count))
+        return 1
+
+    def draw_instanced(self, buffer, count):
+        """ Draw count instances of the geometry of the buffer (already
+        bound). The world matrix of each instance is given by the instance
+        attributes bound to the buffer (see OpenGLInstanceBuffer). It
+        returns the draw calls issued.
+        """
+        mode = opengl_drawmode_wrapper[self.mode]
+        if buffer.index_dtype is not None:
+            GL.glDrawElementsInstanced(mode, int(buffer.count), gldtype(buffer.index_dtype),
+                                       ctypes.c_void_p(0), int(count))
         else:
-            GL.glDrawArrays(opengl_drawmode_wrapper[self.mode], 0, 1)
+            GL.glDrawArraysInstanced(mode, 0, int(buffer.count), int(count))
+        return 1
+
+    def commands(self, buffer, ranges, instances=1):
+        """ Return the commands for the ranges of the buffer used by the
+        multi-draw indirect calls (uint32). The commands are (count,
+        instances, first, base_vertex, base_instance) for indexed buffers
+        and (count, instances, first, base_instance) otherwise. The
+        instances given are used for the ranges without that column.
+        """
+        ranges = np.asarray(ranges, dtype=np.int64)
+        ranges = ranges.reshape(len(ranges), -1) if ranges.size else ranges.reshape(0, 2)
+        draws = np.zeros((len(ranges), 5), dtype=np.int64)
+        draws[:, 4] = instances
+        draws[:, :ranges.shape[1]] = ranges
+        if buffer.index_dtype is not None:
+            order = [1, 4, 0, 2, 3]
+        else:
+            order = [1, 4, 0, 3]
+        return draws[:, order].astype(np.uint32)
+
+    def multi_draw(self, buffer, ranges, instances=1):
+        """ Draw all the ranges (first, count) of the buffer (already
+        bound) with one multi-draw indirect call. It returns the draw
+        calls issued.
+        """
+        commands = self.commands(buffer, ranges, instances)
+        if not len(commands):
+            return 0
+        mode = opengl_drawmode_wrapper[self.mode]
+        if self._indirect_buffer is None:
+            self._indirect_buffer = GL.glGenBuffers(1)
+        GL.glBindBuffer(GL.GL_DRAW_INDIRECT_BUFFER, self._indirect_buffer)
+        GL.glBufferData(GL.GL_DRAW_INDIRECT_BUFFER, commands.nbytes, commands, GL.GL_STREAM_DRAW)
+        if buffer.index_dtype is not None:
+            GL.glMultiDrawElementsIndirect(mode, gldtype(buffer.index_dtype),
+                                           ctypes.c_void_p(0), len(commands), 0)
+        else:
+            GL.glMultiDrawArraysIndirect(mode, ctypes.c_void_p(0), len(commands), 0)
+        GL.glBindBuffer(GL.GL_DRAW_INDIRECT_BUFFER, 0)
+        return 1
+
+    def render(self, buffer, ranges=None):
+        """ Render the geometry of the buffer. If ranges (first, count)
+        are given only those ranges are drawn (see Geometry.get_draw_ranges)
+        """
+        # Bind the created Vertex Array Object
+        self.bind(buffer)
+        calls = self.draw(buffer, ranges)
         # Unbind VAO from GPU
-        GL.glBindVertexArray(0)
-     
+        self.unbind()
+        return calls
 
+    def _render_ranges(self, buffer, ranges):
+        """ Draw the ranges of the indices (or points). If multi-draw
+        indirect is supported all the ranges are drawn at once, otherwise
+        one call is issued for each range. It returns the calls issued.
+        """
+        if self.indirect and len(ranges) > 1:
+            return self.multi_draw(buffer, ranges)
+        mode = opengl_drawmode_wrapper[self.mode]
+        commands = self.commands(buffer, ranges).tolist()
+        if buffer.index_dtype is not None:
+            dtype, itemsize = gldtype(buffer.index_dtype), buffer.index_dtype.itemsize
+            for count, instances, first, base_vertex, base_instance in commands:
+                if instances == 1 and base_vertex == 0 and base_instance == 0:
+                    GL.glDrawElements(mode, count, dtype, ctypes.c_void_p(first * itemsize))
+                else:
+                    GL.glDrawElementsInstancedBaseVertexBaseInstance(
+                                mode, count, dtype, ctypes.c_void_p(first * itemsize),
+                                instances, base_vertex, base_instance)
+        else:
+            for count, instances, first, base_instance in commands:
+                if instances == 1 and base_instance == 0:
+                    GL.glDrawArrays(mode, first, count)
+                else:
+                    GL.glDrawArraysInstancedBaseInstance(mode, first, count, instances,
+                                                         base_instance)
+        return len(commands)
@@ -0,0 +1,189 @@
+from collections import OrderedDict
+from ...core import UsageMode
+from .buffer import OpenGLBuffer
+from .instance import OpenGLInstanceBuffer
+from .shader import OpenGLShader
+from .texture import OpenGLTexture
+
+class OpenGLResources(object):
+    """
+        This class will create and cache the objects created in the GPU
+        (shaders, textures and buffers), so they are created only once
+        and reused between frames.
+
+        Resources are identified by a key: the name and path for the
+        shaders and textures, and the geometry (identity) for buffers.
+        Buffers are updated with the version of the geometry, so the
+        data is only uploaded again when the geometry has changed.
+
+            resources = OpenGLResources(budget=256 * 1024 * 1024)
+            shader = resources.shader("default_shader", "./assets/shaders")
+            buffer = resources.buffer(geometry, shader, owner=entity.id)
+            texture = resources.texture(filename, owner=entity.id)
+            resources.release(entity.id)
+            resources.frame()
+
+        Reference counting: each owner (i.e. an entity) holds the
+        resources it has used. When an owner is released, the resources
+        without any other owner are deleted from the GPU. Resources
+        created without owner are kept until they are evicted.
+
+        LRU eviction: if the memory used is over the budget at the end
+        of the frame, the least recently used resources (not used in the
+        current frame) are deleted. They are created again the next time
+        they are requested.
+    """
+
+    # Default budget for the memory used in the GPU (bytes)
+    DEFAULT_BUDGET = 512 * 1024 * 1024
+
+    @property
+    def budget(self):
+        return self._budget
+
+    @budget.setter
+    def budget(self, value):
+        self._budget = value
+
+    @property
+    def used(self):
+        """ Bytes used in the GPU by all the resources
+        """
+        return sum(entry[2] for entry in self._entries.values())
+
+    @property
+    def created(self):
+        """ Number of resources created
+        """
+        return self._created
+
+    @property
+    def disposed(self):
+        """ Number of resources deleted (released or evicted)
+        """
+        return self._disposed
+
+    def __init__(self, budget=None):
+        """ Initialize the cache without any resource
+        """
+        self._budget = OpenGLResources.DEFAULT_BUDGET if budget is None else budget
+        # Resources in LRU order (key -> [resource, owners, bytes, frame])
+        self._entries = OrderedDict()
+        # Keys used by each owner
+        self._owners = dict()
+        self._frame = 0
+        self._created = 0
+        self._disposed = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _get(self, key, owner, create):
+        """ Return the resource for the key (created if not in the cache)
+        and add the owner to the resource.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            resource = create()
+            entry = [resource, set(), getattr(resource, "nbytes", 0), self._frame]
+            self._entries[key] = entry
+            self._created += 1
+        else:
+            self._entries.move_to_end(key)
+            entry[3] = self._frame
+        if owner is not None and owner not in entry[1]:
+            entry[1].add(owner)
+            self._owners.setdefault(owner, set()).add(key)
+        return entry[0]
+
+    def _dispose(self, key):
+        """ Delete the resource from the GPU and the cache
+        """
+        resource, owners = self._entries.pop(key)[:2]
+        for owner in owners:
+            keys = self._owners.get(owner)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._owners[owner]
+        resource.dispose()
+        self._disposed += 1
+
+    def shader(self, name, filepath, owner=None):
+        """ Return the shader program for the name and path given
+        """
+        return self._get(("shader", name, filepath), owner,
+                         lambda: OpenGLShader(name, filepath))
+
+    def texture(self, filename, owner=None):
+        """ Return the texture loaded from the file given
+        """
+        return self._get(("texture", filename), owner,
+                         lambda: OpenGLTexture(filename))
+
+    def buffer(self, geometry, shader, owner=None, usage=UsageMode.static_draw):
+        """ Return the buffer for the geometry, updated with the current
+        version of the geometry (only uploaded if it has changed).
+        """
+        key = ("buffer", id(geometry), id(shader), usage)
+        buffer = self._get(key, owner, lambda: OpenGLBuffer(geometry, shader, usage))
+        buffer.update()
+        self._entries[key][2] = buffer.nbytes
+        return buffer
+
+    def instances(self, buffer, shader, matrices, owner=None):
+        """ Return the instance buffer for the buffer given, updated with
+        the world matrices of the instances.
+        """
+        key = ("instances", id(buffer), id(shader))
+        instances = self._get(key, owner, lambda: OpenGLInstanceBuffer(buffer, shader))
+        instances.update(matrices)
+        self._entries[key][2] = instances.nbytes
+        return instances
+
+    def release(self, owner):
+        """ Release all the resources used by the owner. Resources that
+        are not used by any other owner are deleted.
+        """
+        for key in self._owners.pop(owner, ()):
+            entry = self._entries[key]
+            entry[1].discard(owner)
+            if not entry[1]:
+                self._dispose(key)
+
+    def evict(self, budget=None):
+        """ Delete the least recently used resources (not used in the
+        current frame) until the memory used is under the budget.
+        """
+        budget = self._budget if budget is None else budget
+        used = self.used
+        for key in list(self._entries.keys()):
+            if used <= budget:
+                break
+            entry = self._entries[key]
+            if entry[3] == self._frame or not entry[2]:
+                continue
+            used -= entry[2]
+            self._dispose(key)
+        return used
+
+    def frame(self):
+        """ End the current frame. Resources over the budget are evicted.
+        """
+        self.evict()
+        self._frame += 1
+
+    def clear(self):
+        """ Delete all the resources
+        """
+        for key in list(self._entries.keys()):
+            self._dispose(key)
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        return "OpenGLResources(count:{}, used:{}, budget:{})".format(
+                                            len(self._entries), self.used, self._budget)
@@ -64,13 +64,20 @@ class OpenGLShader:
         # Dispose all the object and memory allocated
         for shader in self._shaders:
             GL.glDetachShader(self._program, self._shaders[shader])
-            GL.glDeleleShader(self._shaders[shader])
+            GL.glDeleteShader(self._shaders[shader])
         # Delete Shader Program
         if self._program:
             GL.glDeleteProgram(self._program)
+        self._shaders = {}
+        self._program = None
         # Set initialized to false
         self.initialized = False
 
+    def dispose(self):
+        """ Delete the program and the shaders created in the GPU
+        """
+        self._dispose()
+
     def _initialize(self):
         # Dispose previous elemens created
         self._dispose()
@@ -184,7 +191,7 @@ class OpenGLShader:
         # Not initialized
         return False
 
-    def bind(self, attribute_name, size, dtype=np.float32):
+    def bind(self, attribute_name, size, dtype=np.float32, stride=0, offset=0):
         """
             This function will allow to bind attributes from the array buffer object
             to the shader. This operation will be done per VAO since it can store this
@@ -204,6 +211,11 @@ class OpenGLShader:
                     data-type of the values for the given attribute. If the vector contains
                     int, float32, unit32, etc.. This must be given using GL types. Use
                     typeGL function to convert numpy types into OpenGL types
+                stride:
+                    bytes between consecutive vertices for interleaved buffers. 
+                    Zero means the values are tightly packed.
+                offset:
+                    bytes from the start of the vertex to the attribute.
 
         """
         if self.initialized:
@@ -215,7 +227,7 @@ class OpenGLShader:
                 GL.glEnableVertexAttribArray(attribute_id)
                 # Describe the attribute data layout in the buffer
                 GL.glVertexAttribPointer(attribute_id, size, gldtype(dtype),
-                                    False, 0, ctypes.c_void_p(0))
+                                    False, stride, ctypes.c_void_p(offset))
                 # Return the attribute id
                 return attribute_id
             else:
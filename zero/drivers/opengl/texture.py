@@ -19,6 +19,8 @@ class OpenGLTexture:
         self.filename = filename
         # Create a texture variable with the pointer to the buffer
         self._texture = None
+        # Bytes used in the GPU (including the mipmaps)
+        self.nbytes = 0
         # Initiali<e variables and Window
         self._initialize()
 
@@ -31,7 +33,16 @@ class OpenGLTexture:
         self._dispose()
 
     def _dispose(self):
-        pass
+        # Delete the texture from the GPU
+        if self._texture:
+            GL.glDeleteTextures(1, [self._texture])
+        self._texture = None
+        self.nbytes = 0
+
+    def dispose(self):
+        """ Delete the texture created in the GPU
+        """
+        self._dispose()
 
     def _initialize(self):
         # Create the texture and copy into OpenGL
@@ -56,8 +67,9 @@ class OpenGLTexture:
             GL.glTexParameterf(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_WRAP_T, GL.GL_CLAMP_TO_EDGE)
             GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, width, height, 0,
                             GL.GL_RGB, gldtype(img_data.dtype), img_data)
-            # Create different Mipmaps for the current texure
+            # Create different Mipmaps for the current texure (+1/3)
             GL.glGenerateMipmap(GL.GL_TEXTURE_2D)
+            self.nbytes = img_data.nbytes * 4 // 3
             return texture
         # If not exist return None
         return None
@@ -70,7 +82,7 @@ class OpenGLTexture:
                     [   Some graphic cards could have a limitation in the number of   ]
                     [   textures that can store, depending on the memory.             ]
         """
-        if self._texture and (count > 0 and count < Texture.max_textures + 1 ):
+        if self._texture and (count >= 0 and count < OpenGLTexture.max_textures):
             # Following we will activate the texture in a slot 
             GL.glActiveTexture(GL.GL_TEXTURE0 + count)
             GL.glBindTexture(GL.GL_TEXTURE_2D, self._texture)
\ No newline at end of file
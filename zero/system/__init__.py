@@ -3,4 +3,4 @@ from __future__ import absolute_import, division, print_function
 
 from .input import InputManager
 from .render import RenderManager
-from .geometry import SceneManager
\ No newline at end of file
+from .geometry import SceneManager, TransformManager
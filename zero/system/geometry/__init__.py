@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function
 
-from .scene import SceneManager
\ No newline at end of file
+from .scene import SceneManager
+from .transform import TransformManager
@@ -1,9 +1,14 @@
 
 
 class SceneManager(object):
-    """ Input Worker Class
+    """ Scene Worker Class
     """
 
+    # Components accessed by the system (see SystemScheduler)
+    reads = ()
+    writes = ("transform", "geometry")
+    main_thread = False
+
     def __init__(self, engine):
         """ Initialization of the Worker
         """
@@ -0,0 +1,123 @@
+import weakref
+import numpy as np
+from ...core import EntityCatalogue, CatalogueTree, TransformHierarchy, Transform
+from ...components import TransformComponent
+
+class TransformManager(object):
+    """ Transform Manager Class
+
+    This class computes the world matrices of all the transforms using
+    the hierarchy of the entities (parent and children). The local
+    transformations are stored into a TransformHierarchy (structure of
+    arrays sorted in topological order), so all the matrices are
+    computed with vectorized passes, one per level of the tree.
+
+    The hierarchy is only built again when the tree (see
+    CatalogueTree.hierarchy_version) or the catalogue storage change, or
+    when a transform not seen before has been modified (for example a new
+    transform set into a component). Transforms outside the hierarchy,
+    like the camera, only trigger it once. Each frame only the transforms
+    modified (see Transform.modified) are copied, and only their subtrees
+    computed, so nothing is scanned when nothing changes. There must be
+    one TransformManager running, since it consumes the modified set.
+    The world matrix of each transform is a view of the hierarchy:
+
+        transform.world         # world matrix (4x4 float32)
+        transform.world_version # changes when the world is computed
+
+    Entities without transform are skipped, so the parent of a node is
+    the nearest ancestor with a transform.
+    """
+
+    # Components accessed by the system (see SystemScheduler)
+    reads = ()
+    writes = ("transform",)
+    main_thread = False
+
+    @property
+    def hierarchy(self):
+        return self._hierarchy
+
+    def __init__(self, engine):
+        """ Initialization of the Manager
+        """
+        self._engine = engine
+        self._hierarchy = TransformHierarchy()
+        # Transform for each row of the hierarchy and row by transform
+        self._transforms = []
+        self._rows = dict()
+        # Transforms modified that are not in any entity
+        self._outside = weakref.WeakSet()
+        # Tree and storage versions used to build the hierarchy
+        self._structure = None
+
+    def __del__(self):
+        """ Dispose and close the worker.
+        """
+        pass
+
+    def init(self):
+        """
+        """
+        return self
+
+    def _build(self, entities, transforms):
+        """ Build the hierarchy with the entities and their transforms
+        """
+        nodes = dict((entity.id, transform) for entity, transform in zip(entities, transforms))
+        parents = []
+        for entity in entities:
+            parent = entity.parent
+            while parent is not None and parent.id not in nodes:
+                parent = parent.parent
+            parents.append(None if parent is None else parent.id)
+        self._hierarchy.build([entity.id for entity in entities], parents)
+        # Transforms removed from the hierarchy use their model again
+        current = [nodes[key] for key in self._hierarchy.keys]
+        kept = set(id(transform) for transform in current)
+        for transform in self._transforms:
+            if id(transform) not in kept:
+                transform.world = None
+        self._transforms = current
+        self._rows = dict((id(transform), row) for row, transform in enumerate(current))
+
+    def _copy(self, rows):
+        """ Copy the transformations of the rows given into the hierarchy
+        """
+        modified = [self._transforms[row] for row in rows]
+        self._hierarchy.set_many(rows,
+                                 [transform.position for transform in modified],
+                                 [transform.rotation for transform in modified],
+                                 [transform.scale for transform in modified])
+
+    def run(self):
+        """ Copy the transforms modified and compute the world matrices
+        """
+        catalogue = EntityCatalogue.instance()
+        modified = list(Transform.modified)
+        Transform.modified.clear()
+        structure = (CatalogueTree.hierarchy_version, catalogue.storage.version)
+        unknown = [transform for transform in modified
+                   if id(transform) not in self._rows and transform not in self._outside]
+        if structure != self._structure or unknown:
+            entities, transforms = [], []
+            for entity in catalogue.query(TransformComponent.DEFAULT_TYPE):
+                transform = entity[TransformComponent.DEFAULT_TYPE].transform
+                if transform is not None:
+                    entities.append(entity)
+                    transforms.append(transform)
+            self._build(entities, transforms)
+            self._structure = structure
+            self._outside.update(transform for transform in modified
+                                 if id(transform) not in self._rows)
+            rows = np.arange(len(self._transforms))
+        else:
+            # Copy only the transforms modified since the last frame
+            rows = np.array(sorted(self._rows[id(transform)] for transform in modified
+                                   if id(transform) in self._rows), dtype=np.int64)
+        if len(rows):
+            self._copy(rows)
+        # Compute the subtrees modified and set the world matrices (views)
+        world = self._hierarchy.world
+        for row in self._hierarchy.update().tolist():
+            self._transforms[row].world = world[row]
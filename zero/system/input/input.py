@@ -12,7 +12,14 @@ class InputManager(object):
     entities that support input components so the will be 
     updated correctly.
 
+    Events are taken from the devices so it runs in the main thread.
+    Scripts could modify the camera or the transforms.
     """
+
+    # Components accessed by the system (see SystemScheduler)
+    reads = ("input",)
+    writes = ("camera", "transform")
+    main_thread = True
     def __init__(self, engine):
         """ Initialization of the Manager
 
@@ -41,11 +48,8 @@ class InputManager(object):
         # To improve performances this can be done during the initializetion
         # This is only when it's in game mode and not in develop mode
 
-        # Get the current Catalog
-        df = EntityCatalogue.instance().dataframe
-        column = InputComponent.DEFAULT_TYPE
-        # Get the current input actors
-        entity_component = df[column].dropna(axis=0)
+        # Get the current input actors from the cached query
+        entities = list(EntityCatalogue.instance().query(InputComponent.DEFAULT_TYPE))
 
         # Get all the events in the current frame
         events = self._device.get_events()
@@ -54,9 +58,9 @@ class InputManager(object):
         if multithread:
             threads = []
             # Get the relationship betwen entities and components
-            for entityid in entity_component.index:
+            for entity in entities:
                 thread = threading.Thread(target=self._process_component_events, 
-                                          args=(entityid, events))
+                                          args=(entity, events))
                 thread.start()
                 threads.append(thread)
                 # Wain unitl all the component ahave finished
@@ -64,23 +68,23 @@ class InputManager(object):
                 thread.join()
         else:
             # Get the relationship betwen entities and components
-            for entityid in entity_component.index:
+            for entity in entities:
                 # entity : component (input)
-                # print("{}:{}".format(entity, entity_component[entity]))
-                self._process_component_events(entityid, events)
+                self._process_component_events(entity, events)
 
       
     def _process_component_events(self, entity, events):
         """ Function to process all the events for the current component
         """
         #Get the inputs/actions from the current component
-        entity = EntityCatalogue.instance().get(entity)
         actions = entity[InputComponent.DEFAULT_TYPE].actions
 
         # Check if any action satisfy any event
         for action in actions:
             if actions[action].isin(events) and actions[action].evaluate(events):
                 # If events and condition then execute the action
-                actions[action].execute(entity=entity,engine=self._engine)
+                # Changes in the catalogue must be recorded into commands
+                actions[action].execute(entity=entity,engine=self._engine,
+                                        commands=self._engine.commands)
  
       
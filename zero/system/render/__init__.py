@@ -2,3 +2,5 @@
 from __future__ import absolute_import, division, print_function
 
 from .render import RenderManager
+from .queue import RenderQueue, radix_sort
+from .batch import StaticBatch, StaticBatcher
@@ -0,0 +1,179 @@
+import numpy as np
+from ...core import merge_geometries
+
+__all__ = ['StaticBatch', 'StaticBatcher']
+
+class StaticBatch(object):
+    """ Static Batch Class
+
+    Geometry merged from several entities with the same material. The
+    points are already transformed into world space, so the batch is
+    drawn with the identity as world matrix. The bounding box of the
+    batch (world space) can be used to cull the whole batch, and the
+    bounding sphere is used to sort it by depth.
+
+    Each entity keeps its slot in the batch (see StaticBatcher) while it
+    fits, so the number of points used by each entity is tracked to know
+    the free capacity of the batch.
+    """
+
+    # World matrix used to draw the batch (points in world space)
+    world = np.identity(4, dtype=np.float32)
+
+    @property
+    def bounds(self):
+        """ Bounding box (min, max) of the batch in world space
+        """
+        return self.geometry.get_bounds()
+
+    @property
+    def sphere(self):
+        """ Bounding sphere (center, radius) of the batch in world space
+        """
+        return self.geometry.get_bounding_sphere()
+
+    @property
+    def keys(self):
+        return list(self.members.keys())
+
+    @property
+    def points(self):
+        """ Number of points used by the entities of the batch
+        """
+        return sum(self.members.values())
+
+    def __init__(self, key):
+        self.key = key
+        # Points used by each entity (key -> points) in the batch
+        self.members = dict()
+        self.geometry = None
+        # Range (first, count) of the indices of each entity
+        self.ranges = np.zeros((0, 2), dtype=np.int64)
+        self.signature = None
+
+    def __len__(self):
+        return len(self.members)
+
+    def merge(self, items, signature):
+        """ Merge the geometry of the items (material, key, geometry,
+        transform) of the entities, in the same order as the members
+        """
+        self.geometry, self.ranges = merge_geometries(
+                                        [item[2] for item in items],
+                                        np.stack([item[3].world for item in items]),
+                                        name="batch")
+        self.signature = signature
+
+    def __str__(self):
+        """ Returns the string representation of this instance
+        """
+        return "StaticBatch(key:{}, count:{}, triangles:{})".format(
+                                self.key, len(self.members), int(self.ranges[:, 1].sum()) // 3)
+
+class StaticBatcher(object):
+    """ Static Batcher Class
+
+    This class merges the geometry of static entities (that don't move)
+    with the same material into batches (see merge_geometries), so many
+    small distinct meshes are drawn with one call per batch.
+
+        batches = batcher.update([(material, entity.id, geometry, transform), ...])
+
+    Each entity is given a slot in a batch of its material with enough
+    free points (max_points at most, so uint16 indices are used) and it
+    keeps it while it fits. Each batch keeps the signature of its
+    entities (geometry and world versions), and it's only merged again
+    when its signature changes. Adding, removing or changing one entity
+    only rebuilds the batches that contain it.
+    """
+
+    # Maximum number of points in each batch
+    max_points = np.iinfo(np.uint16).max + 1
+
+    @property
+    def batches(self):
+        return self._batches
+
+    @property
+    def rebuilds(self):
+        """ Number of batches merged in the last update
+        """
+        return self._rebuilds
+
+    def __init__(self):
+        """ Initialize the batcher without batches
+        """
+        # Batches by material and number ((material, number) -> batch)
+        self._batches = dict()
+        # Batch of each entity (key -> batch)
+        self._slots = dict()
+        self._count = 0
+        self._rebuilds = 0
+
+    def __len__(self):
+        return len(self._batches)
+
+    def _points(self, item):
+        """ Number of points of the geometry of the item
+        """
+        return len(item[2].get_point_attrib(item[2].point.position))
+
+    def _release(self, key):
+        """ Remove the entity from its batch
+        """
+        batch = self._slots.pop(key)
+        del batch.members[key]
+        if not batch.members:
+            del self._batches[batch.key]
+
+    def _assign(self, item, points):
+        """ Give a slot to the entity in the first batch of its material
+        with enough free points, or in a new batch
+        """
+        for batch in self._batches.values():
+            if (batch.key[0] == item[0] and 
+                batch.points + points <= max(self.max_points, points)):
+                break
+        else:
+            batch = StaticBatch((item[0], self._count))
+            self._batches[batch.key] = batch
+            self._count += 1
+        batch.members[item[1]] = points
+        self._slots[item[1]] = batch
+
+    def update(self, items):
+        """ Update the batches with the items (material, key, geometry,
+        transform) and return the batches. Only the batches with changes
+        are merged again and the batches not used are removed.
+        """
+        items = dict((item[1], item) for item in items)
+        # Release the entities removed, or that don't fit in their batch
+        for key, batch in list(self._slots.items()):
+            item = items.get(key)
+            if item is None or item[0] != batch.key[0]:
+                self._release(key)
+                continue
+            points = self._points(item)
+            if points != batch.members[key]:
+                batch.members[key] = points
+                if len(batch) > 1 and batch.points > self.max_points:
+                    self._release(key)
+        # Entities without slot (sorted so the batches are deterministic)
+        for key in sorted(set(items) - set(self._slots)):
+            self._assign(items[key], self._points(items[key]))
+        self._rebuilds = 0
+        for batch in self._batches.values():
+            members = [items[key] for key in batch.members]
+            signature = tuple((item[1], id(item[2]), item[2].version,
+                               id(item[3]), item[3].world_version)
+                              for item in members)
+            if batch.signature != signature:
+                batch.merge(members, signature)
+                self._rebuilds += 1
+        return list(self._batches.values())
+
+    def clear(self):
+        """ Remove all the batches
+        """
+        self._batches = dict()
+        self._slots = dict()
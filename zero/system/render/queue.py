@@ -0,0 +1,238 @@
+import numpy as np
+
+__all__ = ['RenderQueue', 'radix_sort']
+
+def radix_sort(keys, bits=16):
+    """ Return the order of the unsigned 64-bit keys using a LSD radix
+    sort with digits of the bits given. Each pass is a stable counting
+    sort of the digit (numpy uses radix sort for 16-bit integers), and
+    passes where all the digits are equal are skipped.
+    """
+    keys = np.asarray(keys, dtype=np.uint64)
+    order = np.arange(len(keys))
+    if len(keys) < 2:
+        return order
+    mask = np.uint64((1 << bits) - 1)
+    dtype = np.uint16 if bits <= 16 else np.uint32
+    for shift in range(0, 64, bits):
+        digits = ((keys[order] >> np.uint64(shift)) & mask).astype(dtype)
+        if digits.min() == digits.max():
+            continue
+        order = order[np.argsort(digits, kind="stable")]
+    return order
+
+class RenderQueue(object):
+    """ Render Queue Class
+
+    The queue collects the draw items of the frame and sorts them to
+    minimize the changes of state in the GPU. Each item has a packed
+    64-bit sort key:
+
+        | pass (4) | shader (12) | material (16) | buffer (16) | depth (16) |
+
+    Items are sorted by pass, then by shader, material (texture) and
+    buffer (VAO), so the items that share state are submitted together.
+    Opaque items are sorted front to back and transparent items back to
+    front. The keys are sorted using a radix sort.
+
+        queue.clear()
+        queue.add(shader, texture, buffer, world, depth)
+        queue.submit(render, camera)
+        queue.stats
+        >> {"programs": 1, "textures": 1, "vertex_arrays": 2, ...}
+
+    Items with instances (see OpenGLInstanceBuffer) are drawn with one
+    instanced draw call, using the world matrices of the instance buffer
+    instead of the world matrix of the item.
+
+        queue.add(shader, texture, buffer, None, depth, instances=instances)
+
+    Items with instances can also have ranges with the instances of
+    each range (first, count, base_vertex, base_instance, instances), so
+    draws with different world matrices (rows of the instance buffer)
+    share the buffer and are drawn with one multi-draw call.
+
+        queue.add(shader, texture, buffer, None, depth, ranges, instances=instances)
+
+    Consecutive items (after sorting) with the same shader, material,
+    buffer and world matrix (or the same instances) are merged, so all
+    their ranges (sub-meshes of the shared buffer) are drawn with one
+    multi-draw call (see OpenGLRender.multi_draw).
+
+    When the items are submitted redundant changes are skipped: the
+    program, texture and vertex array are only bound when they change,
+    and the uniforms of the frame (view and projection) are uploaded
+    once for each program. The changes and the draw calls issued (ranges
+    drawn one by one without multi-draw) are kept in stats.
+    """
+
+    # Passes supported (order used to render them)
+    OPAQUE = 0
+    TRANSPARENT = 1
+
+    # Bits used for each field of the key (from high to low)
+    PASS_BITS = 4
+    SHADER_BITS = 12
+    MATERIAL_BITS = 16
+    BUFFER_BITS = 16
+    DEPTH_BITS = 16
+
+    @property
+    def stats(self):
+        """ Changes of state and draw calls in the last submit
+        """
+        return self._stats
+
+    def __init__(self):
+        """ Initialize the queue without items
+        """
+        self._stats = dict()
+        self.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        """ Remove all the items in the queue
+        """
+        self._items = []
+        self._fields = []
+        self._depths = []
+        # Identifiers for the state objects used in the keys
+        self._ids = [dict(), dict(), dict()]
+
+    def _id(self, field, value):
+        ids = self._ids[field]
+        if id(value) not in ids:
+            ids[id(value)] = len(ids)
+        return ids[id(value)]
+
+    def add(self, shader, texture, buffer, world, depth=0.0, ranges=None, layer=OPAQUE,
+            instances=None):
+        """ Add a draw item into the queue. World is the model matrix of
+        the item and depth its distance to the camera.
+        """
+        self._items.append((shader, texture, buffer, world, ranges, instances))
+        self._fields.append((layer, self._id(0, shader), self._id(1, texture),
+                             self._id(2, buffer)))
+        self._depths.append(depth)
+        return self
+
+    def keys(self):
+        """ Return the packed sort keys for the items in the queue
+        """
+        if not self._items:
+            return np.zeros(0, dtype=np.uint64)
+        fields = np.array(self._fields, dtype=np.uint64)
+        depths = np.asarray(self._depths, dtype=np.float64)
+        # Quantize the depth with the range of the items in the frame
+        maximum = (1 << self.DEPTH_BITS) - 1
+        low, high = depths.min(), depths.max()
+        scale = maximum / (high - low) if high > low else 0.0
+        depth = np.clip((depths - low) * scale, 0, maximum).astype(np.uint64)
+        # Transparent items are sorted back to front
+        transparent = fields[:, 0] == self.TRANSPARENT
+        depth[transparent] = maximum - depth[transparent]
+        keys = fields[:, 0]
+        for column, bits in ((1, self.SHADER_BITS), (2, self.MATERIAL_BITS),
+                             (3, self.BUFFER_BITS)):
+            keys = (keys << np.uint64(bits)) | (fields[:, column] & np.uint64((1 << bits) - 1))
+        return (keys << np.uint64(self.DEPTH_BITS)) | depth
+
+    def sort(self):
+        """ Return the items sorted by their keys
+        """
+        order = radix_sort(self.keys())
+        return [self._items[index] for index in order]
+
+    def _merge(self, items):
+        """ Merge the consecutive items that share the shader, texture,
+        buffer and world matrix (or instances with ranges) into one item
+        with all their ranges. It yields the items with the number of
+        items merged.
+        """
+        current, merged = None, []
+        for item in items:
+            if (current is not None and item[0] is current[0] and
+                    item[1] is current[1] and item[2] is current[2] and
+                    self._mergeable(current, item)):
+                merged.append(item)
+                continue
+            if current is not None:
+                yield self._ranges(current, merged)
+            current, merged = item, [item]
+        if current is not None:
+            yield self._ranges(current, merged)
+
+    def _mergeable(self, item, other):
+        """ Return whether the items with the same state can be drawn
+        with the same call
+        """
+        if item[5] is None and other[5] is None:
+            return item[3] is other[3] or np.array_equal(item[3], other[3])
+        return (item[5] is other[5] and item[4] is not None and
+                other[4] is not None)
+
+    def _ranges(self, item, merged):
+        """ Return the item with the ranges of all the items merged
+        """
+        if len(merged) == 1:
+            return item + (1,)
+        buffer = item[2]
+        ranges = [np.array([[0, buffer.count]]) if other[4] is None else
+                  np.asarray(other[4]).reshape(len(other[4]), -1) for other in merged]
+        # Ranges with less columns use the defaults (no offsets)
+        columns = max(other.shape[1] for other in ranges)
+        ranges = [np.pad(other, ((0, 0), (0, columns - other.shape[1])))
+                  for other in ranges]
+        return item[:4] + (np.concatenate(ranges), item[5], len(merged))
+
+    def submit(self, render, camera):
+        """ Sort and submit the items to the render. It returns the
+        stats with the changes of state performed.
+        """
+        stats = dict({"items": len(self._items), "programs": 0, "textures": 0,
+                      "vertex_arrays": 0, "uniforms": 0, "draws": 0, "instances": 0})
+        program, material, vertex_array = None, None, None
+        updated = set()
+        for shader, texture, buffer, world, ranges, instances, count in self._merge(self.sort()):
+            if shader is not program:
+                shader.use()
+                program = shader
+                stats["programs"] += 1
+                if id(shader) not in updated:
+                    # Uniforms of the frame are uploaded once per program
+                    shader.update("VIEW_MATRIX", camera.view_matrix())
+                    shader.update("PROJECTION_MATRIX", camera.projection_matrix())
+                    updated.add(id(shader))
+                    stats["uniforms"] += 2
+            if texture is not material:
+                if texture is not None:
+                    texture.bind(0)
+                    stats["textures"] += 1
+                material = texture
+            if buffer is not vertex_array:
+                render.bind(buffer)
+                vertex_array = buffer
+                stats["vertex_arrays"] += 1
+            # Draw calls issued (ranges could be drawn one by one)
+            if instances is not None and ranges is None:
+                stats["draws"] += render.draw_instanced(buffer, instances.count)
+                stats["instances"] += instances.count
+            elif instances is not None:
+                # Each range has its instances (rows of the instance buffer)
+                ranges = np.asarray(ranges).reshape(len(ranges), -1)
+                stats["draws"] += render.draw(buffer, ranges)
+                stats["instances"] += int(ranges[:, 4].sum()) if ranges.shape[1] > 4 \
+                                      else len(ranges)
+            else:
+                shader.update("WORLD_MATRIX", world)
+                stats["uniforms"] += 1
+                stats["draws"] += render.draw(buffer, ranges)
+                stats["instances"] += count
+        if vertex_array is not None:
+            render.unbind()
+        if program is not None:
+            program.use(False)
+        self._stats = stats
+        return stats
@@ -4,7 +4,9 @@ from ...core import EntityCatalogue
 from ...core.base.utils import *
 from ...components import ( RenderComponent, MaterialComponent, GeometryComponent,
                            LightComponent, CameraComponent, TransformComponent )
-from ...drivers.opengl import OpenGLBuffer, OpenGLShader, OpenGLRender, OpenGLTexture
+from ...drivers.opengl import OpenGLRender, OpenGLResources
+from .queue import RenderQueue
+from .batch import StaticBatcher
 
 class RenderManager(object):
     """ Render Manager Class
@@ -40,6 +42,38 @@ e and
         - Environment: if the scene has Cube map, environment map, hdr, etc..
         - High-dynamic-range rendering
 
+    Geometry with levels of detail (see Geometry.generate_lods) is
+    rendered using the level for the size of its bounding sphere on
+    screen. The level used by each entity is kept, so it only changes
+    when the size is beyond the limits by the hysteresis factor.
+
+    Shaders, textures and buffers are created once and cached by the
+    resources (see OpenGLResources) with a budget of vram_budget bytes.
+    Each entity holds the resources it uses, so they are released when
+    the entity is not rendered anymore (removed or deactivated).
+
+    Objects are not drawn directly, they are added into a render queue
+    (see RenderQueue) that sorts them by pass, shader, material, buffer
+    and depth, so redundant changes of state are skipped. The changes
+    performed in the last frame are given by stats.
+
+    Entities that share the same geometry (level of detail) and material
+    are rendered using hardware instancing when there are at least
+    instance_threshold of them. Their world matrices are packed into a
+    per-instance buffer, so the whole group is drawn with one call.
+    Groups with the same geometry (different materials) share the buffer
+    and the instances, each one drawn with its rows (base instance).
+    Entities that render a primitive group (sub-mesh) of the same
+    geometry are also drawn with one multi-draw indirect call when it's
+    supported, one instance for each range.
+
+    Static entities (render usage "static_draw") without levels of detail
+    are merged by material into batches (see StaticBatcher) with the
+    points in world space, unless there are static_instance_threshold of
+    them with the same geometry and material, that are instanced instead.
+    Each batch is drawn with one call and only merged again when one of
+    its entities change.
+
     Future Improvements:
         - Global Illumitation
         - Raytracing
@@ -49,12 +83,70 @@ e and
     
     """
 
+    # Components accessed by the system (see SystemScheduler). Render
+    # uses the GL context so it must run in the main thread.
+    reads = ("render", "material", "geometry", "light", "camera", "transform")
+    writes = ()
+    main_thread = True
+
+    # Hysteresis factor used to change between levels of detail
+    lod_hysteresis = 0.1
+
+    # Budget for the memory used in the GPU by the resources (bytes)
+    vram_budget = OpenGLResources.DEFAULT_BUDGET
+
+    # Default assets used to render the geometry
+    default_shader = ("default_shader", "./assets/shaders")
+    default_texture = "./assets/images/texture.png"
+
+    # Shader and minimum number of entities to render them with instancing
+    instanced_shader = ("instanced_shader", "./assets/shaders")
+    instance_threshold = 2
+
+    # Merge the static entities into batches (see StaticBatcher) and
+    # minimum number of them with the same geometry to be instanced
+    static_batching = True
+    static_instance_threshold = 8
+
+    @property
+    def resources(self):
+        return self._resources
+
+    @property
+    def stats(self):
+        """ Changes of state and draw calls in the last frame
+        """
+        return self._queue.stats
+
+    @property
+    def batcher(self):
+        return self._batcher
+
+    @property
+    def triangles(self):
+        """ Number of triangles rendered in the last frame
+        """
+        return self._triangles
+
     def __init__(self, engine):
         """ Initialization of the Manager
         """
         # Create a device controller to get the current inputs
         self._engine = engine
         self._render = engine.render
+        # Level of detail used by each entity (id -> level)
+        self._lod_levels = dict()
+        # Resources in the GPU and entities that hold them
+        self._resources = OpenGLResources(self.vram_budget)
+        self._owners = set()
+        self._renderer = None
+        # Draw items of the frame sorted to minimize the changes of state
+        self._queue = RenderQueue()
+        # Bounding spheres in world space (id -> (transform, version, ...))
+        self._spheres = dict()
+        self._triangles = 0
+        # Batches with the static entities merged by material
+        self._batcher = StaticBatcher()
 
     def __del__(self):
         """ Dispose and close the worker.
@@ -70,21 +162,74 @@ e and
         """ This function will search for the component types
         specified
         """
-         # Get the current Catalog Manager
-        df = EntityCatalogue.instance().dataframe
-
-        # Get the current entity-components
-        entity_component = df.loc[:,component_types].dropna(axis=0)
-        result = []
+        # Get the cached query from the current Catalog Manager
+        query = EntityCatalogue.instance().query(component_types)
         # Search for the current active ones
-        for index in entity_component.index:
-            # Get the entity to get if it's the active one
-            entity = EntityCatalogue.instance().get(index) 
-            if entity.active:
-                result.append(entity)
+        result = [entity for entity in query if entity.active]
         # Finally return the results founded
         return result
 
+    def _world_sphere(self, entity, geometry, transform):
+        """ Return the bounding sphere of the geometry in world space. It's
+        cached until the world matrix or the geometry bounds change. The
+        geometry must be the one of the entity (not the level of detail
+        rendered), so the sphere is computed once for the LOD selection
+        and the depth.
+        """
+        sphere = geometry.get_bounding_sphere()
+        cached = self._spheres.get(entity.id)
+        if (cached is None or cached[0] is not transform or
+                cached[1] != transform.world_version or cached[2] is not sphere):
+            center, radius = sphere
+            model = transform.world
+            center = np.dot(np.append(center, 1.0), model)[0:3]
+            radius = radius * np.max(np.linalg.norm(model[0:3, 0:3], axis=1))
+            cached = (transform, transform.world_version, sphere, center, radius)
+            self._spheres[entity.id] = cached
+        return cached[3], cached[4]
+
+    def _world_matrices(self, items):
+        """ Return the world matrices (n, 4, 4) of the items. They are
+        taken from the hierarchy of the transforms (one gather) if the
+        engine computes it, otherwise from each transform.
+        """
+        transforms = getattr(self._engine, "transforms", None)
+        if transforms is not None:
+            hierarchy = transforms.hierarchy
+            if all(item[0].id in hierarchy for item in items):
+                rows = [hierarchy.row(item[0].id) for item in items]
+                return hierarchy.world[rows]
+        return np.stack([item[1].world for item in items]).astype(np.float32)
+
+    def _instance_ranges(self, buffer, items, ranged, base):
+        """ Return the ranges (first, count, base_vertex, base_instance,
+        instances) to draw the items with their rows of the instances,
+        starting at base. Items with sub-meshes (ranged) use one instance
+        for each range, otherwise all of them draw the whole buffer.
+        """
+        if not ranged:
+            return np.array([[0, buffer.count, 0, base, len(items)]], dtype=np.int64)
+        ranges = [np.asarray(item[3], dtype=np.int64).reshape(-1, 2) for item in items]
+        counts = [len(item) for item in ranges]
+        result = np.zeros((sum(counts), 5), dtype=np.int64)
+        result[:, 0:2] = np.concatenate(ranges)
+        result[:, 3] = base + np.repeat(np.arange(len(items)), counts)
+        result[:, 4] = 1
+        return result
+
+    def select_lod(self, entity, geometry, transform, camera):
+        """ Return the level of detail of the geometry to render for the
+        entity, using the bounding sphere projected with the camera.
+        """
+        if len(geometry.lods) == 1:
+            return geometry
+        center, radius = self._world_sphere(entity, geometry, transform)
+        level = geometry.select_lod(camera.screen_size(center, radius),
+                                    self._lod_levels.get(entity.id),
+                                    self.lod_hysteresis)
+        self._lod_levels[entity.id] = level
+        return geometry.lods[level]
+
     def run(self):
         """ Start the worker process
 
@@ -96,11 +241,12 @@ e and
         materials, textures, etc that will be on scene
         """
 
-        render = OpenGLRender()
-        render.init()
+        if self._renderer is None:
+            self._renderer = OpenGLRender()
+            self._renderer.init()
+        render = self._renderer
         render.clear()
-        shader = OpenGLShader("default_shader", "./assets/shaders")
-        shader.use()
+        shader = self._resources.shader(*self.default_shader)
 
         # Search for the active camera to render
         cameras = self.search(CameraComponent.DEFAULT_TYPE)
@@ -113,36 +259,111 @@ e and
         # geometry components. If no shader or material information, 
         # defaults will be provided
         objects = self.search([GeometryComponent.DEFAULT_TYPE,RenderComponent.DEFAULT_TYPE])
+        self._triangles = 0
+        self._queue.clear()
+        owners = set()
+        # Entities with the same geometry and material (id, filename)
+        batches, ranged = dict(), dict()
         for obj in objects:
             # Get the transformation
             transform = obj[TransformComponent.DEFAULT_TYPE].transform
-            # Get the geometry
+            # Get the geometry (level of detail for the size on screen)
             geometry = obj[GeometryComponent.DEFAULT_TYPE].geometry
-            # Get the material
+            center, _ = self._world_sphere(obj, geometry, transform)
+            # Render only the primitive group if any (levels are not grouped)
+            group = getattr(obj[RenderComponent.DEFAULT_TYPE], "group", None)
+            ranges = None
+            if group is not None and group in geometry.prim_groups:
+                ranges = geometry.get_draw_ranges(group)
+                self._triangles += len(geometry.get_prim_group(group))
+            else:
+                geometry = self.select_lod(obj, geometry, transform, camera)
+                self._triangles += len(geometry.get_prim_attrib(geometry.primitive.indices)) \
+                                   if geometry.indexed else 0
+            # Get the material (texture used by the material)
             material = obj[MaterialComponent.DEFAULT_TYPE].material
-            
-            # Bind the things
-            # OpenGLBuffer, OpenGLShader, OpenGLRender, OpenGLTexture
-          
-            buffer = OpenGLBuffer(geometry, shader)
-            texture = OpenGLTexture("./assets/images/texture.png")
-            #buffer.update()
-           
-            # # Render all the elements that share the same shader.
-            # # Use the current Shader configuration
-            
-            # # Use the current texture after the shader
-            texture.bind(0)
-  
-            shader.update("WORLD_MATRIX",transform.model)
-            shader.update("VIEW_MATRIX",camera.view_matrix())
-            shader.update("PROJECTION_MATRIX",camera.projection_matrix())
-
-            # # Render the  geometry
-            render.render(buffer)
-            # End Use the current Shader configuration
-            
-        shader.use(False)
+            filename = getattr(material, "texture", None) or self.default_texture
+
+            # Get the resources from the cache and add the item to the queue
+            owners.add(obj.id)
+            depth = float(np.linalg.norm(center - np.asarray(camera.position)))
+            if ranges is None:
+                static = (self.static_batching and len(geometry.lods) == 1 and
+                          getattr(obj[RenderComponent.DEFAULT_TYPE], "usage", None) == "static_draw")
+                batch = batches.setdefault((id(geometry), filename), (geometry, []))
+                batch[1].append((obj, transform, depth, static))
+                continue
+            group = ranged.setdefault((id(geometry), filename), (geometry, []))
+            group[1].append((obj, transform, depth, ranges))
+
+        # Sub-meshes of the same geometry and material drawn at once
+        # (geometry -> (geometry, [(filename, items, ranged), ...]))
+        packs = dict()
+        for key, (geometry, items) in ranged.items():
+            if render.indirect and len(items) >= self.instance_threshold:
+                packs.setdefault(key[0], (geometry, []))[1].append((key[1], items, True))
+                continue
+            for obj, transform, depth, ranges in items:
+                buffer = self._resources.buffer(geometry, shader, obj.id)
+                texture = self._resources.texture(key[1], obj.id)
+                self._queue.add(shader, texture, buffer, transform.world, depth, ranges)
+
+        # Render the entities with the same geometry and material
+        static = []
+        for key, (geometry, items) in batches.items():
+            if len(items) < self.static_instance_threshold:
+                static.extend((key[1], item[0].id, geometry, item[1])
+                              for item in items if item[3])
+                items = [item for item in items if not item[3]]
+            if len(items) < self.instance_threshold:
+                for obj, transform, depth, _ in items:
+                    buffer = self._resources.buffer(geometry, shader, obj.id)
+                    texture = self._resources.texture(key[1], obj.id)
+                    self._queue.add(shader, texture, buffer, transform.world, depth)
+                continue
+            packs.setdefault(key[0], (geometry, []))[1].append((key[1], items, False))
+
+        # Groups with the same geometry share the buffer and the instances
+        # (held by the geometry), each draw uses its rows of the instances
+        for key, (geometry, draws) in packs.items():
+            owner = ("instances", key)
+            owners.add(owner)
+            instanced = self._resources.shader(*self.instanced_shader)
+            buffer = self._resources.buffer(geometry, instanced, owner)
+            matrices = np.concatenate([self._world_matrices(items) for _, items, _ in draws])
+            instances = self._resources.instances(buffer, instanced, matrices, owner)
+            base = 0
+            for filename, items, sub_meshes in draws:
+                texture = self._resources.texture(filename, owner)
+                depth = min(item[2] for item in items)
+                if len(draws) == 1 and not sub_meshes:
+                    ranges = None
+                else:
+                    ranges = self._instance_ranges(buffer, items, sub_meshes, base)
+                self._queue.add(instanced, texture, buffer, None, depth, ranges,
+                                instances=instances)
+                base += len(items)
+
+        # Render the static entities merged by material
+        for batch in self._batcher.update(static):
+            owner = ("batch", id(batch.geometry))
+            owners.add(owner)
+            buffer = self._resources.buffer(batch.geometry, shader, owner)
+            texture = self._resources.texture(batch.key[0], owner)
+            center, _ = batch.sphere
+            depth = float(np.linalg.norm(center - np.asarray(camera.position)))
+            self._queue.add(shader, texture, buffer, batch.world, depth)
+
+        # Sort the items (to minimize the changes of state) and render them
+        self._queue.submit(render, camera)
+
+        # Release the resources of the entities not rendered anymore
+        for owner in self._owners - owners:
+            self._resources.release(owner)
+            self._lod_levels.pop(owner, None)
+            self._spheres.pop(owner, None)
+        self._owners = owners
+        self._resources.frame()
 
         # In this case I have to go through all the components first
         #That satisfy those conditions